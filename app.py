@@ -3,8 +3,10 @@ Indian Heritage Fashion Brand - Main Application
 Professional e-commerce platform with authentication system.
 Following SOLID principles and best practices.
 """
-from flask import Flask, render_template, request, jsonify, session, redirect
+from flask import Flask, render_template, request, jsonify, session, redirect, g
 from datetime import datetime, timezone
+import hashlib
+import json
 import os
 
 try:
@@ -17,6 +19,7 @@ from config import config
 
 # Import database
 from models import db
+from models.migrations import upgrade_schema
 
 # Import controllers
 from controllers.auth_controller import auth_bp
@@ -25,6 +28,21 @@ from controllers.admin_controller import admin_bp
 from controllers.cart_controller import cart_bp
 from controllers.cart_advanced_api import cart_advanced_bp
 
+# Build-time asset and image manifests
+from services.asset_manifest import init_asset_manifest, AssetManifest, IMMUTABLE_MAX_AGE
+from services.image_manifest import init_image_manifest
+from services.critical_css import init_css_manifest
+from services.js_bundle import init_js_bundle
+from services.preload import init_preload_headers
+from services.cart_state import init_cart_state, current_cart_state
+from services.precompressed import init_precompressed_static
+from services.page_cache import init_page_cache
+from services.http_cache import compute_release_version
+from services.freezer import init_frozen_pages
+from services.guest_cart import init_guest_cart
+from services.cart_store import init_cart_store
+from middleware import cache_page, conditional_get
+
 # Create Flask app
 app = Flask(__name__)
 
@@ -36,21 +54,60 @@ if Compress:
 env = os.environ.get('FLASK_ENV', 'development')
 app.config.from_object(config[env])
 
+# Load hashed asset names and image metadata once per worker (written by build_assets.py)
+init_asset_manifest(app)
+init_image_manifest(app)
+init_css_manifest(app)
+init_js_bundle(app)
+
+# Serve static text assets from their precompressed .br/.gz siblings
+init_precompressed_static(app)
+
+# Rendered + precompressed HTML for the public pages
+init_page_cache(app)
+
+# Link: rel=preload for each page's stylesheet, scripts and logo (+ 103 Early Hints)
+init_preload_headers(app)
+
+# Cart badge count/version in the session + script-readable cookies
+init_cart_state(app)
+
+# Part of every ETag, so a deploy invalidates clients' cached pages
+app.config['RELEASE_VERSION'] = compute_release_version(app)
+
 # Add cache headers for static files and pages
 @app.after_request
 def add_cache_headers(response):
     """Add cache headers to responses for better performance."""
     if request.path.startswith('/static/'):
-        response.cache_control.max_age = 2592000
+        if AssetManifest.is_hashed(request.path[len('/static/'):]):
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = app.config['UNHASHED_STATIC_MAX_AGE']
+        response.cache_control.no_cache = None  # send_file default would force revalidation
         response.cache_control.public = True
     elif request.endpoint in ['home', 'shop', 'about', 'contact', 'indian_heritage', 'design_gallery']:
+        # Logged-in pages differ (add-to-cart buttons, account menu), so only
+        # the anonymous variant may be stored by shared caches
         response.cache_control.max_age = 3600
-        response.cache_control.public = True
+        if 'user_id' in session or 'admin_id' in session:
+            response.cache_control.private = True
+        else:
+            response.cache_control.public = True
     return response
 
 # Initialize database
 db.init_app(app)
 
+# Add columns introduced since the database was created (e.g. cart aggregates)
+with app.app_context():
+    upgrade_schema()
+
+# Optional hot cart store with write-behind flushing (CART_STORE = 'memory' for a
+# single worker process, 'tcp' for a store shared by several workers)
+init_cart_store(app)
+
 # Middleware to redirect old domain to new custom domain
 @app.before_request
 def redirect_to_custom_domain():
@@ -221,16 +278,30 @@ PRODUCTS = [
     }
 ]
 
+# Changes whenever the product data does; part of page cache keys
+app.config['CATALOG_VERSION'] = hashlib.sha256(
+    json.dumps(PRODUCTS, sort_keys=True).encode()
+).hexdigest()[:12]
+
+# Anonymous hits on frozen pages are answered from disk (no-op unless enabled)
+init_frozen_pages(app)
+
+# Anonymous visitors' carts: signed cookie priced from PRODUCTS, merged at login
+init_guest_cart(app, PRODUCTS)
+
 # Newsletter subscribers (in-memory storage)
 subscribers = []
 
 # Public routes
 @app.route('/')
+@cache_page
 def home():
     featured_products = PRODUCTS[:6]
     return render_template('index.html', products=featured_products)
 
 @app.route('/shop')
+@conditional_get(variant=True)
+@cache_page
 def shop():
     category = request.args.get('category', 'all')
     if category == 'all':
@@ -240,6 +311,8 @@ def shop():
     return render_template('shop.html', products=products, category=category)
 
 @app.route('/product/<int:product_id>')
+@conditional_get(variant=True)
+@cache_page
 def product_detail(product_id):
     product = next((p for p in PRODUCTS if p['id'] == product_id), None)
     if product:
@@ -247,19 +320,23 @@ def product_detail(product_id):
     return "Product not found", 404
 
 @app.route('/about')
+@cache_page
 def about():
     return render_template('about.html')
 
 @app.route('/contact')
+@cache_page
 def contact():
     return render_template('contact.html')
 
 @app.route('/indian-heritage')
+@cache_page
 def indian_heritage():
     indian_products = [p for p in PRODUCTS if p['culture'] == 'Indian']
     return render_template('indian_heritage.html', products=indian_products)
 
 @app.route('/design-gallery')
+@cache_page
 def design_gallery():
     return render_template('design_gallery.html')
 
@@ -273,6 +350,25 @@ def subscribe():
         return jsonify({'success': True, 'message': 'Thank you for subscribing!'})
     return jsonify({'success': False, 'message': 'Invalid email or already subscribed'})
 
+@app.route('/api/session')
+def session_info():
+    """Per-user header fragments; main.js only calls this when the state cookies are missing."""
+    g.cart_changed = True  # Fallback path: re-read the cart row rather than trust the session
+    state = current_cart_state()
+
+    response = jsonify({
+        'success': True,
+        'is_authenticated': 'user_id' in session,
+        'is_admin': 'admin_id' in session,
+        'username': session.get('username') or session.get('admin_username'),
+        'cart_count': state['count'] if state else None,
+        'cart_version': state['version'] if state else None,
+        'cart_owner': state['owner'] if state else None
+    })
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
+
 @app.route('/api/contact', methods=['POST'])
 def submit_contact():
     data = request.get_json()
@@ -310,6 +406,7 @@ def init_database():
     """Initialize database tables."""
     with app.app_context():
         db.create_all()
+        upgrade_schema()
         print("✅ Database tables created successfully!")
         
         # Create default super admin if doesn't exist
@@ -0,0 +1,112 @@
+"""
+Benchmark for guest-to-user cart merges.
+Merges a 100-line guest cart into a 100-line user cart (half the lines
+overlap) with the set-based CartService.merge_carts and with the previous
+per-item loop, in a scratch SQLite database so instance/ is never touched.
+
+Usage: python benchmark_cart_merge.py [--runs 5] [--items 100]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def fill_cart(cart_id, product_ids, size='M'):
+    from models import CartItem, db
+    from repositories import CartRepository
+
+    db.session.add_all([
+        CartItem(cart_id=cart_id, product_id=pid, product_name=f'Product {pid}',
+                 product_image=f'mockups/{pid}.jpg', price=999.0 + pid, quantity=1, size=size)
+        for pid in product_ids
+    ])
+    CartRepository.recalculate_totals(cart_id)
+    db.session.commit()
+
+
+def merge_per_item(cart_repo, cart_item_repo, target_cart, source_cart):
+    """The merge loop this benchmark replaced: a nested scan and a commit per line."""
+    for source_item in source_cart.items:
+        existing_item = None
+        for target_item in target_cart.items:
+            if target_item.product_id == source_item.product_id and target_item.size == source_item.size:
+                existing_item = target_item
+                break
+        if existing_item:
+            cart_item_repo.update_quantity(existing_item, existing_item.quantity + source_item.quantity)
+        else:
+            cart_item_repo.add_item(target_cart.id, source_item.product_id, source_item.product_name,
+                                    source_item.price, source_item.product_image,
+                                    source_item.quantity, source_item.size)
+    cart_repo.clear_cart(source_cart)
+
+
+def benchmark(runs, items):
+    """Time both strategies `runs` times; returns {strategy: ([seconds], statements per merge)}."""
+    from sqlalchemy import event
+    from app import app
+    from models import User, db
+    from services import CartService
+
+    service = CartService()
+    results = {'set-based merge_carts': ([], 0), 'per-item loop': ([], 0)}
+
+    with app.app_context():
+        db.create_all()
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        for run in range(runs):
+            for strategy, (timings, _) in results.items():
+                users = [User(email=f'bench_{strategy[:3]}_{run}_{i}@example.com',
+                              username=f'bench_{strategy[:3]}_{run}_{i}') for i in range(2)]
+                for user in users:
+                    user.set_password('Bench@123456')
+                db.session.add_all(users)
+                db.session.commit()
+                target, source = (service.get_user_cart(user.id) for user in users)
+                fill_cart(target.id, range(items))
+                fill_cart(source.id, range(items // 2, items + items // 2))
+
+                del statements[:]
+                started = time.perf_counter()
+                if strategy == 'per-item loop':
+                    merge_per_item(service.cart_repo, service.cart_item_repo, target, source)
+                else:
+                    assert service.merge_carts(users[0].id, users[1].id)['success']
+                timings.append(time.perf_counter() - started)
+                results[strategy] = (timings, len(statements))
+
+                expected = items + items // 2
+                assert len(service.get_cart_view(users[0].id).items) == expected
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark guest-to-user cart merges')
+    parser.add_argument('--runs', type=int, default=5, help='Repetitions per strategy')
+    parser.add_argument('--items', type=int, default=100, help='Lines in each cart')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    sys.path.insert(0, PROJECT_ROOT)
+    try:
+        print("=" * 70)
+        print(f"CART MERGE BENCHMARK ({args.runs} runs, {args.items}-line carts)")
+        print("=" * 70)
+        for strategy, (timings, statement_count) in benchmark(args.runs, args.items).items():
+            print(f"{strategy:<24} median {statistics.median(timings) * 1000:8.1f}ms  "
+                  f"min {min(timings) * 1000:8.1f}ms  {statement_count:5d} statements")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark for the image build scripts.
+Runs generate_images.py and generate_mockups.py end to end in a scratch copy
+of the project so real static/ assets are never touched.
+
+Usage: python benchmark_image_generation.py [--runs 3] [--workers N]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = ['generate_images.py', 'generate_mockups.py']
+
+
+def run_script(workdir, script, *args):
+    """Run a build script in workdir and return wall-clock seconds."""
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, script, *args],
+        cwd=workdir,
+        check=True,
+        stdout=subprocess.DEVNULL
+    )
+    return time.perf_counter() - started
+
+
+def clear_mockup_caches(workdir):
+    """Remove rendered mockups, the build manifest and texture/base-layer caches."""
+    for path in ['static/images/mockups', 'static/images/mockup_templates']:
+        shutil.rmtree(os.path.join(workdir, path), ignore_errors=True)
+
+
+def benchmark(runs, workers):
+    """Time each scenario `runs` times and return {scenario: [seconds]}."""
+    worker_args = ['--workers', str(workers)] if workers else []
+    results = {
+        'generate_images.py': [],
+        'generate_mockups.py (cold caches)': [],
+        'generate_mockups.py --force (warm textures)': [],
+        'generate_mockups.py (nothing stale)': [],
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for script in SCRIPTS:
+            shutil.copy(os.path.join(PROJECT_ROOT, script), workdir)
+
+        for _ in range(runs):
+            results['generate_images.py'].append(run_script(workdir, 'generate_images.py'))
+
+            clear_mockup_caches(workdir)
+            results['generate_mockups.py (cold caches)'].append(
+                run_script(workdir, 'generate_mockups.py', *worker_args))
+            results['generate_mockups.py --force (warm textures)'].append(
+                run_script(workdir, 'generate_mockups.py', '--force', *worker_args))
+            results['generate_mockups.py (nothing stale)'].append(
+                run_script(workdir, 'generate_mockups.py', *worker_args))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the image build scripts')
+    parser.add_argument('--runs', type=int, default=3, help='Repetitions per scenario')
+    parser.add_argument('--workers', type=int, default=None, help='Mockup render processes')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"IMAGE GENERATION BENCHMARK ({args.runs} runs, {os.cpu_count()} CPUs)")
+    print("=" * 70)
+
+    for scenario, timings in benchmark(args.runs, args.workers).items():
+        print(f"{scenario:<48} median {statistics.median(timings):7.2f}s  "
+              f"min {min(timings):7.2f}s")
+
+
+if __name__ == '__main__':
+    main()
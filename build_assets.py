@@ -0,0 +1,132 @@
+"""
+Build-time asset pipeline.
+Run after generate_mockups.py and before starting the web workers:
+
+    python build_assets.py [--derivatives] [--prune] [--freeze [--workers N]]
+
+Writes static/images/.image_manifest.json (dimensions, bytes, dominant colour,
+content hash and responsive derivatives for every image), then splits
+static/css/style.css per template into inline critical CSS and a pruned
+bundle under static/css/pages (static/.css_manifest.json) and minifies the
+page scripts into static/js/app.min.js, then copies every
+static file to a content-hashed name under static/dist and records the
+mapping in static/.asset_manifest.json. The app loads both once per worker.
+Finally every text asset gets .br and .gz siblings at maximum compression,
+which the static view serves as-is.
+
+--freeze then renders every public page (home, about, contact, gallery,
+heritage, shop categories, products) to build/frozen as HTML + .br/.gz, in
+parallel; with SERVE_FROZEN_PAGES=true anonymous visitors get those files.
+"""
+import argparse
+import os
+import time
+
+from services.asset_manifest import build_asset_manifest, write_asset_manifest, prune_hashed_assets
+from services.precompressed import precompress_static
+from services.critical_css import build_css_bundles, write_css_manifest
+from services.js_bundle import build_js_bundle, BUNDLE_SOURCES
+from services.image_manifest import build_image_manifest, write_image_manifest, DERIVATIVE_PATTERN, SKIP_DIRECTORIES
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(PROJECT_ROOT, 'static')
+IMAGES_DIR = os.path.join(STATIC_DIR, 'images')
+TEMPLATES_DIR = os.path.join(PROJECT_ROOT, 'templates')
+PAGE_SCRIPTS = [os.path.join(STATIC_DIR, *name.split('/')) for name in BUNDLE_SOURCES]
+RASTER_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def build_missing_derivatives(images_dir=IMAGES_DIR):
+    """Render 400w/800w JPEG + WebP copies for raster images that have none yet."""
+    from generate_mockups import create_image_derivatives, DERIVATIVE_WIDTHS
+
+    written = []
+    for root, dirs, files in os.walk(images_dir):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRECTORIES and not d.startswith('.')]
+        for filename in files:
+            stem, extension = os.path.splitext(filename)
+            if extension.lower() not in RASTER_EXTENSIONS or DERIVATIVE_PATTERN.match(filename):
+                continue
+            expected = [os.path.join(root, f"{stem}-{w}w.webp") for w in DERIVATIVE_WIDTHS]
+            if all(os.path.exists(p) for p in expected):
+                continue
+            written.extend(create_image_derivatives(os.path.join(root, filename)))
+    return written
+
+
+def build_images(derivatives=False):
+    started = time.perf_counter()
+    if derivatives:
+        written = build_missing_derivatives()
+        print(f"🖼️  Wrote {len(written)} image derivatives")
+
+    manifest = build_image_manifest(IMAGES_DIR)
+    path = write_image_manifest(IMAGES_DIR, manifest)
+    print(f"✅ Image manifest: {len(manifest['images'])} images -> "
+          f"{os.path.relpath(path, PROJECT_ROOT)} ({time.perf_counter() - started:.2f}s)")
+
+
+def build_css():
+    started = time.perf_counter()
+    manifest = build_css_bundles(STATIC_DIR, TEMPLATES_DIR, PAGE_SCRIPTS)
+    path = write_css_manifest(STATIC_DIR, manifest)
+    print(f"✅ CSS manifest: {len(manifest['templates'])} templates -> "
+          f"{os.path.relpath(path, PROJECT_ROOT)} ({time.perf_counter() - started:.2f}s)")
+
+
+def build_js():
+    started = time.perf_counter()
+    result = build_js_bundle(STATIC_DIR, TEMPLATES_DIR)
+    before, after = result['bytes']
+    print(f"✅ JS bundle: {', '.join(result['sources'])} -> {result['bundle']} "
+          f"({before} -> {after} bytes, {len(result['removed'])} unused functions removed, "
+          f"{time.perf_counter() - started:.2f}s)")
+
+
+def build_static(prune=False):
+    started = time.perf_counter()
+    manifest = build_asset_manifest(STATIC_DIR)
+    path = write_asset_manifest(STATIC_DIR, manifest)
+    print(f"✅ Asset manifest: {len(manifest['assets'])} hashed files -> "
+          f"{os.path.relpath(path, PROJECT_ROOT)} ({time.perf_counter() - started:.2f}s)")
+    if prune:
+        print(f"🧹 Removed {prune_hashed_assets(STATIC_DIR, manifest)} stale hashed files")
+
+
+def build_compressed():
+    started = time.perf_counter()
+    written = precompress_static(STATIC_DIR)
+    print(f"✅ Precompressed: {len(written)} .br/.gz files written "
+          f"({time.perf_counter() - started:.2f}s)")
+
+
+def build_frozen(workers=None):
+    started = time.perf_counter()
+    from app import app, PRODUCTS
+    from services.freezer import freeze_pages, public_page_urls
+
+    output_dir = os.path.join(PROJECT_ROOT, app.config['FROZEN_PAGES_DIR'])
+    urls = public_page_urls(PRODUCTS)
+    manifest = freeze_pages(app, urls, output_dir, workers=workers)
+    print(f"✅ Frozen: {len(manifest['pages'])}/{len(urls)} pages -> "
+          f"{os.path.relpath(output_dir, PROJECT_ROOT)} ({time.perf_counter() - started:.2f}s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build static asset manifests')
+    parser.add_argument('--derivatives', action='store_true',
+                        help='Render missing responsive image derivatives first')
+    parser.add_argument('--prune', action='store_true',
+                        help='Delete hashed copies from earlier builds')
+    parser.add_argument('--freeze', action='store_true',
+                        help='Pre-render public pages to static HTML')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes used by --freeze (default: CPU count)')
+    args = parser.parse_args()
+    build_images(derivatives=args.derivatives)
+    build_css()
+    build_js()
+    build_static(prune=args.prune)
+    build_compressed()
+    if args.freeze:
+        build_frozen(workers=args.workers)
@@ -27,6 +27,65 @@ class Config:
     UPLOAD_FOLDER = 'static/uploads'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     
+    # Background mockup rendering for uploaded designs
+    MOCKUP_JOB_WORKERS = int(os.environ.get('MOCKUP_JOB_WORKERS', 2))
+    MOCKUP_JOBS_FOLDER = None  # Defaults to <instance>/mockup_jobs
+    MOCKUP_JOB_TIMEOUT = int(os.environ.get('MOCKUP_JOB_TIMEOUT', 900))  # Seconds before a stuck job is resubmitted
+    
+    # Static assets: hashed copies (python build_assets.py) are cached for a year,
+    # unhashed URLs only briefly so deploys show up quickly
+    ASSET_FINGERPRINTING = True
+    UNHASHED_STATIC_MAX_AGE = 3600
+    
+    # Inline per-template critical CSS and load the pruned bundle async
+    # (built by build_assets.py; pages fall back to style.css without it)
+    CRITICAL_CSS = True
+    
+    # Load the minified js/app.min.js bundle instead of the page scripts
+    JS_BUNDLE = True
+    
+    # Link: rel=preload headers on HTML pages; also sent as 103 Early Hints
+    # when the WSGI server provides wsgi.early_hints
+    PRELOAD_HEADERS = True
+    EARLY_HINTS = True
+    
+    # Static files are served from .br/.gz siblings built ahead of time;
+    # Flask-Compress only compresses rendered pages
+    COMPRESS_STREAMS = False
+    
+    # Rendered + compressed HTML for public pages (home, shop, about, ...)
+    PAGE_CACHE_ENABLED = True
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
+    PAGE_CACHE_MAX_ENTRIES = 256
+    PAGE_CACHE_STALE_TTL = 60  # Serve the expired copy this long while re-rendering
+    PAGE_CACHE_RENDER_TIMEOUT = 10  # Max seconds a request waits for another's render
+    
+    # Public pages pre-rendered at deploy (python build_assets.py --freeze),
+    # served from disk to anonymous visitors when enabled
+    FROZEN_PAGES_DIR = 'build/frozen'
+    SERVE_FROZEN_PAGES = os.environ.get('SERVE_FROZEN_PAGES', '').lower() in ('1', 'true', 'yes')
+    
+    # Most items accepted by one bulk cart call (one upsert statement)
+    CART_BULK_MAX_ITEMS = int(os.environ.get('CART_BULK_MAX_ITEMS', 50))
+    
+    # Cart writes are conditional on the cart version; a write that loses a
+    # race re-reads the cart and retries this many times
+    CART_WRITE_RETRIES = int(os.environ.get('CART_WRITE_RETRIES', 3))
+    
+    # Cart backend: 'sql' writes every change, 'memory' / 'tcp' keep active carts
+    # in a hot store and flush them every CART_STORE_FLUSH_INTERVAL seconds.
+    # 'memory' is per process, so single-worker servers only (refused when
+    # WEB_CONCURRENCY or gunicorn --workers asks for more); with several
+    # workers or nodes use 'tcp' and run python -m services.cart_store
+    CART_STORE = os.environ.get('CART_STORE', 'sql')
+    CART_STORE_ADDRESS = os.environ.get('CART_STORE_ADDRESS', '127.0.0.1:6380')
+    CART_STORE_FLUSH_INTERVAL = 2.0
+    CART_STORE_MAX_IDLE = 1800  # Seconds before a clean cart leaves the store
+    
+    # Anonymous carts are kept in a signed cookie until login
+    GUEST_CART_MAX_LINES = 20
+    GUEST_CART_MAX_AGE = 30 * 24 * 3600
+    
     # Pagination
     PRODUCTS_PER_PAGE = 12
     ORDERS_PER_PAGE = 20
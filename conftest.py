@@ -0,0 +1,44 @@
+"""
+Shared helpers for the test suite.
+Plain functions rather than fixtures, imported by the test modules
+(from conftest import ...) so each test file still runs on its own
+through its __main__ block.
+"""
+import uuid
+
+from app import app
+from services import AuthenticationService
+
+TEST_PASSWORD = "Test@123456"
+
+
+def new_user(prefix: str = 'test'):
+    """Register a throwaway user; returns (user_id, username)."""
+    username = f"{prefix}_{uuid.uuid4().hex[:10]}"
+    with app.app_context():
+        result = AuthenticationService().register_user(
+            email=f"{username}@example.com", username=username, password=TEST_PASSWORD
+        )
+        assert result['success'], result
+        return result['user'].id, username
+
+
+def new_user_id(prefix: str = 'test') -> int:
+    """Register a throwaway user and return its id."""
+    return new_user(prefix)[0]
+
+
+def login_client(user_id: int, username: str = None):
+    """Test client whose session is logged in as user_id."""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        if username:
+            sess['username'] = username
+    return client
+
+
+def logged_in_client(prefix: str = 'test'):
+    """Register a throwaway user; returns (client, user_id) logged in as them."""
+    user_id, username = new_user(prefix)
+    return login_client(user_id, username), user_id
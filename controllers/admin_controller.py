@@ -1,13 +1,15 @@
 """
 Admin controller for administrative dashboard and management.
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from middleware import admin_required, super_admin_required
 from services import AdminService
+from services.mockup_jobs import MockupJobService
 from repositories import OrderRepository, UserRepository
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 admin_service = AdminService()
+mockup_job_service = MockupJobService()
 
 
 @admin_bp.route('/dashboard')
@@ -138,3 +140,37 @@ def settings():
     from repositories import AdminRepository
     admin = AdminRepository.find_by_id(session['admin_id'])
     return render_template('admin/settings.html', admin=admin)
+
+
+@admin_bp.route('/designs/upload', methods=['POST'])
+@admin_required
+def upload_design():
+    """Upload a design and queue its mockups; returns a job id to poll.
+    
+    Form fields:
+    - design: image file (png, jpg, jpeg, gif)
+    - garment: 'tshirt' or 'hoodie' (default: tshirt)
+    - colors: one or more garment colours, e.g. 'Black', 'Navy Blue' (default: White)
+    """
+    design = request.files.get('design')
+    if not design or not design.filename:
+        return jsonify({'success': False, 'message': 'No design file uploaded'}), 400
+    
+    result = mockup_job_service.submit_upload(
+        design,
+        garment=request.form.get('garment', 'tshirt'),
+        colors=request.form.getlist('colors')
+    )
+    if not result['success']:
+        return jsonify(result), 400
+    
+    result['status_url'] = url_for('admin.design_job_status', job_id=result['job_id'])
+    return jsonify(result), 202
+
+
+@admin_bp.route('/designs/jobs/<job_id>')
+@admin_required
+def design_job_status(job_id):
+    """Poll a mockup rendering job."""
+    result = mockup_job_service.get_job_status(job_id)
+    return jsonify(result), 200 if result['success'] else 404
@@ -5,6 +5,7 @@ Implements Controller pattern following SOLID principles.
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from services import AuthenticationService
 from services.auth_service import EnhancedAuthenticationService, EmailService, get_client_info
+from services.guest_cart import claim_guest_cart
 from middleware import guest_only, login_required
 import logging
 
@@ -89,6 +90,9 @@ def login():
             session['user_email'] = user.email
             session['login_record_id'] = login_record.id if login_record else None
             
+            # Carry over anything added to the cart before logging in
+            claim_guest_cart(user.id)
+            
             # Remember me functionality - extends session
             if remember:
                 session.permanent = True
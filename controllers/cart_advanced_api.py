@@ -3,7 +3,7 @@ Advanced Cart Management API Endpoints (Session 4)
 Provides bulk operations, analytics, recommendations, and delivery estimates.
 """
 from flask import Blueprint, request, jsonify, session
-from middleware import login_required
+from middleware import login_required, conditional_get
 from services import CartService
 
 cart_advanced_bp = Blueprint('cart_advanced', __name__, url_prefix='/cart/advanced')
@@ -12,6 +12,7 @@ cart_service = CartService()
 
 @cart_advanced_bp.route('/summary', methods=['GET'])
 @login_required
+@conditional_get(lambda: cart_service.get_cart_version(session['user_id']))
 def cart_summary():
     """Get detailed cart summary with item breakdown."""
     result = cart_service.get_cart_summary(session['user_id'])
@@ -109,7 +110,7 @@ def get_recommendations():
 def cart_analytics():
     """Get cart analytics: item count, total value, categories, price range."""
     try:
-        cart = cart_service.get_user_cart(session['user_id'])
+        cart = cart_service.get_cart_view(session['user_id'])
         
         total_items = cart.get_item_count()
         total_value = float(cart.get_total())
@@ -146,7 +147,7 @@ def cart_analytics():
 def validate_items():
     """Validate all cart items for availability and pricing."""
     try:
-        cart = cart_service.get_user_cart(session['user_id'])
+        cart = cart_service.get_cart_view(session['user_id'])
         
         validation_results = []
         is_valid = True
@@ -183,7 +184,7 @@ def estimated_delivery():
     try:
         from datetime import datetime, timedelta, timezone
         
-        cart = cart_service.get_user_cart(session['user_id'])
+        cart = cart_service.get_cart_view(session['user_id'])
         
         if not cart.items or cart.get_item_count() == 0:
             return jsonify({
@@ -3,9 +3,10 @@ Cart controller for shopping cart and checkout operations.
 Implements Controller pattern following SOLID principles.
 """
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from middleware import login_required
+from middleware import login_required, conditional_get
 from services import CartService, CheckoutService
-from repositories import AddressRepository
+from repositories import AddressRepository, OrderRepository
+from services.guest_cart import add_to_guest_cart
 import traceback
 
 cart_bp = Blueprint('cart', __name__, url_prefix='/cart')
@@ -13,20 +14,39 @@ cart_service = CartService()
 checkout_service = CheckoutService()
 
 
+def _expected_version(value):
+    """Cart version the client last saw (optional 'version' field), or None."""
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _line_key(form):
+    """(product_id, size) of the cart line a form refers to, or None."""
+    try:
+        product_id, size = int(form.get('product_id')), form.get('size')
+    except (TypeError, ValueError):
+        return None
+    return (product_id, size) if size else None
+
+
 @cart_bp.route('/')
 @login_required
 def view_cart():
     """View shopping cart."""
-    cart = cart_service.get_user_cart(session['user_id'])
+    cart = cart_service.get_cart_view(session['user_id'])
     return render_template('cart/cart.html', cart=cart)
 
 
 @cart_bp.route('/add', methods=['POST'])
-@login_required
 def add_to_cart():
-    """Add item to shopping cart."""
+    """Add item to shopping cart (guests: signed cookie, merged at login)."""
     data = request.get_json()
     
+    if 'user_id' not in session:
+        return jsonify(add_to_guest_cart(data.get('product_id'), data.get('quantity', 1), data.get('size', 'M')))
+    
     result = cart_service.add_to_cart(
         user_id=session['user_id'],
         product_id=data.get('product_id'),
@@ -34,21 +54,22 @@ def add_to_cart():
         price=data.get('price'),
         product_image=data.get('product_image'),
         quantity=data.get('quantity', 1),
-        size=data.get('size', 'M')
+        size=data.get('size', 'M'),
+        expected_version=_expected_version(data.get('version'))
     )
     
-    return jsonify(result)
+    return jsonify(result), 409 if result.get('conflict') else 200
 
 
 @cart_bp.route('/count')
 @login_required
+@conditional_get(lambda: cart_service.get_cart_version(session['user_id']))
 def cart_count():
-    """Get cart item count."""
+    """Get cart item count (reads the cart row's aggregate only)."""
     try:
-        cart = cart_service.get_user_cart(session['user_id'])
         return jsonify({
             'success': True,
-            'count': cart.get_item_count()
+            'count': cart_service.get_cart_totals(session['user_id'])['item_count']
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -60,12 +81,14 @@ def update_item(item_id):
     """Update cart item quantity."""
     quantity = request.form.get('quantity', type=int)
     
-    result = cart_service.update_cart_item(item_id, quantity)
+    result = cart_service.update_cart_item(item_id, quantity, session['user_id'],
+                                           _expected_version(request.form.get('version')),
+                                           _line_key(request.form))
     
     if request.is_json:
-        return jsonify(result)
+        return jsonify(result), 409 if result.get('conflict') else 200
     
-    flash(result['message'], 'success' if result['success'] else 'danger')
+    flash(result['message'], 'success' if result['success'] else 'warning' if result.get('conflict') else 'danger')
     return redirect(url_for('cart.view_cart'))
 
 
@@ -73,15 +96,52 @@ def update_item(item_id):
 @login_required
 def remove_item(item_id):
     """Remove item from cart."""
-    result = cart_service.remove_from_cart(item_id)
+    result = cart_service.remove_from_cart(item_id, session['user_id'],
+                                           _expected_version(request.form.get('version')),
+                                           _line_key(request.form))
     
     if request.is_json:
-        return jsonify(result)
+        return jsonify(result), 409 if result.get('conflict') else 200
     
     flash(result['message'], 'success' if result['success'] else 'danger')
     return redirect(url_for('cart.view_cart'))
 
 
+@cart_bp.route('/ops', methods=['POST'])
+@login_required
+def cart_ops():
+    """Apply several cart operations in one request and one transaction.
+    
+    Request JSON:
+    {
+        "version": 12,
+        "ops": [
+            {"op": "update", "item_id": 3, "quantity": 2},
+            {"op": "remove", "product_id": 4, "size": "M"},
+            {"op": "add", "product_id": 1, "product_name": "Product Name", "price": 1299.99,
+             "product_image": "image.jpg", "quantity": 1, "size": "M"},
+            {"op": "apply-coupon", "coupon_code": "SAVE10"}
+        ]
+    }
+    update/remove name a line by item_id or by product_id and size (which
+    stays valid when a hot cart's line ids change on release).
+    version (optional) is the cart version the page shows; 409 if the cart has moved on.
+    """
+    data = request.get_json(silent=True) or {}
+    ops = data.get('ops')
+    
+    if not ops or not isinstance(ops, list):
+        return jsonify({
+            'success': False,
+            'message': 'Invalid ops format. Expected list of operations.'
+        }), 400
+    
+    result = cart_service.apply_cart_ops(session['user_id'], ops, _expected_version(data.get('version')))
+    if result.get('conflict'):
+        return jsonify(result), 409
+    return jsonify(result), 200 if result['success'] else 400
+
+
 @cart_bp.route('/clear', methods=['POST'])
 @login_required
 def clear_cart():
@@ -95,9 +155,9 @@ def clear_cart():
 @login_required
 def checkout():
     """Checkout page."""
-    cart = cart_service.get_user_cart(session['user_id'])
+    cart = cart_service.get_cart_view(session['user_id'])
     
-    if not cart.items.count():
+    if cart.is_empty:
         flash('Your cart is empty', 'warning')
         return redirect(url_for('shop'))
     
@@ -148,9 +208,9 @@ def process_checkout():
 
 @cart_bp.route('/order-success/<int:order_id>')
 @login_required
+@conditional_get(lambda order_id: OrderRepository.get_version(session['user_id'], order_id))
 def order_success(order_id):
     """Order success page."""
-    from repositories import OrderRepository
     order = OrderRepository.find_by_id(order_id)
     
     if not order or order.user_id != session['user_id']:
@@ -2,7 +2,7 @@
 User controller for customer dashboard and profile management.
 """
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from middleware import login_required
+from middleware import login_required, conditional_get
 from services import UserService
 from repositories import OrderRepository, AddressRepository
 
@@ -93,6 +93,7 @@ def change_password():
 
 @user_bp.route('/orders')
 @login_required
+@conditional_get(lambda: OrderRepository.get_version(session['user_id']))
 def orders():
     """View all user orders."""
     page = request.args.get('page', 1, type=int)
@@ -103,6 +104,7 @@ def orders():
 
 @user_bp.route('/orders/<int:order_id>')
 @login_required
+@conditional_get(lambda order_id: OrderRepository.get_version(session['user_id'], order_id))
 def order_detail(order_id):
     """View order details."""
     order = OrderRepository.find_by_id(order_id)
@@ -2,6 +2,7 @@ from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
 import os
 import math
 import random
+import numpy as np
 
 # Create images directory if it doesn't exist
 os.makedirs('static/images', exist_ok=True)
@@ -43,17 +44,11 @@ def create_tshirt_mockup(design_func, color='#ffffff'):
     # Collar (V-neck)
     draw.polygon([(180, 90), (200, 120), (220, 90)], fill='#e0e0e0', outline='#cccccc', width=1)
     
-    # Add shadows for depth
-    shadow_overlay = Image.new('RGBA', (WIDTH, HEIGHT), (0, 0, 0, 0))
-    shadow_draw = ImageDraw.Draw(shadow_overlay)
-    
-    # Side shadows
-    for x in range(120, 135):
-        alpha = int((135 - x) * 3)
-        shadow_draw.line([(x, 140), (x, 450)], fill=(0, 0, 0, alpha))
-    for x in range(265, 280):
-        alpha = int((x - 265) * 3)
-        shadow_draw.line([(x, 140), (x, 450)], fill=(0, 0, 0, alpha))
+    # Add shadows for depth - side shadows fade in towards each seam
+    shadow = np.zeros((HEIGHT, WIDTH, 4), dtype=np.uint8)
+    shadow[140:451, 120:135, 3] = (135 - np.arange(120, 135)) * 3
+    shadow[140:451, 265:280, 3] = (np.arange(265, 280) - 265) * 3
+    shadow_overlay = Image.fromarray(shadow, 'RGBA')
     
     img = Image.alpha_composite(img.convert('RGBA'), shadow_overlay).convert('RGB')
     
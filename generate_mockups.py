@@ -1,7 +1,15 @@
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageColor, ImageEnhance
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import functools
+import hashlib
+import json
 import os
 import math
 import random
+import tempfile
+import time
+import numpy as np
 
 # Create mockups directory
 os.makedirs('static/images/mockups', exist_ok=True)
@@ -9,6 +17,35 @@ os.makedirs('static/images/mockup_templates', exist_ok=True)
 
 WIDTH, HEIGHT = 1400, 1600  # Increased resolution for better quality
 
+# Bump whenever the rendering pipeline changes so every mockup is rebuilt
+GENERATOR_VERSION = 3
+MOCKUP_OUTPUT_DIR = 'static/images/mockups'
+MOCKUP_TEMPLATE_DIR = 'static/images/mockup_templates'
+MOCKUP_MANIFEST_PATH = os.path.join(MOCKUP_OUTPUT_DIR, '.build_manifest.json')
+
+# Garment base layers are lit in this grey; colour variants scale from it
+REFERENCE_GREY = 200
+BASE_LAYER_SEED = 1010
+
+# Procedural textures are seeded so they can be cached on disk
+TEXTURE_SEED = 1010
+TEXTURE_CACHE_DIR = os.path.join(MOCKUP_TEMPLATE_DIR, 'textures')
+
+# Responsive widths written next to every mockup as <name>-<width>w.{jpg,webp}
+DERIVATIVE_WIDTHS = (400, 800)
+
+# Catalog colour names (see cart_controller.product_detail) to garment hex
+GARMENT_COLORS = {
+    'black': '#1c1c1c',
+    'white': '#f7f7f5',
+    'grey': '#8e8e8e',
+    'charcoal': '#36454f',
+    'navy': '#1f2a44',
+    'navy blue': '#1f2a44',
+    'sand': '#d8c7a3',
+    'olive': '#6b6b3a',
+}
+
 def get_font(size):
     """Get font with fallback"""
     try:
@@ -19,40 +56,67 @@ def get_font(size):
         except:
             return ImageFont.load_default()
 
-def create_premium_fabric_texture(width, height, base_color):
+def write_cache_file(path, write):
+    """
+    Publish a cache file through a private temp file in the same directory, so
+    parallel workers rendering the same cold cache never share a temp path.
+    Another worker may publish the same file first; the last identical copy wins.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def load_cached_texture(kind, size, color, seed, render):
+    """Return a deterministic texture from the disk cache, rendering it on a miss"""
+    width, height = size
+    color_key = color.lstrip('#').lower().replace(' ', '_')
+    cache_path = os.path.join(
+        TEXTURE_CACHE_DIR, f"{kind}_{width}x{height}_{color_key}_{seed}_v{GENERATOR_VERSION}.png"
+    )
+    if os.path.exists(cache_path):
+        with Image.open(cache_path) as cached:
+            return cached.convert('RGB')
+    
+    img = render()
+    write_cache_file(cache_path, lambda f: img.save(f, 'PNG'))
+    return img
+
+def create_premium_fabric_texture(width, height, base_color, seed=TEXTURE_SEED):
     """Create ultra-realistic premium fabric texture with fine weave pattern"""
-    img = Image.new('RGB', (width, height), base_color)
-    pixels = img.load()
-    
-    r_base, g_base, b_base = ImageColor.getrgb(base_color)
-    
-    # Create fine fabric weave with multiple layers
-    for i in range(width):
-        for j in range(height):
-            # Micro weave pattern
-            weave1 = math.sin(i * 0.3) * math.cos(j * 0.3) * 2
-            weave2 = math.sin(i * 0.8) * math.cos(j * 0.8) * 1.5
-            # Fabric grain texture
-            grain = (math.sin(i * 0.1) + math.cos(j * 0.1)) * 1.5
-            # Random fiber variation
-            noise = random.randint(-5, 5)
-            
-            variation = weave1 + weave2 + grain + noise
-            
-            pixels[i, j] = (
-                max(0, min(255, r_base + int(variation))),
-                max(0, min(255, g_base + int(variation))),
-                max(0, min(255, b_base + int(variation)))
-            )
-    
-    # Apply subtle blur for soft cotton/fleece texture
-    img = img.filter(ImageFilter.GaussianBlur(radius=0.3))
-    
-    # Enhance contrast slightly for depth
-    enhancer = ImageEnhance.Contrast(img)
-    img = enhancer.enhance(1.05)
+    def render():
+        rng = np.random.default_rng(seed)
+        i = np.arange(width, dtype=np.float32)[None, :]
+        j = np.arange(height, dtype=np.float32)[:, None]
+        
+        # Micro weave pattern
+        weave1 = np.sin(i * 0.3) * np.cos(j * 0.3) * 2
+        weave2 = np.sin(i * 0.8) * np.cos(j * 0.8) * 1.5
+        # Fabric grain texture
+        grain = (np.sin(i * 0.1) + np.cos(j * 0.1)) * 1.5
+        # Random fiber variation
+        noise = rng.integers(-5, 6, size=(height, width))
+        
+        variation = np.trunc(weave1 + weave2 + grain + noise).astype(np.int16)
+        base = np.array(ImageColor.getrgb(base_color), dtype=np.int16)
+        pixels = np.clip(base + variation[..., None], 0, 255).astype(np.uint8)
+        img = Image.fromarray(pixels, 'RGB')
+        
+        # Apply subtle blur for soft cotton/fleece texture
+        img = img.filter(ImageFilter.GaussianBlur(radius=0.3))
+        
+        # Enhance contrast slightly for depth
+        return ImageEnhance.Contrast(img).enhance(1.05)
     
-    return img
+    return load_cached_texture('fabric', (width, height), base_color, seed, render)
 
 def add_realistic_fabric_folds(img, garment_area):
     """Add professional fabric folds and natural wrinkles"""
@@ -87,36 +151,33 @@ def add_realistic_fabric_folds(img, garment_area):
     overlay = overlay.filter(ImageFilter.GaussianBlur(radius=4))
     return overlay
 
-def create_studio_background_premium(width, height):
+def create_studio_background_premium(width, height, seed=TEXTURE_SEED):
     """Create professional photography studio background with soft lighting"""
-    img = Image.new('RGB', (width, height), 'white')
-    pixels = img.load()
-    
-    # Create soft radial gradient
-    center_x, center_y = width // 2, height // 3
-    max_radius = math.sqrt(width**2 + height**2)
-    
-    for y in range(height):
-        for x in range(width):
-            distance = math.sqrt((x - center_x)**2 + (y - center_y)**2)
-            ratio = distance / max_radius
-            
-            # Very subtle gradient for professional look
-            brightness = int(250 - (ratio * 35))
-            brightness = max(230, min(255, brightness))
-            
-            # Slight warm tone for natural look
-            pixels[x, y] = (brightness, brightness, min(255, brightness + 2))
-    
-    # Apply very subtle noise for texture
-    for _ in range(width * height // 100):
-        x, y = random.randint(0, width-1), random.randint(0, height-1)
-        current = pixels[x, y]
-        variation = random.randint(-3, 3)
-        pixels[x, y] = tuple(max(0, min(255, c + variation)) for c in current)
+    def render():
+        rng = np.random.default_rng(seed)
+        
+        # Create soft radial gradient
+        center_x, center_y = width // 2, height // 3
+        max_radius = math.sqrt(width**2 + height**2)
+        x = np.arange(width, dtype=np.float64)[None, :]
+        y = np.arange(height, dtype=np.float64)[:, None]
+        ratio = np.sqrt((x - center_x)**2 + (y - center_y)**2) / max_radius
+        
+        # Very subtle gradient for professional look
+        brightness = np.clip(np.floor(250 - ratio * 35), 230, 255).astype(np.int16)
+        
+        # Slight warm tone for natural look
+        pixels = np.stack([brightness, brightness, np.minimum(255, brightness + 2)], axis=-1)
+        
+        # Apply very subtle noise for texture
+        flat = pixels.reshape(-1, 3)
+        count = width * height // 100
+        np.add.at(flat, rng.integers(0, width * height, count), rng.integers(-3, 4, count)[:, None])
+        
+        img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), 'RGB')
+        return img.filter(ImageFilter.GaussianBlur(radius=0.5))
     
-    img = img.filter(ImageFilter.GaussianBlur(radius=0.5))
-    return img
+    return load_cached_texture('studio', (width, height), 'white', seed, render)
 
 def add_drop_shadow(img, garment_area, intensity=40):
     """Add realistic drop shadow beneath garment"""
@@ -379,201 +440,378 @@ def draw_realistic_hoodie_with_shadows(draw, img, center_x, center_y, color, wid
     
     return (center_x - width//3.8, center_y - height//6)
 
-def apply_design_to_garment(img, design, position, size, curvature=0.03):
-    """Apply design with realistic perspective, curvature, and fabric integration"""
+# Garment type -> (drawing function, printed design size)
+GARMENT_RENDERERS = {
+    'tshirt': (draw_realistic_tshirt_with_shadows, (380, 380)),
+    'hoodie': (draw_realistic_hoodie_with_shadows, (400, 400)),
+}
+
+def prepare_design(design, size):
+    """Resize a design and shade it to sit on fabric - done once per design"""
     design_resized = design.resize(size, Image.Resampling.LANCZOS)
+    pixels = np.asarray(design_resized, dtype=np.float32)
     
-    # Create design with subtle curvature
-    curved_design = Image.new('RGBA', design_resized.size, (0, 0, 0, 0))
+    # Slight lighting variation down the print to match the fabric's curvature
+    progress = np.arange(design_resized.height, dtype=np.float32) / design_resized.height
+    light_factor = 1.0 + np.sin(progress * math.pi) * 0.08
     
-    for y in range(design_resized.height):
-        progress = y / design_resized.height
-        # Subtle barrel distortion for fabric curvature
-        curve_offset = int(math.sin(progress * math.pi) * size[0] * curvature)
-        
-        for x in range(design_resized.width):
-            try:
-                pixel = design_resized.getpixel((x, y))
-                if pixel[3] > 0:  # Not transparent
-                    # Slight lighting variation to match fabric
-                    light_factor = 1.0 + (math.sin(progress * math.pi) * 0.08)
-                    new_pixel = (
-                        int(min(255, pixel[0] * light_factor)),
-                        int(min(255, pixel[1] * light_factor)),
-                        int(min(255, pixel[2] * light_factor)),
-                        pixel[3]
-                    )
-                    curved_design.putpixel((x, y), new_pixel)
-            except:
-                pass
+    shaded = pixels.copy()
+    shaded[..., :3] = np.minimum(255, pixels[..., :3] * light_factor[:, None, None])
+    shaded[pixels[..., 3] == 0] = 0
+    curved_design = Image.fromarray(shaded.astype(np.uint8), 'RGBA')
     
     # Subtle edge blur for print integration
-    curved_design = curved_design.filter(ImageFilter.GaussianBlur(radius=0.2))
+    return curved_design.filter(ImageFilter.GaussianBlur(radius=0.2))
+
+def apply_design_to_garment(img, design, position, size):
+    """Apply design with fabric lighting and print integration"""
+    curved_design = prepare_design(design, size)
     
     # Apply design to garment
+    position = tuple(int(c) for c in position)
     img.paste(curved_design, position, curved_design)
     
     return img
 
-def add_floor_shadow(img):
-    """Add realistic floor/surface shadow"""
-    shadow = Image.new('RGBA', img.size, (0, 0, 0, 0))
+def create_floor_shadow_layer(size):
+    """Create the elliptical floor/surface shadow as an RGBA layer"""
+    shadow = Image.new('RGBA', size, (0, 0, 0, 0))
     draw = ImageDraw.Draw(shadow)
     
     # Elliptical shadow at bottom
     shadow_rect = [WIDTH // 4, HEIGHT - 200, WIDTH * 3 // 4, HEIGHT - 50]
     draw.ellipse(shadow_rect, fill=(0, 0, 0, 25))
     
-    shadow = shadow.filter(ImageFilter.GaussianBlur(radius=50))
+    return shadow.filter(ImageFilter.GaussianBlur(radius=50))
+
+def add_floor_shadow(img):
+    """Add realistic floor/surface shadow"""
+    shadow = create_floor_shadow_layer(img.size)
     img.paste(shadow, (0, 0), shadow)
     
     return img
 
-def create_professional_mockup(design_path, output_path, product_type='tshirt', garment_color='#ffffff'):
-    """
-    Create ultra-realistic product mockup with studio lighting
-    """
-    print(f"  🎨 Rendering {product_type} in {garment_color}...")
-    
-    # Create professional studio background
-    img = create_studio_background_premium(WIDTH, HEIGHT)
-    draw = ImageDraw.Draw(img)
-    
-    # Load design
-    try:
-        design = Image.open(design_path).convert('RGBA')
-    except Exception as e:
-        print(f"  ❌ Error loading design: {e}")
-        return
-    
+def create_vignette_layer(size):
+    """Create the subtle edge vignette as an RGBA layer"""
+    width, height = size
+    x = np.arange(width)[None, :]
+    y = np.arange(height)[:, None]
+    
+    # Ring i of the vignette sits i pixels in from the edge
+    inset = np.minimum(np.minimum(x, width - x), np.minimum(y, height - y))
+    alpha = np.where(inset < 80, ((inset / 80) ** 2 * 40).astype(np.uint8), 0).astype(np.uint8)
+    
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    pixels[..., 3] = alpha
+    vignette = Image.fromarray(pixels, 'RGBA')
+    return vignette.filter(ImageFilter.GaussianBlur(radius=50))
+
+def resolve_garment_color(color):
+    """Map catalog colour names ('Navy Blue') to hex, pass hex through"""
+    return GARMENT_COLORS.get(color.strip().lower(), color)
+
+def _render_garment_base_layer(product_type):
+    """Render studio, garment lighting and shadows once, in neutral grey"""
+    draw_garment, design_size = GARMENT_RENDERERS[product_type]
     center_x, center_y = WIDTH // 2, HEIGHT // 2
+    reference = '#{0:02x}{0:02x}{0:02x}'.format(REFERENCE_GREY)
+    
+    # Lit scene: background, garment in reference grey, folds, drop shadow
+    random.seed(BASE_LAYER_SEED)
+    lit = create_studio_background_premium(WIDTH, HEIGHT)
+    design_position = draw_garment(ImageDraw.Draw(lit), lit, center_x, center_y, reference)
+    
+    # Silhouette: the same garment in white on black, thresholded
+    silhouette = Image.new('RGB', (WIDTH, HEIGHT), 'black')
+    draw_garment(ImageDraw.Draw(silhouette), silhouette, center_x, center_y, '#ffffff')
+    mask = np.asarray(silhouette.convert('L')) > 128
+    
+    # Floor shadow and vignette sit on top of the design, so keep them separate
+    overlay = Image.alpha_composite(create_floor_shadow_layer((WIDTH, HEIGHT)),
+                                    create_vignette_layer((WIDTH, HEIGHT)))
+    
+    return {
+        'background': np.asarray(lit),
+        'shading': np.asarray(lit.convert('L'), dtype=np.float32) / REFERENCE_GREY,
+        'mask': mask,
+        'overlay': overlay,
+        'design_position': tuple(int(c) for c in design_position),
+        'design_size': design_size,
+    }
+
+@functools.lru_cache(maxsize=None)
+def get_garment_base_layer(product_type):
+    """Base layer for a garment type, from memory, disk cache or a fresh render"""
+    cache_path = os.path.join(MOCKUP_TEMPLATE_DIR, f"{product_type}_base_v{GENERATOR_VERSION}.npz")
     
-    # Draw garment based on type
-    if product_type == 'hoodie':
-        design_position = draw_realistic_hoodie_with_shadows(draw, img, center_x, center_y, garment_color)
-        design_size = (400, 400)
-    else:  # tshirt
-        design_position = draw_realistic_tshirt_with_shadows(draw, img, center_x, center_y, garment_color)
-        design_size = (380, 380)
-    
-    # Apply design to garment with realism
-    img = apply_design_to_garment(img, design, design_position, design_size, curvature=0.03)
-    
-    # Add floor shadow
-    img = add_floor_shadow(img)
-    
-    # Add subtle vignette
-    vignette = Image.new('RGBA', img.size, (0, 0, 0, 0))
-    vignette_draw = ImageDraw.Draw(vignette)
-    for i in range(80):
-        alpha = int((i / 80) ** 2 * 40)
-        vignette_draw.rectangle([i, i, WIDTH - i, HEIGHT - i], outline=(0, 0, 0, alpha))
-    vignette = vignette.filter(ImageFilter.GaussianBlur(radius=50))
-    img.paste(vignette, (0, 0), vignette)
+    try:
+        with np.load(cache_path) as cached:
+            return {
+                'background': cached['background'],
+                'shading': cached['shading'],
+                'mask': cached['mask'],
+                'overlay': Image.fromarray(cached['overlay'], 'RGBA'),
+                'design_position': tuple(int(c) for c in cached['design_position']),
+                'design_size': tuple(int(c) for c in cached['design_size']),
+            }
+    except (OSError, KeyError, ValueError):
+        pass
+    
+    print(f"  🧵 Rendering {product_type} base layer...")
+    base = _render_garment_base_layer(product_type)
+    write_cache_file(cache_path, lambda f: np.savez_compressed(
+        f,
+        background=base['background'],
+        shading=base['shading'],
+        mask=base['mask'],
+        overlay=np.asarray(base['overlay']),
+        design_position=np.array(base['design_position']),
+        design_size=np.array(base['design_size']),
+    ))
+    return base
+
+def render_colour_variant(base, prepared_design, garment_color):
+    """Recolour the cached garment and composite the design - one pass per colour"""
+    rgb = np.array(ImageColor.getrgb(resolve_garment_color(garment_color)), dtype=np.float32)
+    garment = np.clip(base['shading'][..., None] * rgb, 0, 255).astype(np.uint8)
+    img = Image.fromarray(np.where(base['mask'][..., None], garment, base['background']), 'RGB')
     
-    # Final image enhancements
-    img = img.convert('RGB')
+    img.paste(prepared_design, base['design_position'], prepared_design)
+    img.paste(base['overlay'], (0, 0), base['overlay'])
     
     # Enhance contrast slightly
-    enhancer = ImageEnhance.Contrast(img)
-    img = enhancer.enhance(1.08)
+    img = ImageEnhance.Contrast(img).enhance(1.08)
     
     # Enhance sharpness
-    enhancer = ImageEnhance.Sharpness(img)
-    img = enhancer.enhance(1.15)
+    img = ImageEnhance.Sharpness(img).enhance(1.15)
     
     # Subtle color enhancement
-    enhancer = ImageEnhance.Color(img)
-    img = enhancer.enhance(1.05)
-    
-    # Save high-quality output
-    img.save(output_path, 'JPEG', quality=95, optimize=True)
-    print(f"  ✅ Saved: {output_path}")
-
-def generate_all_mockups():
-    """Generate realistic mockups for all designs"""
-    
-    products = [
-        {
-            'name': 'Tanjore Temple',
-            'design': 'static/images/tanjore1.jpg',
-            'garment': 'tshirt',
-            'color': '#F5F5DC'  # Beige
-        },
-        {
-            'name': 'ISRO Space',
-            'design': 'static/images/isro1.jpg',
-            'garment': 'hoodie',
-            'color': '#1a1a2e'  # Dark navy
-        },
-        {
-            'name': 'Gateway of India',
-            'design': 'static/images/gateway1.jpg',
-            'garment': 'tshirt',
-            'color': '#E8DCC4'  # Sand
-        },
-        {
-            'name': 'Hampi Ruins',
-            'design': 'static/images/hampi1.jpg',
-            'garment': 'tshirt',
-            'color': '#E8998D'  # Terracotta
-        },
-        {
-            'name': 'Mysore Palace',
-            'design': 'static/images/mysore1.jpg',
-            'garment': 'tshirt',
-            'color': '#FFF8DC'  # Cream
-        },
-        {
-            'name': 'Konark Sun Temple',
-            'design': 'static/images/konark1.jpg',
-            'garment': 'tshirt',
-            'color': '#D2B48C'  # Tan
-        },
-        {
-            'name': 'Lotus Temple',
-            'design': 'static/images/lotus1.jpg',
-            'garment': 'hoodie',
-            'color': '#FFFFFF'  # White
-        },
-        {
-            'name': 'Meenakshi Temple',
-            'design': 'static/images/meenakshi1.jpg',
-            'garment': 'tshirt',
-            'color': '#FFD700'  # Gold
-        },
-        {
-            'name': 'Indian Railways',
-            'design': 'static/images/railways1.jpg',
-            'garment': 'hoodie',
-            'color': '#8B4513'  # Saddle Brown
-        }
-    ]
+    return ImageEnhance.Color(img).enhance(1.05)
+
+def create_colour_variants(design_path, variants, product_type='tshirt'):
+    """
+    Render one design in several garment colours.
+    variants is a list of (garment_color, output_path); returns the paths written.
+    """
+    try:
+        design = Image.open(design_path).convert('RGBA')
+    except Exception as e:
+        print(f"  ❌ Error loading design: {e}")
+        return []
+    
+    base = get_garment_base_layer(product_type)
+    prepared = prepare_design(design, base['design_size'])
+    
+    written = []
+    for garment_color, output_path in variants:
+        print(f"  🎨 Rendering {product_type} in {garment_color}...")
+        img = render_colour_variant(base, prepared, garment_color)
+        img.save(output_path, 'JPEG', quality=95, optimize=True)
+        print(f"  ✅ Saved: {output_path}")
+        written.append(output_path)
+    return written
+
+def create_image_derivatives(image_path, widths=DERIVATIVE_WIDTHS):
+    """Write downscaled JPEG and WebP copies of an image; returns the paths written"""
+    stem, _ = os.path.splitext(image_path)
+    written = []
+    
+    with Image.open(image_path) as source:
+        source = source.convert('RGB')
+        for width in widths:
+            if width >= source.width:
+                continue
+            height = round(source.height * width / source.width)
+            resized = source.resize((width, height), Image.Resampling.LANCZOS)
+            
+            jpeg_path = f"{stem}-{width}w.jpg"
+            resized.save(jpeg_path, 'JPEG', quality=85, optimize=True, progressive=True)
+            webp_path = f"{stem}-{width}w.webp"
+            resized.save(webp_path, 'WEBP', quality=80, method=6)
+            written.extend([jpeg_path, webp_path])
+    
+    return written
+
+def create_professional_mockup(design_path, output_path, product_type='tshirt', garment_color='#ffffff'):
+    """
+    Create ultra-realistic product mockup with studio lighting
+    """
+    return bool(create_colour_variants(design_path, [(garment_color, output_path)], product_type))
+
+MOCKUP_PRODUCTS = [
+    {
+        'name': 'Tanjore Temple',
+        'design': 'static/images/tanjore1.jpg',
+        'garment': 'tshirt',
+        'color': '#F5F5DC',  # Beige
+        'variants': ['Black', 'Navy Blue', 'White']
+    },
+    {
+        'name': 'ISRO Space',
+        'design': 'static/images/isro1.jpg',
+        'garment': 'hoodie',
+        'color': '#1a1a2e',  # Dark navy
+        'variants': ['Black', 'Grey', 'Navy']
+    },
+    {
+        'name': 'Gateway of India',
+        'design': 'static/images/gateway1.jpg',
+        'garment': 'tshirt',
+        'color': '#E8DCC4'  # Sand
+    },
+    {
+        'name': 'Hampi Ruins',
+        'design': 'static/images/hampi1.jpg',
+        'garment': 'tshirt',
+        'color': '#E8998D',  # Terracotta
+        'variants': ['Sand', 'Olive', 'Charcoal']
+    },
+    {
+        'name': 'Mysore Palace',
+        'design': 'static/images/mysore1.jpg',
+        'garment': 'tshirt',
+        'color': '#FFF8DC',  # Cream
+        'variants': ['Black', 'White', 'Navy']
+    },
+    {
+        'name': 'Konark Sun Temple',
+        'design': 'static/images/konark1.jpg',
+        'garment': 'tshirt',
+        'color': '#D2B48C'  # Tan
+    },
+    {
+        'name': 'Lotus Temple',
+        'design': 'static/images/lotus1.jpg',
+        'garment': 'hoodie',
+        'color': '#FFFFFF'  # White
+    },
+    {
+        'name': 'Meenakshi Temple',
+        'design': 'static/images/meenakshi1.jpg',
+        'garment': 'tshirt',
+        'color': '#FFD700'  # Gold
+    },
+    {
+        'name': 'Indian Railways',
+        'design': 'static/images/railways1.jpg',
+        'garment': 'hoodie',
+        'color': '#8B4513'  # Saddle Brown
+    }
+]
+
+def mockup_output_path(product, variant=None):
+    """Output path for a product's mockup, optionally for a colour variant"""
+    output_filename = f"{product['name'].lower().replace(' ', '_')}_{product['garment']}"
+    if variant:
+        output_filename += '_' + variant.lower().replace(' ', '_')
+    return f"{MOCKUP_OUTPUT_DIR}/{output_filename}.jpg"
+
+def mockup_variants(product):
+    """(colour, output path) pairs for a product's main colour and catalog variants"""
+    variants = [(product['color'], mockup_output_path(product))]
+    for variant in product.get('variants', []):
+        variants.append((variant, mockup_output_path(product, variant)))
+    return variants
+
+def mockup_content_hash(design_path, garment, color):
+    """Hash everything that determines a mockup's pixels"""
+    digest = hashlib.sha256()
+    with open(design_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    digest.update(f"|{garment}|{color.lower()}|v{GENERATOR_VERSION}".encode())
+    return digest.hexdigest()
+
+def load_mockup_manifest(path=MOCKUP_MANIFEST_PATH):
+    """Load the build manifest mapping output paths to content hashes"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_mockup_manifest(manifest, path=MOCKUP_MANIFEST_PATH):
+    """Atomically write the build manifest"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _render_mockup_job(job):
+    """Process pool entry point - render the stale colours of one design"""
+    written = set(create_colour_variants(
+        job['design'],
+        [(variant['color'], variant['output']) for variant in job['variants']],
+        job['garment']
+    ))
+    for output_path in written:
+        create_image_derivatives(output_path)
+    return [(variant['output'], variant['hash'] if variant['output'] in written else None)
+            for variant in job['variants']]
+
+def generate_all_mockups(force=False, workers=None):
+    """Generate realistic mockups for all designs, rebuilding only stale outputs"""
+    started = time.perf_counter()
     
     print("\n" + "=" * 60)
     print("🎨 GENERATING ULTRA-REALISTIC PRODUCT MOCKUPS")
     print("=" * 60)
     
-    for i, product in enumerate(products, 1):
-        output_filename = f"{product['name'].lower().replace(' ', '_')}_{product['garment']}.jpg"
-        output_path = f"static/images/mockups/{output_filename}"
-        
-        print(f"\n[{i}/{len(products)}] {product['name']} ({product['garment'].upper()})")
+    manifest = load_mockup_manifest()
+    stale_jobs = []
+    total_outputs = 0
+    
+    for i, product in enumerate(MOCKUP_PRODUCTS, 1):
+        print(f"\n[{i}/{len(MOCKUP_PRODUCTS)}] {product['name']} ({product['garment'].upper()})")
         
-        if os.path.exists(product['design']):
-            create_professional_mockup(
-                product['design'],
-                output_path,
-                product['garment'],
-                product['color']
-            )
-        else:
+        if not os.path.exists(product['design']):
             print(f"  ❌ Design not found: {product['design']}")
+            continue
+        
+        stale_variants = []
+        for color, output_path in mockup_variants(product):
+            total_outputs += 1
+            content_hash = mockup_content_hash(product['design'], product['garment'], color)
+            if not force and manifest.get(output_path) == content_hash and os.path.exists(output_path):
+                print(f"  ⏭️  Up to date: {output_path}")
+                continue
+            print(f"  🕒 Queued: {output_path}")
+            stale_variants.append({'color': color, 'output': output_path, 'hash': content_hash})
+        
+        if stale_variants:
+            stale_jobs.append({
+                'design': product['design'],
+                'garment': product['garment'],
+                'variants': stale_variants,
+            })
+    
+    rendered = 0
+    if stale_jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_render_mockup_job, job) for job in stale_jobs]
+            for future, job in zip(futures, stale_jobs):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"  ❌ Failed to render {job['design']}: {e}")
+                    results = [(variant['output'], None) for variant in job['variants']]
+                for output_path, content_hash in results:
+                    if content_hash:
+                        manifest[output_path] = content_hash
+                        rendered += 1
+                    else:
+                        manifest.pop(output_path, None)
+        save_mockup_manifest(manifest)
     
     print("\n" + "=" * 60)
-    print("✨ All mockups generated successfully!")
-    print(f"📁 Location: static/images/mockups/")
+    print(f"✨ Mockups ready: {rendered} rendered, "
+          f"{total_outputs - rendered} skipped or failed in {time.perf_counter() - started:.2f}s")
+    print(f"📁 Location: {MOCKUP_OUTPUT_DIR}/")
     print("=" * 60 + "\n")
 
 if __name__ == '__main__':
-    generate_all_mockups()
+    parser = argparse.ArgumentParser(description='Generate product mockups')
+    parser.add_argument('--force', action='store_true', help='Re-render every mockup')
+    parser.add_argument('--workers', type=int, default=None, help='Render processes (default: CPU count)')
+    args = parser.parse_args()
+    generate_all_mockups(force=args.force, workers=args.workers)
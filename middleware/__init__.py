@@ -3,7 +3,7 @@ Middleware decorators for authentication and authorization.
 Implements decorator pattern for route protection.
 """
 from functools import wraps
-from flask import session, redirect, url_for, flash, request
+from flask import session, redirect, url_for, flash, request, current_app, make_response, g
 
 
 def login_required(f):
@@ -57,3 +57,76 @@ def guest_only(f):
             return redirect(url_for('admin.dashboard'))
         return f(*args, **kwargs)
     return decorated_function
+
+
+def cache_page(f):
+    """
+    Decorator to serve a public page from the compressed page cache.
+    Pages are shared per variant (anonymous, user, admin); per-person details
+    such as the username and cart badge are filled in by main.js from the
+    cart_state/display_name cookies (or /api/session as a fallback).
+    Only one request per page renders at a time; the rest wait for it or get
+    the previous copy (see PageCache.get_or_render).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method != 'GET' or not current_app.config.get('PAGE_CACHE_ENABLED', True):
+            return f(*args, **kwargs)
+
+        from services.page_cache import page_cache, cached_response, CachedPage
+        from services.http_cache import visitor_variant
+        g.shared_page = True  # Templates leave per-user header data to main.js
+        key = page_cache.make_key(request.endpoint, request.query_string,
+                                  current_app.config.get('CATALOG_VERSION', ''), visitor_variant())
+        result = page_cache.get_or_render(key, lambda: make_response(f(*args, **kwargs)))
+        if result is None:
+            return f(*args, **kwargs)
+        if isinstance(result, CachedPage):
+            return cached_response(result)
+        return result
+    return decorated_function
+
+
+def conditional_get(version_func=None, variant=False):
+    """
+    Decorator adding a strong ETag and answering If-None-Match with 304
+    before the view renders anything.
+    version_func(**view_kwargs) returns a version string for the data the
+    response shows (cart, orders); the catalog and release are always included.
+    variant=True separates anonymous/user/admin renders of public pages.
+    Place below login_required so the session is already checked.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            from services.http_cache import make_etag, matching_etag, visitor_variant
+
+            def current_etag():
+                return make_etag(
+                    version_func(**kwargs) if version_func else '',
+                    visitor_variant() if variant else ''
+                )
+
+            etag = current_etag()
+            matched = matching_etag(etag)
+            if matched:
+                response = current_app.response_class(status=304)
+                response.set_etag(matched)
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                if version_func:
+                    # The view may have changed what it shows (e.g. created an empty cart)
+                    etag = current_etag()
+                encoding = response.headers.get('Content-Encoding')
+                response.set_etag(f'{etag}-{encoding}' if encoding else etag)
+                if version_func and not response.cache_control.public:
+                    response.cache_control.private = True
+                    response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
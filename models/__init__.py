@@ -191,13 +191,19 @@ class Cart(db.Model):
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
                           onupdate=lambda: datetime.now(timezone.utc))
     
+    # Denormalized aggregates, kept current by CartItemRepository in the same
+    # transaction as each item change; version increments on every change
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     items = db.relationship('CartItem', backref='cart', lazy='dynamic', cascade='all, delete-orphan')
     
     def get_total(self) -> float:
-        return sum(item.get_subtotal() for item in self.items)
+        return self.total or 0.0
     
     def get_item_count(self) -> int:
-        return sum(item.quantity for item in self.items)
+        return self.item_count or 0
     
     def __repr__(self):
         return f'<Cart {self.id}>'
@@ -207,6 +213,10 @@ class CartItem(db.Model):
     """Cart item model."""
     
     __tablename__ = 'cart_items'
+    # One row per product and size; adding again increases the quantity
+    __table_args__ = (
+        db.UniqueConstraint('cart_id', 'product_id', 'size', name='uq_cart_items_cart_product_size'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     cart_id = db.Column(db.Integer, db.ForeignKey('carts.id'), nullable=False)
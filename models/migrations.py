@@ -0,0 +1,99 @@
+"""
+In-place schema upgrades for existing databases.
+db.create_all() only creates missing tables, so columns and unique indexes
+added to existing models are added here (columns with ALTER TABLE and a
+backfill, indexes after merging rows that would violate them). Every step
+checks the live schema first, so running it on each start is cheap and
+idempotent.
+"""
+from typing import List
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+# (table, column, column DDL, backfill SQL run once when the column is added)
+SCHEMA_UPGRADES = [
+    ('carts', 'item_count', 'INTEGER NOT NULL DEFAULT 0',
+     'UPDATE carts SET item_count = (SELECT COALESCE(SUM(quantity), 0) '
+     'FROM cart_items WHERE cart_items.cart_id = carts.id)'),
+    ('carts', 'total', 'FLOAT NOT NULL DEFAULT 0',
+     'UPDATE carts SET total = (SELECT ROUND(COALESCE(SUM(price * quantity), 0), 2) '
+     'FROM cart_items WHERE cart_items.cart_id = carts.id)'),
+    ('carts', 'version', 'INTEGER NOT NULL DEFAULT 0', None),
+]
+
+# (table, index name, columns, SQL run first to remove rows the index would reject)
+UNIQUE_INDEX_UPGRADES = [
+    ('cart_items', 'uq_cart_items_cart_product_size', ('cart_id', 'product_id', 'size'), [
+        # Fold duplicate lines into the oldest one; cart aggregates are unchanged
+        'UPDATE cart_items SET quantity = (SELECT SUM(d.quantity) FROM cart_items d '
+        'WHERE d.cart_id = cart_items.cart_id AND d.product_id = cart_items.product_id '
+        "AND COALESCE(d.size, '') = COALESCE(cart_items.size, '')) "
+        'WHERE id IN (SELECT MIN(id) FROM cart_items '
+        'GROUP BY cart_id, product_id, size HAVING COUNT(*) > 1)',
+        'DELETE FROM cart_items WHERE id NOT IN (SELECT MIN(id) FROM cart_items '
+        'GROUP BY cart_id, product_id, size)',
+    ]),
+]
+
+
+def _already_exists(error: Exception) -> bool:
+    message = str(error).lower()
+    return 'duplicate column' in message or 'already exists' in message
+
+
+def upgrade_schema(engine=None) -> List[str]:
+    """
+    Add missing columns and unique indexes; returns the 'table.column' and
+    index names added.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    tables_needed = {upgrade[0] for upgrade in SCHEMA_UPGRADES + UNIQUE_INDEX_UPGRADES}
+    columns = {table: {c['name'] for c in inspector.get_columns(table)}
+               for table in tables_needed if table in tables}
+
+    added = []
+    for table, column, ddl, backfill in SCHEMA_UPGRADES:
+        if table not in columns or column in columns[table]:
+            continue
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+                if backfill:
+                    connection.execute(text(backfill))
+        except (OperationalError, ProgrammingError) as e:
+            # Another worker added it first
+            if not _already_exists(e):
+                raise
+            continue
+        added.append(f'{table}.{column}')
+        logger.info(f"Schema upgrade: added {table}.{column}")
+
+    for table, name, index_columns, cleanup in UNIQUE_INDEX_UPGRADES:
+        if table not in columns:
+            continue
+        existing = [tuple(c['column_names']) for c in inspector.get_unique_constraints(table)]
+        existing += [tuple(i['column_names']) for i in inspector.get_indexes(table) if i.get('unique')]
+        if tuple(index_columns) in existing:
+            continue
+        try:
+            with engine.begin() as connection:
+                for statement in cleanup:
+                    connection.execute(text(statement))
+                connection.execute(text(
+                    f'CREATE UNIQUE INDEX {name} ON {table} ({", ".join(index_columns)})'
+                ))
+        except (OperationalError, ProgrammingError) as e:
+            if not _already_exists(e):
+                raise
+            continue
+        added.append(name)
+        logger.info(f"Schema upgrade: added unique index {name}")
+    return added
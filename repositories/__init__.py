@@ -2,10 +2,96 @@
 Repository layer for data access operations.
 Implements Repository Pattern following SOLID principles.
 """
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
+from types import SimpleNamespace
+import hashlib
+from flask import g, has_app_context
+from sqlalchemy import case, delete, func, insert, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from models import db, User, Admin, Order, Address, Cart, CartItem, Payment
 
 
+def _upsert_insert(table):
+    """Dialect insert() supporting ON CONFLICT for the session's database, or None."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table)
+    if dialect == 'sqlite':
+        return sqlite.insert(table)
+    return None
+
+
+def _update_insert_cart_lines(lines: Dict[tuple, Dict[str, Any]], increment: bool) -> List[Dict[str, Any]]:
+    """
+    _upsert_cart_lines for databases without ON CONFLICT: one SELECT of the
+    lines the cart already has, one UPDATE ... CASE for those and one
+    multi-row INSERT for the rest. Returns the upsert's RETURNING rows.
+    """
+    cart_id = next(iter(lines.values()))['cart_id']
+    existing = {
+        (row.product_id, row.size): row for row in db.session.query(
+            CartItem.id, CartItem.product_id, CartItem.size, CartItem.quantity, CartItem.price
+        ).filter(CartItem.cart_id == cart_id, CartItem.product_id.in_({key[0] for key in lines}))
+        if (row.product_id, row.size) in lines
+    }
+    if existing:
+        quantity = case({row.id: lines[key]['quantity'] for key, row in existing.items()}, value=CartItem.id)
+        db.session.execute(
+            update(CartItem).where(CartItem.id.in_([row.id for row in existing.values()]))
+            .values(quantity=CartItem.quantity + quantity if increment else quantity)
+            .execution_options(synchronize_session=False)
+        )
+    added = [line for key, line in lines.items() if key not in existing]
+    if added:
+        db.session.execute(insert(CartItem).values(added))
+
+    rows = []
+    for key, line in lines.items():
+        row = existing.get(key)
+        stored = row.quantity + line['quantity'] if row and increment else line['quantity']
+        rows.append(SimpleNamespace(product_id=key[0], size=key[1], quantity=stored,
+                                    price=row.price if row else line['price']))
+    return rows
+
+
+def _upsert_cart_lines(lines: Dict[tuple, Dict[str, Any]], increment: bool = True) -> tuple:
+    """
+    INSERT ... ON CONFLICT (cart_id, product_id, size) DO UPDATE quantity =
+    quantity + excluded.quantity (increment=False: excluded.quantity) for
+    lines keyed by (product_id, size), all for one cart; an UPDATE plus an
+    INSERT on databases without ON CONFLICT. Does not commit. Returns
+    (results, quantity_delta, total_delta) for CartRepository.adjust_totals;
+    an existing line keeps its price, as in CartItemRepository.add_item.
+    """
+    upsert = _upsert_insert(CartItem.__table__)
+    if upsert is None:
+        rows = _update_insert_cart_lines(lines, increment)
+    else:
+        column = CartItem.__table__.c.quantity
+        rows = db.session.execute(upsert.values(list(lines.values())).on_conflict_do_update(
+            index_elements=['cart_id', 'product_id', 'size'],
+            set_={'quantity': column + upsert.excluded.quantity if increment else upsert.excluded.quantity}
+        ).returning(CartItem.product_id, CartItem.size, CartItem.quantity, CartItem.price))
+
+    results, quantity_delta, total_delta = [], 0, 0.0
+    for row in rows:
+        added = lines[(row.product_id, row.size)]['quantity']
+        quantity_delta += added
+        total_delta += float(row.price) * added
+        results.append({
+            'product_id': row.product_id,
+            'size': row.size,
+            'quantity': row.quantity,
+            'status': 'added' if row.quantity == added else 'updated'
+        })
+    return results, quantity_delta, total_delta
+
+
+def _fingerprint(rows) -> str:
+    """Short stable hash of query result rows."""
+    return hashlib.sha256(repr([tuple(row) for row in rows]).encode()).hexdigest()[:16]
+
+
 class UserRepository:
     """Repository for User data access operations."""
     
@@ -160,6 +246,27 @@ class OrderRepository:
         order.status = status
         db.session.commit()
         return order
+    
+    @staticmethod
+    def get_version(user_id: int, order_id: int = None) -> str:
+        """
+        Version of a user's orders (or one order) for HTTP validators.
+        One narrow query over the columns order pages depend on, including the
+        shipping address they show (addresses have no updated_at, so its fields);
+        order items never change.
+        """
+        query = db.session.query(
+            Order.id, Order.status, Order.updated_at, Order.total_amount,
+            Order.discount_amount, Order.coupon_code, Order.shipping_address_id,
+            Address.full_name, Address.phone, Address.address_line1, Address.address_line2,
+            Address.city, Address.state, Address.postal_code, Address.country,
+            Payment.payment_status, Payment.transaction_id
+        ).outerjoin(Address, Address.id == Order.shipping_address_id).outerjoin(
+            Payment, Payment.order_id == Order.id
+        ).filter(Order.user_id == user_id)
+        if order_id is not None:
+            query = query.filter(Order.id == order_id)
+        return _fingerprint(query.order_by(Order.id, Payment.id).all())
 
 
 class AddressRepository:
@@ -204,9 +311,67 @@ class AddressRepository:
         db.session.commit()
 
 
+def _forget_cart_views() -> None:
+    """
+    Drop this request's memoized cart views and totals after a cart write,
+    and flag the write so the session's cart badge state is refreshed
+    (services.cart_state).
+    """
+    if has_app_context():
+        g.pop('cart_views', None)
+        g.pop('cart_totals', None)
+        g.cart_changed = True
+
+
+class CartView:
+    """Read-only snapshot of a cart and its items with precomputed totals."""
+    
+    __slots__ = ('id', 'user_id', 'items', 'item_count', 'total', 'version', 'created_at', 'updated_at')
+    
+    def __init__(self, cart: Optional[Cart], items: List[CartItem]):
+        self.id = cart.id if cart else None
+        self.user_id = cart.user_id if cart else None
+        self.items = items
+        self.item_count = sum(item.quantity for item in items)
+        self.total = round(sum(item.price * item.quantity for item in items), 2)
+        self.version = cart.version if cart else 0
+        self.created_at = cart.created_at if cart else None
+        self.updated_at = cart.updated_at if cart else None
+    
+    @property
+    def is_empty(self) -> bool:
+        return not self.items
+    
+    def get_total(self) -> float:
+        return self.total
+    
+    def get_item_count(self) -> int:
+        return self.item_count
+
+
 class CartRepository:
     """Repository for Cart data access operations."""
     
+    @staticmethod
+    def load_view(user_id: int) -> CartView:
+        """
+        The user's cart and items as a CartView, in one query, memoized for
+        the rest of the request (cart writes drop the memo). Does not create
+        a cart; a user without one gets an empty view.
+        """
+        views = g.setdefault('cart_views', {}) if has_app_context() else {}
+        if user_id in views:
+            return views[user_id]
+        
+        rows = db.session.query(Cart, CartItem).outerjoin(
+            CartItem, CartItem.cart_id == Cart.id
+        ).filter(Cart.user_id == user_id).order_by(Cart.id, CartItem.id).all()
+        cart = rows[0][0] if rows else None
+        items = [item for owner, item in rows if item is not None and owner.id == cart.id]
+        
+        view = views[user_id] = CartView(cart, items)
+        return view
+    
     @staticmethod
     def find_or_create_by_user(user_id: int) -> Cart:
         """Find or create cart for user."""
@@ -215,6 +380,7 @@ class CartRepository:
             cart = Cart(user_id=user_id)
             db.session.add(cart)
             db.session.commit()
+            _forget_cart_views()
         return cart
     
     @staticmethod
@@ -223,16 +389,190 @@ class CartRepository:
         return Cart.query.get(cart_id)
     
     @staticmethod
-    def clear_cart(cart: Cart) -> None:
-        """Clear all items from cart."""
+    def clear_cart(cart: Cart, expected_version: int = None) -> bool:
+        """Clear all items from cart (False: the cart left expected_version, rolled back)."""
+        statement = update(Cart).where(Cart.id == cart.id)
+        if expected_version is not None:
+            statement = statement.where(Cart.version == expected_version)
+        result = db.session.execute(
+            statement.values(item_count=0, total=0.0, version=Cart.version + 1)
+            .execution_options(synchronize_session='fetch')
+        )
+        if expected_version is not None and result.rowcount != 1:
+            db.session.rollback()
+            return False
         CartItem.query.filter_by(cart_id=cart.id).delete()
+        _forget_cart_views()
+        db.session.commit()
+        return True
+    
+    @staticmethod
+    def merge_carts(target_cart_id: int, source_cart_id: int, target_version: int = None,
+                    source_version: int = None) -> Optional[Dict[str, int]]:
+        """
+        Move every line of the source cart into the target cart in one
+        transaction: one SELECT of both carts' lines, joined in memory on
+        (product_id, size), one upsert into the target, one DELETE of the
+        source lines and the aggregate updates for both carts.
+        Returns {'lines': source lines moved, 'combined': of those, lines the
+        target already had, 'quantity': units moved}, or None (rolled back)
+        when either cart is no longer at the given version.
+        """
+        rows = db.session.query(
+            CartItem.cart_id, CartItem.product_id, CartItem.size, CartItem.product_name,
+            CartItem.product_image, CartItem.price, CartItem.quantity
+        ).filter(CartItem.cart_id.in_([target_cart_id, source_cart_id])).all()
+
+        target_keys = {(row.product_id, row.size) for row in rows if row.cart_id == target_cart_id}
+        lines = {}
+        for row in rows:
+            if row.cart_id != source_cart_id:
+                continue
+            key = (row.product_id, row.size)
+            if key in lines:
+                lines[key]['quantity'] += row.quantity
+            else:
+                lines[key] = {
+                    'cart_id': target_cart_id, 'product_id': row.product_id, 'size': row.size,
+                    'product_name': row.product_name, 'product_image': row.product_image,
+                    'price': row.price, 'quantity': row.quantity
+                }
+        if not lines:
+            return {'lines': 0, 'combined': 0, 'quantity': 0}
+
+        emptied = update(Cart).where(Cart.id == source_cart_id)
+        if source_version is not None:
+            emptied = emptied.where(Cart.version == source_version)
+        result = db.session.execute(
+            emptied.values(item_count=0, total=0.0, version=Cart.version + 1)
+            .execution_options(synchronize_session='fetch')
+        )
+        _, quantity_delta, total_delta = _upsert_cart_lines(lines)
+        stale = source_version is not None and result.rowcount != 1
+        if stale or not CartRepository.adjust_totals(target_cart_id, quantity_delta, total_delta, target_version):
+            db.session.rollback()
+            return None
+        db.session.execute(
+            delete(CartItem).where(CartItem.cart_id == source_cart_id)
+            .execution_options(synchronize_session=False)
+        )
         db.session.commit()
+        return {
+            'lines': len(lines),
+            'combined': len(target_keys & set(lines)),
+            'quantity': quantity_delta
+        }
     
     @staticmethod
     def delete_cart(cart: Cart) -> None:
         """Delete cart."""
         db.session.delete(cart)
         db.session.commit()
+    
+    @staticmethod
+    def adjust_totals(cart_id: int, quantity_delta: int = 0, total_delta: float = 0.0,
+                      expected_version: int = None) -> bool:
+        """
+        Apply an item change to the cart's denormalized item_count/total and
+        bump its version. Runs in the caller's transaction; the caller commits.
+        With expected_version this is the optimistic concurrency check: the
+        UPDATE only matches while the cart is still at that version, and
+        False means another write got there first (nothing was changed).
+        """
+        statement = update(Cart).where(Cart.id == cart_id)
+        if expected_version is not None:
+            statement = statement.where(Cart.version == expected_version)
+        result = db.session.execute(
+            statement.values(
+                item_count=Cart.item_count + quantity_delta,
+                total=func.round(Cart.total + total_delta, 2),
+                version=Cart.version + 1
+            ).execution_options(synchronize_session='fetch')
+        )
+        if expected_version is not None and result.rowcount != 1:
+            return False
+        _forget_cart_views()
+        return True
+    
+    @staticmethod
+    def recalculate_totals(cart_id: int) -> None:
+        """Recompute item_count/total from the items (repair path); caller commits."""
+        item_count, total = db.session.query(
+            func.coalesce(func.sum(CartItem.quantity), 0),
+            func.coalesce(func.sum(CartItem.price * CartItem.quantity), 0.0)
+        ).filter(CartItem.cart_id == cart_id).one()
+        db.session.execute(
+            update(Cart).where(Cart.id == cart_id).values(
+                item_count=item_count, total=round(float(total), 2), version=Cart.version + 1
+            ).execution_options(synchronize_session='fetch')
+        )
+        _forget_cart_views()
+    
+    @staticmethod
+    def get_totals(user_id: int) -> Dict[str, Any]:
+        """
+        cart_id, item_count, total and version of a user's cart from the cart
+        row alone, memoized for the rest of the request like load_view(), so
+        an ETag (version_tag) and the response body share one query.
+        """
+        memo = g.setdefault('cart_totals', {}) if has_app_context() else {}
+        if user_id in memo:
+            return dict(memo[user_id])
+        
+        row = db.session.query(Cart.id, Cart.item_count, Cart.total, Cart.version).filter(
+            Cart.user_id == user_id
+        ).order_by(Cart.id).first()
+        if row is None:
+            totals = {'cart_id': None, 'item_count': 0, 'total': 0.0, 'version': 0}
+        else:
+            totals = {'cart_id': row.id, 'item_count': row.item_count, 'total': float(row.total),
+                      'version': row.version}
+        memo[user_id] = totals
+        return dict(totals)
+    
+    @staticmethod
+    def version_tag(cart_id: Optional[int], version: int) -> str:
+        """Version of a user's cart for HTTP validators, from its id and version."""
+        return _fingerprint([(cart_id, version)] if cart_id is not None else [])
+    
+    @staticmethod
+    def save_lines(cart_id: int, lines: List[Dict[str, Any]], version: int,
+                   expected_version: int = None) -> bool:
+        """
+        Make a cart's items exactly `lines` (write-behind flush of a hot
+        cart, batched cart operations): the aggregates and version set on the
+        cart row, one upsert setting absolute quantities and one DELETE of the
+        lines not listed. Line ids are not written; existing rows keep theirs.
+        With expected_version nothing is written unless the cart is still at
+        that version (False). Caller commits.
+        """
+        statement = update(Cart).where(Cart.id == cart_id)
+        if expected_version is not None:
+            statement = statement.where(Cart.version == expected_version)
+        result = db.session.execute(
+            statement.values(
+                item_count=sum(line['quantity'] for line in lines),
+                total=round(sum(float(line['price']) * line['quantity'] for line in lines), 2),
+                version=version
+            ).execution_options(synchronize_session='fetch')
+        )
+        if expected_version is not None and result.rowcount != 1:
+            _forget_cart_views()  # The cart moved on; a memoized view is out of date
+            return False
+
+        columns = ('product_id', 'size', 'product_name', 'product_image', 'price', 'quantity')
+        keys = [(line['product_id'], line['size']) for line in lines]
+        if lines:
+            _upsert_cart_lines({
+                (line['product_id'], line['size']): dict({c: line[c] for c in columns}, cart_id=cart_id)
+                for line in lines
+            }, increment=False)
+        stale = delete(CartItem).where(CartItem.cart_id == cart_id)
+        if keys:
+            stale = stale.where(~tuple_(CartItem.product_id, CartItem.size).in_(keys))
+        db.session.execute(stale.execution_options(synchronize_session=False))
+        _forget_cart_views()
+        return True
 
 
 class CartItemRepository:
@@ -240,17 +580,29 @@ class CartItemRepository:
     
     @staticmethod
     def add_item(cart_id: int, product_id: int, product_name: str, price: float, 
-                 product_image: str, quantity: int = 1, size: str = 'M') -> CartItem:
-        """Add item to cart or update quantity if exists."""
+                 product_image: str, quantity: int = 1, size: str = 'M',
+                 expected_version: int = None) -> Optional[CartItem]:
+        """
+        Add item to cart or update quantity if exists. With expected_version
+        the write only applies while the cart is at that version; None means
+        the cart changed meanwhile and the transaction was rolled back.
+        """
         # Check if item already exists
         cart_item = CartItem.query.filter_by(
             cart_id=cart_id, 
             product_id=product_id, 
             size=size
         ).first()
+        if cart_item:
+            price = cart_item.price
+        
+        if not CartRepository.adjust_totals(cart_id, quantity, float(price) * quantity, expected_version):
+            db.session.rollback()
+            return None
         
         if cart_item:
-            cart_item.quantity += quantity
+            # Incremented in SQL, so a concurrent add is never overwritten
+            cart_item.quantity = CartItem.quantity + quantity
         else:
             cart_item = CartItem(
                 cart_id=cart_id,
@@ -267,22 +619,116 @@ class CartItemRepository:
         return cart_item
     
     @staticmethod
-    def update_quantity(cart_item: CartItem, quantity: int) -> CartItem:
-        """Update cart item quantity."""
+    def update_quantity(cart_item: CartItem, quantity: int, expected_version: int = None) -> Optional[CartItem]:
+        """Update cart item quantity (None: the cart left expected_version, rolled back)."""
+        delta = quantity - cart_item.quantity
+        if not CartRepository.adjust_totals(cart_item.cart_id, delta, cart_item.price * delta, expected_version):
+            db.session.rollback()
+            return None
         cart_item.quantity = quantity
         db.session.commit()
         return cart_item
     
     @staticmethod
-    def remove_item(cart_item: CartItem) -> None:
-        """Remove item from cart."""
+    def remove_item(cart_item: CartItem, expected_version: int = None) -> bool:
+        """Remove item from cart (False: the cart left expected_version, rolled back)."""
+        if not CartRepository.adjust_totals(
+            cart_item.cart_id, -cart_item.quantity, -cart_item.price * cart_item.quantity, expected_version
+        ):
+            db.session.rollback()
+            return False
         db.session.delete(cart_item)
         db.session.commit()
+        return True
+    
+    @staticmethod
+    def bulk_upsert(cart_id: int, items: List[Dict[str, Any]],
+                    expected_version: int = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Add items to a cart in one INSERT ... ON CONFLICT (cart_id, product_id,
+        size) DO UPDATE quantity = quantity + excluded.quantity, then adjust
+        the cart aggregates and commit once. items must already be validated
+        and carry product_id, product_name, price, product_image, quantity and
+        size; repeats of a product and size are combined first.
+        Returns one {'product_id', 'size', 'quantity', 'status'} per line, where
+        status is 'added' for a new line and 'updated' for an existing one;
+        None (rolled back) when the cart is no longer at expected_version.
+        """
+        lines = {}
+        for item in items:
+            key = (item['product_id'], item['size'])
+            if key in lines:
+                lines[key]['quantity'] += item['quantity']
+            else:
+                lines[key] = dict(item, cart_id=cart_id)
+        if not lines:
+            return []
+
+        results, quantity_delta, total_delta = _upsert_cart_lines(lines)
+        if not CartRepository.adjust_totals(cart_id, quantity_delta, total_delta, expected_version):
+            db.session.rollback()
+            return None
+        db.session.commit()
+        return results
+    
+    @staticmethod
+    def bulk_set_quantities(cart_id: int, quantities: Dict[int, int],
+                            expected_version: int = None) -> Optional[Dict[str, List[int]]]:
+        """
+        Set the quantity of several lines of one cart: one SELECT ... IN scoped
+        to the cart, one UPDATE ... CASE, one DELETE ... IN for quantities <= 0,
+        then adjust the cart aggregates and commit once. Item ids that are not
+        in this cart are left alone and reported as missing. The aggregate
+        delta comes from the SELECT, so with expected_version the cart row is
+        claimed first and None (rolled back) means it changed since.
+        Returns {'updated': [ids], 'removed': [ids], 'missing': [ids]}.
+        """
+        rows = db.session.query(CartItem.id, CartItem.quantity, CartItem.price).filter(
+            CartItem.cart_id == cart_id, CartItem.id.in_(list(quantities))
+        ).all()
+        found = {row.id: row for row in rows}
+        updated = {item_id: quantity for item_id, quantity in quantities.items()
+                   if item_id in found and quantity > 0}
+        removed = [item_id for item_id, quantity in quantities.items()
+                   if item_id in found and quantity <= 0]
+
+        quantity_delta, total_delta = 0, 0.0
+        for item_id, row in found.items():
+            delta = updated.get(item_id, 0) - row.quantity
+            quantity_delta += delta
+            total_delta += float(row.price) * delta
+
+        if found and not CartRepository.adjust_totals(cart_id, quantity_delta, total_delta, expected_version):
+            db.session.rollback()
+            return None
+        if updated:
+            db.session.execute(
+                update(CartItem).where(CartItem.cart_id == cart_id, CartItem.id.in_(list(updated)))
+                .values(quantity=case(updated, value=CartItem.id))
+                .execution_options(synchronize_session=False)
+            )
+        if removed:
+            db.session.execute(
+                delete(CartItem).where(CartItem.cart_id == cart_id, CartItem.id.in_(removed))
+                .execution_options(synchronize_session=False)
+            )
+        if found:
+            db.session.commit()
+        return {
+            'updated': list(updated),
+            'removed': removed,
+            'missing': [item_id for item_id in quantities if item_id not in found]
+        }
     
     @staticmethod
     def find_by_id(item_id: int) -> Optional[CartItem]:
         """Find cart item by ID."""
         return CartItem.query.get(item_id)
+    
+    @staticmethod
+    def find_in_cart(cart_id: int, product_id: int, size: str) -> Optional[CartItem]:
+        """Find a cart's line for a product and size."""
+        return CartItem.query.filter_by(cart_id=cart_id, product_id=product_id, size=size).first()
 
 
 class PaymentRepository:
@@ -3,8 +3,11 @@ Service layer for business logic operations.
 Implements Service Pattern following SOLID principles.
 """
 from typing import Optional, Dict, Any
-from repositories import UserRepository, AdminRepository, CartRepository, CartItemRepository, OrderRepository, PaymentRepository
-from models import User, Admin, Cart, Order, OrderItem, db
+from flask import current_app
+from repositories import UserRepository, AdminRepository, CartRepository, CartItemRepository, OrderRepository, PaymentRepository, CartView
+from models import User, Admin, Cart, CartItem, Order, OrderItem, db
+from services.image_manifest import get_image_manifest
+from services.cart_store import get_cart_store, held_cart, hot_cart, release_cart, snapshot_view
 
 
 class AuthenticationService:
@@ -239,61 +242,205 @@ class CartService:
         self.cart_item_repo = CartItemRepository()
     
     def get_user_cart(self, user_id: int) -> Cart:
-        """Get or create user's cart."""
+        """
+        Get or create user's cart for an ORM write (with a hot cart store,
+        flushed and released first). Reads use get_cart_view().
+        """
+        store = get_cart_store()
+        if store is not None:
+            release_cart(store, user_id)
         return self.cart_repo.find_or_create_by_user(user_id)
     
+    def get_cart_view(self, user_id: int) -> CartView:
+        """User's cart and items with precomputed totals (one query per request)."""
+        store = get_cart_store()
+        if store is not None:
+            return snapshot_view(hot_cart(store, user_id))
+        return self.cart_repo.load_view(user_id)
+    
+    def get_cart_totals(self, user_id: int) -> Dict[str, Any]:
+        """cart_id, item_count, total and version of the user's cart."""
+        store = get_cart_store()
+        if store is not None:
+            view = self.get_cart_view(user_id)
+            return {'cart_id': view.id, 'item_count': view.item_count, 'total': view.total,
+                    'version': view.version}
+        return self.cart_repo.get_totals(user_id)
+    
+    def get_cart_version(self, user_id: int) -> str:
+        """Version tag of the user's cart for HTTP validators."""
+        store = get_cart_store()
+        if store is not None:
+            view = self.get_cart_view(user_id)
+            return self.cart_repo.version_tag(view.id, view.version)
+        totals = self.cart_repo.get_totals(user_id)  # Memoized: the view's totals cost no second query
+        return self.cart_repo.version_tag(totals['cart_id'], totals['version'])
+    
+    @staticmethod
+    def _stale_cart(version: int) -> Dict[str, Any]:
+        return {
+            'success': False,
+            'conflict': True,
+            'message': 'Your cart was changed in another window; please review it and try again',
+            'cart_version': version
+        }
+    
+    def _write_cart(self, user_id: int, write, expected_version: int = None) -> Dict[str, Any]:
+        """
+        Run write(cart) under optimistic concurrency: write applies its change
+        with a conditional UPDATE on the cart's version (no row locks) and
+        returns None when another request changed the cart first; the cart is
+        then re-read and the write retried, up to CART_WRITE_RETRIES times.
+        expected_version is the version the client saw; a cart that has moved
+        past it is reported as a conflict rather than retried. With a hot cart
+        store the cart is held out of it for the duration.
+        """
+        retries = current_app.config.get('CART_WRITE_RETRIES', 3)
+        with held_cart(get_cart_store(), user_id):
+            for _ in range(retries + 1):
+                cart = self.get_user_cart(user_id)
+                if expected_version is not None and cart.version != expected_version:
+                    return self._stale_cart(cart.version)
+                result = write(cart)
+                if result is not None:
+                    if result['success']:
+                        result['cart_version'] = cart.version
+                    return result
+        return {'success': False, 'conflict': True, 'message': 'Your cart is busy; please try again'}
+    
     def add_to_cart(self, user_id: int, product_id: int, product_name: str, 
-                   price: float, product_image: str, quantity: int = 1, size: str = 'M') -> Dict[str, Any]:
-        """Add item to cart."""
+                   price: float, product_image: str, quantity: int = 1, size: str = 'M',
+                   expected_version: int = None) -> Dict[str, Any]:
+        """Add item to cart (expected_version: fail with a conflict if the cart moved past it)."""
         try:
-            cart = self.get_user_cart(user_id)
-            self.cart_item_repo.add_item(
-                cart.id, product_id, product_name, price, 
-                product_image, quantity, size
-            )
-            return {
-                'success': True,
-                'message': 'Item added to cart',
-                'cart_count': cart.get_item_count()
-            }
+            store = get_cart_store()
+            if store is not None:
+                snapshot = hot_cart(store, user_id, 'add_line', {
+                    'product_id': int(product_id), 'product_name': product_name, 'price': float(price),
+                    'product_image': product_image, 'quantity': int(quantity), 'size': size
+                }, expected_version)
+                if snapshot.get('stale'):
+                    return self._stale_cart(snapshot['version'])
+                return {
+                    'success': True,
+                    'message': 'Item added to cart',
+                    'cart_count': snapshot_view(snapshot).item_count,
+                    'cart_version': snapshot['version']
+                }
+            
+            def write(cart):
+                if not self.cart_item_repo.add_item(cart.id, product_id, product_name, price,
+                                                    product_image, quantity, size, cart.version):
+                    return None
+                return {
+                    'success': True,
+                    'message': 'Item added to cart',
+                    'cart_count': cart.get_item_count()
+                }
+            return self._write_cart(user_id, write, expected_version)
         except Exception as e:
+            db.session.rollback()
             return {'success': False, 'message': f'Failed to add item: {str(e)}'}
     
-    def update_cart_item(self, item_id: int, quantity: int) -> Dict[str, Any]:
-        """Update cart item quantity."""
+    def _item_owner(self, item_id: int) -> Optional[int]:
+        cart_item = self.cart_item_repo.find_by_id(item_id)
+        return cart_item.cart.user_id if cart_item else None
+    
+    def _find_line(self, cart_id: int, item_id: int, line_key: tuple = None) -> Optional[CartItem]:
+        if line_key is not None:
+            return self.cart_item_repo.find_in_cart(cart_id, *line_key)
+        cart_item = self.cart_item_repo.find_by_id(item_id)
+        return cart_item if cart_item and cart_item.cart_id == cart_id else None
+    
+    def update_cart_item(self, item_id: int, quantity: int, user_id: int = None,
+                         expected_version: int = None, line_key: tuple = None) -> Dict[str, Any]:
+        """
+        Update cart item quantity (user_id routes it through the hot cart
+        store, if any; expected_version as in add_to_cart). line_key, the
+        line's (product_id, size), takes precedence over item_id: hot store
+        line ids do not survive the cart being written back and reloaded.
+        """
         try:
-            cart_item = self.cart_item_repo.find_by_id(item_id)
-            if not cart_item:
-                return {'success': False, 'message': 'Cart item not found'}
+            store = get_cart_store()
+            if store is not None and user_id is not None:
+                snapshot = hot_cart(store, user_id, 'set_quantity', line_key or item_id, quantity,
+                                    expected_version)
+                if snapshot is None:
+                    return {'success': False, 'message': 'Cart item not found'}
+                if snapshot.get('stale'):
+                    return self._stale_cart(snapshot['version'])
+                return {
+                    'success': True,
+                    'message': 'Item removed from cart' if quantity <= 0 else 'Cart updated',
+                    'cart_version': snapshot['version']
+                }
             
-            if quantity <= 0:
-                self.cart_item_repo.remove_item(cart_item)
-                return {'success': True, 'message': 'Item removed from cart'}
+            user_id = user_id if user_id is not None else self._item_owner(item_id)
+            if user_id is None:
+                return {'success': False, 'message': 'Cart item not found'}
             
-            self.cart_item_repo.update_quantity(cart_item, quantity)
-            return {'success': True, 'message': 'Cart updated'}
+            def write(cart):
+                cart_item = self._find_line(cart.id, item_id, line_key)
+                if not cart_item:
+                    return {'success': False, 'message': 'Cart item not found'}
+                if quantity <= 0:
+                    if not self.cart_item_repo.remove_item(cart_item, cart.version):
+                        return None
+                    return {'success': True, 'message': 'Item removed from cart'}
+                if not self.cart_item_repo.update_quantity(cart_item, quantity, cart.version):
+                    return None
+                return {'success': True, 'message': 'Cart updated'}
+            return self._write_cart(user_id, write, expected_version)
         except Exception as e:
+            db.session.rollback()
             return {'success': False, 'message': f'Failed to update cart: {str(e)}'}
     
-    def remove_from_cart(self, item_id: int) -> Dict[str, Any]:
-        """Remove item from cart."""
+    def remove_from_cart(self, item_id: int, user_id: int = None, expected_version: int = None,
+                         line_key: tuple = None) -> Dict[str, Any]:
+        """Remove item from cart (user_id, expected_version and line_key as in update_cart_item)."""
         try:
-            cart_item = self.cart_item_repo.find_by_id(item_id)
-            if not cart_item:
+            store = get_cart_store()
+            if store is not None and user_id is not None:
+                snapshot = hot_cart(store, user_id, 'set_quantity', line_key or item_id, 0, expected_version)
+                if snapshot is None:
+                    return {'success': False, 'message': 'Cart item not found'}
+                if snapshot.get('stale'):
+                    return self._stale_cart(snapshot['version'])
+                return {'success': True, 'message': 'Item removed from cart', 'cart_version': snapshot['version']}
+            
+            user_id = user_id if user_id is not None else self._item_owner(item_id)
+            if user_id is None:
                 return {'success': False, 'message': 'Cart item not found'}
             
-            self.cart_item_repo.remove_item(cart_item)
-            return {'success': True, 'message': 'Item removed from cart'}
+            def write(cart):
+                cart_item = self._find_line(cart.id, item_id, line_key)
+                if not cart_item:
+                    return {'success': False, 'message': 'Cart item not found'}
+                if not self.cart_item_repo.remove_item(cart_item, cart.version):
+                    return None
+                return {'success': True, 'message': 'Item removed from cart'}
+            return self._write_cart(user_id, write, expected_version)
         except Exception as e:
+            db.session.rollback()
             return {'success': False, 'message': f'Failed to remove item: {str(e)}'}
     
-    def clear_cart(self, user_id: int) -> Dict[str, Any]:
+    def clear_cart(self, user_id: int, expected_version: int = None) -> Dict[str, Any]:
         """Clear all items from cart."""
         try:
-            cart = self.get_user_cart(user_id)
-            self.cart_repo.clear_cart(cart)
-            return {'success': True, 'message': 'Cart cleared'}
+            store = get_cart_store()
+            if store is not None:
+                snapshot = hot_cart(store, user_id, 'clear', expected_version)
+                if snapshot.get('stale'):
+                    return self._stale_cart(snapshot['version'])
+                return {'success': True, 'message': 'Cart cleared', 'cart_version': snapshot['version']}
+            
+            def write(cart):
+                if not self.cart_repo.clear_cart(cart, cart.version):
+                    return None
+                return {'success': True, 'message': 'Cart cleared'}
+            return self._write_cart(user_id, write, expected_version)
         except Exception as e:
+            db.session.rollback()
             return {'success': False, 'message': f'Failed to clear cart: {str(e)}'}
 
 
@@ -309,80 +456,87 @@ class CheckoutService:
                                payment_method: str, card_details: Dict = None) -> Dict[str, Any]:
         """Create order from cart items."""
         try:
-            # Get cart
-            cart = self.cart_repo.find_or_create_by_user(user_id)
-            
-            if not cart.items.count():
-                return {'success': False, 'message': 'Cart is empty'}
-            
-            # Calculate total
-            total_amount = cart.get_total()
-            
-            # Create order
-            order = self.order_repo.create(
-                user_id=user_id,
-                total_amount=total_amount,
-                shipping_address_id=shipping_address_id,
-                status='pending'
-            )
-            
-            # Create order items from cart
-            for cart_item in cart.items:
-                order_item = OrderItem(
-                    order_id=order.id,
-                    product_id=cart_item.product_id,
-                    product_name=cart_item.product_name,
-                    quantity=cart_item.quantity,
-                    price=cart_item.price,
-                    size=cart_item.size
-                )
-                db.session.add(order_item)
-            
-            # Create payment record
-            payment = self.payment_repo.create(
-                order_id=order.id,
-                payment_method=payment_method,
-                amount=total_amount
-            )
-            
-            # Process payment based on method
-            if payment_method == 'cod':
-                # COD - Order confirmed immediately
-                order.status = 'confirmed'
-                payment.payment_status = 'pending'  # Payment on delivery
-            elif payment_method == 'card':
-                # Simulate card payment processing
-                payment_result = self._process_card_payment(card_details, total_amount)
-                if payment_result['success']:
-                    payment.payment_status = 'completed'
-                    payment.transaction_id = payment_result['transaction_id']
-                    payment.card_last4 = card_details.get('card_number', '')[-4:]
-                    order.status = 'confirmed'
-                else:
-                    payment.payment_status = 'failed'
-                    order.status = 'cancelled'
-                    db.session.commit()
-                    return {
-                        'success': False,
-                        'message': 'Payment failed: ' + payment_result.get('message', 'Unknown error')
-                    }
-            
-            db.session.commit()
-            
-            # Clear cart after successful order
-            self.cart_repo.clear_cart(cart)
-            
-            return {
-                'success': True,
-                'message': 'Order placed successfully',
-                'order': order,
-                'order_number': order.order_number
-            }
-            
+            # Write a hot cart through first so the order sees every change,
+            # and keep it out of the store until the cart is cleared
+            with held_cart(get_cart_store(), user_id):
+                return self._place_order(user_id, shipping_address_id, payment_method, card_details)
         except Exception as e:
             db.session.rollback()
             return {'success': False, 'message': f'Order creation failed: {str(e)}'}
     
+    def _place_order(self, user_id: int, shipping_address_id: int,
+                     payment_method: str, card_details: Dict = None) -> Dict[str, Any]:
+        """Order, order items and payment from the user's cart, then clear the cart."""
+        # Get cart with its items and totals in one query
+        cart = self.cart_repo.load_view(user_id)
+        
+        if cart.is_empty:
+            return {'success': False, 'message': 'Cart is empty'}
+        
+        # Calculate total
+        total_amount = cart.total
+        
+        # Create order
+        order = self.order_repo.create(
+            user_id=user_id,
+            total_amount=total_amount,
+            shipping_address_id=shipping_address_id,
+            status='pending'
+        )
+        
+        # Create order items from cart
+        for cart_item in cart.items:
+            order_item = OrderItem(
+                order_id=order.id,
+                product_id=cart_item.product_id,
+                product_name=cart_item.product_name,
+                quantity=cart_item.quantity,
+                price=cart_item.price,
+                size=cart_item.size
+            )
+            db.session.add(order_item)
+        
+        # Create payment record
+        payment = self.payment_repo.create(
+            order_id=order.id,
+            payment_method=payment_method,
+            amount=total_amount
+        )
+        
+        # Process payment based on method
+        if payment_method == 'cod':
+            # COD - Order confirmed immediately
+            order.status = 'confirmed'
+            payment.payment_status = 'pending'  # Payment on delivery
+        elif payment_method == 'card':
+            # Simulate card payment processing
+            payment_result = self._process_card_payment(card_details, total_amount)
+            if payment_result['success']:
+                payment.payment_status = 'completed'
+                payment.transaction_id = payment_result['transaction_id']
+                payment.card_last4 = card_details.get('card_number', '')[-4:]
+                order.status = 'confirmed'
+            else:
+                payment.payment_status = 'failed'
+                order.status = 'cancelled'
+                db.session.commit()
+                return {
+                    'success': False,
+                    'message': 'Payment failed: ' + payment_result.get('message', 'Unknown error')
+                }
+        
+        db.session.commit()
+        
+        # Clear cart after successful order
+        self.cart_repo.clear_cart(cart)
+        
+        return {
+            'success': True,
+            'message': 'Order placed successfully',
+            'order': order,
+            'order_number': order.order_number
+        }
+    
     def _process_card_payment(self, card_details: Dict, amount: float) -> Dict[str, Any]:
         """
         Process card payment (simplified simulation).
@@ -490,7 +644,7 @@ class DiscountService:
 def get_cart_summary_advanced(cart_service_self, user_id: int) -> Dict[str, Any]:
     """Get detailed cart summary with item breakdown."""
     try:
-        cart = cart_service_self.get_user_cart(user_id)
+        cart = cart_service_self.get_cart_view(user_id)
         items = []
         
         for item in cart.items:
@@ -499,6 +653,7 @@ def get_cart_summary_advanced(cart_service_self, user_id: int) -> Dict[str, Any]
                 'product_id': item.product_id,
                 'product_name': item.product_name,
                 'product_image': item.product_image,
+                'image': get_image_manifest().public_fields(item.product_image) if item.product_image else None,
                 'price': float(item.price),
                 'quantity': item.quantity,
                 'size': item.size,
@@ -520,84 +675,125 @@ def get_cart_summary_advanced(cart_service_self, user_id: int) -> Dict[str, Any]
 # Add method to CartService dynamically
 CartService.get_cart_summary = get_cart_summary_advanced
 
+def _bulk_cart_line(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Validated cart line from a bulk payload entry; raises ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError('Item must be an object')
+    try:
+        product_id = int(item.get('product_id'))
+        quantity = int(item.get('quantity', 1))
+        price = float(item.get('price'))
+    except (TypeError, ValueError):
+        raise ValueError('product_id, quantity and price must be numbers')
+    if quantity <= 0:
+        raise ValueError('Quantity must be positive')
+    if price < 0:
+        raise ValueError('Price cannot be negative')
+    if not item.get('product_name'):
+        raise ValueError('product_name is required')
+    return {
+        'product_id': product_id,
+        'product_name': item['product_name'],
+        'price': price,
+        'product_image': item.get('product_image'),
+        'quantity': quantity,
+        'size': item.get('size') or 'M'
+    }
+
+
 def bulk_add_to_cart_advanced(cart_service_self, user_id: int, items: list) -> Dict[str, Any]:
-    """Add multiple items to cart at once."""
+    """
+    Add multiple items to cart at once: one upsert statement and one commit,
+    retried through _write_cart if the cart changes underneath it.
+    At most CART_BULK_MAX_ITEMS items per call. Invalid items are skipped and
+    reported; results has one entry per item in request order.
+    """
+    max_items = current_app.config.get('CART_BULK_MAX_ITEMS', 50)
+    if len(items) > max_items:
+        return {'success': False, 'message': f'Too many items: at most {max_items} per request'}
+
     try:
-        cart = cart_service_self.get_user_cart(user_id)
-        added_count = 0
-        failed_items = []
-        
-        for item in items:
+        lines, results = [], []
+        for index, item in enumerate(items):
             try:
-                cart_service_self.cart_item_repo.add_item(
-                    cart.id,
-                    product_id=item.get('product_id'),
-                    product_name=item.get('product_name'),
-                    price=item.get('price'),
-                    product_image=item.get('product_image'),
-                    quantity=item.get('quantity', 1),
-                    size=item.get('size', 'M')
-                )
-                added_count += 1
-            except Exception as item_error:
-                failed_items.append({
-                    'product_id': item.get('product_id'),
+                lines.append(_bulk_cart_line(item))
+                results.append(None)  # Filled from the upsert below
+            except ValueError as item_error:
+                results.append({
+                    'index': index,
+                    'product_id': item.get('product_id') if isinstance(item, dict) else None,
+                    'status': 'failed',
                     'error': str(item_error)
                 })
-        
-        return {
-            'success': True,
-            'message': f'Added {added_count} items to cart',
-            'added_count': added_count,
-            'failed_count': len(failed_items),
-            'failed_items': failed_items,
-            'cart_count': cart.get_item_count()
-        }
+
+        def write(cart):
+            upserted = cart_service_self.cart_item_repo.bulk_upsert(cart.id, lines, cart.version)
+            if upserted is None:
+                return None
+            applied = {(r['product_id'], r['size']): r for r in upserted}
+            valid = iter(lines)
+            merged = []
+            for index, result in enumerate(results):
+                if result is None:
+                    line = next(valid)
+                    result = dict(applied[(line['product_id'], line['size'])], index=index)
+                merged.append(result)
+            failed_items = [r for r in merged if r['status'] == 'failed']
+            return {
+                'success': True,
+                'message': f'Added {len(lines)} items to cart',
+                'added_count': len(lines),
+                'failed_count': len(failed_items),
+                'failed_items': failed_items,
+                'results': merged,
+                'cart_count': cart.get_item_count()
+            }
+        return cart_service_self._write_cart(user_id, write)
     except Exception as e:
+        db.session.rollback()
         return {'success': False, 'message': f'Bulk add failed: {str(e)}'}
 
 CartService.bulk_add_to_cart = bulk_add_to_cart_advanced
 
 def bulk_update_quantities_advanced(cart_service_self, user_id: int, updates: list) -> Dict[str, Any]:
-    """Update quantities for multiple cart items at once."""
+    """
+    Update quantities for multiple cart items at once (quantity <= 0 removes).
+    Only items in the user's cart are touched; everything is applied with
+    one UPDATE, one DELETE and one commit, retried through _write_cart if the
+    cart changes underneath it. At most CART_BULK_MAX_ITEMS updates.
+    """
+    max_items = current_app.config.get('CART_BULK_MAX_ITEMS', 50)
+    if len(updates) > max_items:
+        return {'success': False, 'message': f'Too many updates: at most {max_items} per request'}
+
     try:
-        cart = cart_service_self.get_user_cart(user_id)
-        updated_count = 0
-        removed_count = 0
+        quantities = {}
         failed_updates = []
-        
         for update in updates:
+            item_id = update.get('item_id') if isinstance(update, dict) else None
             try:
-                item_id = update.get('item_id')
-                quantity = update.get('quantity', 0)
-                
-                cart_item = cart_service_self.cart_item_repo.find_by_id(item_id)
-                if not cart_item:
-                    failed_updates.append({'item_id': item_id, 'error': 'Item not found'})
-                    continue
-                
-                if quantity <= 0:
-                    cart_service_self.cart_item_repo.remove_item(cart_item)
-                    removed_count += 1
-                else:
-                    cart_service_self.cart_item_repo.update_quantity(cart_item, quantity)
-                    updated_count += 1
-            except Exception as update_error:
-                failed_updates.append({
-                    'item_id': update.get('item_id'),
-                    'error': str(update_error)
-                })
-        
-        return {
-            'success': True,
-            'message': f'Updated {updated_count} items, removed {removed_count}',
-            'updated_count': updated_count,
-            'removed_count': removed_count,
-            'failed_count': len(failed_updates),
-            'failed_updates': failed_updates,
-            'cart_total': float(cart.get_total())
-        }
+                quantities[int(item_id)] = int(update.get('quantity', 0))
+            except (TypeError, ValueError, AttributeError):
+                failed_updates.append({'item_id': item_id, 'error': 'item_id and quantity must be numbers'})
+
+        def write(cart):
+            outcome = cart_service_self.cart_item_repo.bulk_set_quantities(cart.id, quantities, cart.version)
+            if outcome is None:
+                return None
+            failed = failed_updates + [{'item_id': item_id, 'error': 'Item not found'}
+                                       for item_id in outcome['missing']]
+            return {
+                'success': True,
+                'message': f"Updated {len(outcome['updated'])} items, removed {len(outcome['removed'])}",
+                'updated_count': len(outcome['updated']),
+                'removed_count': len(outcome['removed']),
+                'failed_count': len(failed),
+                'failed_updates': failed,
+                'cart_total': cart.get_total()
+            }
+        return cart_service_self._write_cart(user_id, write)
     except Exception as e:
+        db.session.rollback()
         return {'success': False, 'message': f'Batch update failed: {str(e)}'}
 
 CartService.bulk_update_quantities = bulk_update_quantities_advanced
@@ -607,7 +803,7 @@ def check_abandoned_cart_advanced(cart_service_self, user_id: int, hours: int =
     try:
         from datetime import datetime, timezone
         
-        cart = cart_service_self.get_user_cart(user_id)
+        cart = cart_service_self.get_cart_view(user_id)
         
         if not cart.items or len(list(cart.items)) == 0:
             return {'success': True, 'is_abandoned': False, 'reason': 'Cart is empty'}
@@ -629,55 +825,201 @@ def check_abandoned_cart_advanced(cart_service_self, user_id: int, hours: int =
 CartService.check_abandoned_cart = check_abandoned_cart_advanced
 
 def merge_carts_advanced(cart_service_self, target_user_id: int, source_user_id: int) -> Dict[str, Any]:
-    """Merge one user's cart into another (guest to registered user conversion)."""
+    """
+    Merge one user's cart into another (guest to registered user conversion).
+    Lines with the same product and size are combined; the whole merge is
+    one transaction and the source cart is left empty. Both carts' versions
+    are checked at commit; a concurrent change to either retries the merge.
+    """
+    if target_user_id == source_user_id:
+        return {'success': False, 'message': 'Cannot merge a cart into itself'}
     try:
-        target_cart = cart_service_self.get_user_cart(target_user_id)
-        source_cart = cart_service_self.get_user_cart(source_user_id)
-        
-        merged_count = 0
-        
-        for source_item in source_cart.items:
-            existing_item = None
-            for target_item in target_cart.items:
-                if (target_item.product_id == source_item.product_id and
-                    target_item.size == source_item.size):
-                    existing_item = target_item
-                    break
-            
-            if existing_item:
-                cart_service_self.cart_item_repo.update_quantity(
-                    existing_item,
-                    existing_item.quantity + source_item.quantity
-                )
-            else:
-                cart_service_self.cart_item_repo.add_item(
-                    target_cart.id,
-                    source_item.product_id,
-                    source_item.product_name,
-                    source_item.price,
-                    source_item.product_image,
-                    source_item.quantity,
-                    source_item.size
-                )
-            merged_count += 1
-        
-        cart_service_self.cart_repo.clear_cart(source_cart)
-        
-        return {
-            'success': True,
-            'message': f'Merged {merged_count} items from guest cart',
-            'merged_count': merged_count,
-            'target_cart_total': float(target_cart.get_total())
-        }
+        def write(target_cart):
+            source_cart = cart_service_self.get_user_cart(source_user_id)
+            merged = cart_service_self.cart_repo.merge_carts(target_cart.id, source_cart.id,
+                                                             target_cart.version, source_cart.version)
+            if merged is None:
+                return None
+            return {
+                'success': True,
+                'message': f"Merged {merged['lines']} product types ({merged['quantity']} items) from guest cart",
+                'merged_count': merged['lines'],
+                'combined_count': merged['combined'],
+                'quantity_merged': merged['quantity'],
+                'target_cart_total': target_cart.get_total()
+            }
+        with held_cart(get_cart_store(), source_user_id):
+            return cart_service_self._write_cart(target_user_id, write)
     except Exception as e:
+        db.session.rollback()
         return {'success': False, 'message': f'Merge failed: {str(e)}'}
 
 CartService.merge_carts = merge_carts_advanced
 
+def _op_line(op: Dict[str, Any], lines: Dict[tuple, Dict[str, Any]]) -> tuple:
+    """Key of the line an update/remove refers to: product_id and size, or item_id."""
+    if op.get('product_id') is not None and op.get('size'):
+        try:
+            key = (int(op['product_id']), op['size'])
+        except (TypeError, ValueError):
+            raise ValueError('product_id must be a number')
+    else:
+        try:
+            item_id = int(op.get('item_id'))
+        except (TypeError, ValueError):
+            raise ValueError('item_id (or product_id and size) must be given')
+        key = next((key for key, line in lines.items() if line['id'] == item_id), None)
+    if key not in lines:
+        raise ValueError('Cart item not found')
+    return key
+
+
+def _run_cart_ops(lines: Dict[tuple, Dict[str, Any]], ops: list, user_id: int):
+    """
+    Apply cart operations to lines keyed by (product_id, size), in memory.
+    Returns the per-operation results and the same changes as hot cart store
+    operations; raises ValueError(index, message) for the first invalid one.
+    """
+    prices = {key: line['price'] for key, line in lines.items()}  # A stored line keeps its price
+    results, changes = [], []
+    for index, op in enumerate(ops):
+        try:
+            name = op.get('op') if isinstance(op, dict) else None
+            if name == 'add':
+                added = _bulk_cart_line(op)
+                key = (added['product_id'], added['size'])
+                added['price'] = prices.get(key, added['price'])
+                if key in lines:
+                    lines[key]['quantity'] += added['quantity']
+                else:
+                    lines[key] = dict(added, id=None)
+                changes.append(('add_line', added))
+                results.append({'op': name, 'product_id': key[0], 'size': key[1],
+                                'quantity': lines[key]['quantity']})
+            elif name in ('update', 'remove'):
+                key = _op_line(op, lines)
+                try:
+                    quantity = int(op.get('quantity', 0)) if name == 'update' else 0
+                except (TypeError, ValueError):
+                    raise ValueError('quantity must be a number')
+                item_id = lines[key]['id']
+                if quantity <= 0:
+                    del lines[key]
+                else:
+                    lines[key]['quantity'] = quantity
+                changes.append(('set_quantity', key, quantity))
+                results.append({'op': name, 'item_id': item_id, 'product_id': key[0], 'size': key[1],
+                                'quantity': max(quantity, 0)})
+            elif name == 'apply-coupon':
+                total = round(sum(line['price'] * line['quantity'] for line in lines.values()), 2)
+                coupon = DiscountService().validate_coupon(op.get('coupon_code') or '', total, user_id)
+                results.append(dict(coupon, op=name))
+            else:
+                raise ValueError("op must be one of 'add', 'update', 'remove', 'apply-coupon'")
+        except ValueError as op_error:
+            raise ValueError(index, str(op_error))
+    return results, changes
+
+
+def _hot_cart_ops(cart_service_self, store, user_id: int, ops: list,
+                  expected_version: int = None) -> Dict[str, Any]:
+    """
+    apply_cart_ops on a cart in the hot store: the operations run on a
+    snapshot, then go to the store as one change conditional on that
+    snapshot's version, retried if another request changed the cart first.
+    """
+    retries = current_app.config.get('CART_WRITE_RETRIES', 3)
+    for _ in range(retries + 1):
+        snapshot = hot_cart(store, user_id)
+        if expected_version is not None and snapshot['version'] != expected_version:
+            return cart_service_self._stale_cart(snapshot['version'])
+        lines = {(line['product_id'], line['size']): line for line in snapshot['lines']}
+        try:
+            results, changes = _run_cart_ops(lines, ops, user_id)
+        except ValueError as op_error:
+            index, message = op_error.args
+            return {'success': False, 'message': f'Operation {index} failed: {message}', 'failed_op': index}
+        if not hot_cart(store, user_id, 'apply', changes, snapshot['version']).get('stale'):
+            return {'success': True, 'message': f'Applied {len(ops)} cart operations', 'results': results}
+    return {'success': False, 'conflict': True, 'message': 'Your cart is busy; please try again'}
+
+
+def apply_cart_ops_advanced(cart_service_self, user_id: int, ops: list,
+                            expected_version: int = None) -> Dict[str, Any]:
+    """
+    Apply an ordered list of cart operations in one transaction:
+      {"op": "add", "product_id", "product_name", "price", "product_image", "quantity", "size"}
+      {"op": "update", "item_id" or "product_id" and "size", "quantity"}   (quantity <= 0 removes)
+      {"op": "remove", "item_id" or "product_id" and "size"}
+      {"op": "apply-coupon", "coupon_code"}     (checked against the cart total at that point)
+    The operations run on the cart lines in memory, then the final cart is
+    written with one conditional UPDATE of the cart row, one upsert and one
+    DELETE, and committed once (with a hot cart store, applied to the store
+    as one change instead). An invalid operation fails the whole batch and
+    nothing is written; a coupon that does not apply is only reported.
+    Returns per-operation results and the new cart snapshot and version.
+    """
+    max_ops = current_app.config.get('CART_BULK_MAX_ITEMS', 50)
+    if len(ops) > max_ops:
+        return {'success': False, 'message': f'Too many operations: at most {max_ops} per request'}
+
+    def write(cart):
+        lines = {}
+        for item in CartItem.query.filter_by(cart_id=cart.id).order_by(CartItem.id):
+            lines[(item.product_id, item.size)] = {
+                'id': item.id, 'product_id': item.product_id, 'size': item.size,
+                'product_name': item.product_name, 'product_image': item.product_image,
+                'price': float(item.price), 'quantity': item.quantity
+            }
+        try:
+            results, _ = _run_cart_ops(lines, ops, user_id)
+        except ValueError as op_error:
+            db.session.rollback()
+            index, message = op_error.args
+            return {'success': False, 'message': f'Operation {index} failed: {message}', 'failed_op': index}
+
+        if not cart_service_self.cart_repo.save_lines(cart.id, list(lines.values()), cart.version + 1,
+                                                      expected_version=cart.version):
+            db.session.rollback()
+            return None
+        db.session.commit()
+        return {'success': True, 'message': f'Applied {len(ops)} cart operations', 'results': results}
+
+    try:
+        store = get_cart_store()
+        if store is not None:
+            result = _hot_cart_ops(cart_service_self, store, user_id, ops, expected_version)
+        else:
+            result = cart_service_self._write_cart(user_id, write, expected_version)
+        if result['success']:
+            view = cart_service_self.get_cart_view(user_id)
+            result['cart'] = {
+                'items': [{
+                    'id': item.id,
+                    'product_id': item.product_id,
+                    'product_name': item.product_name,
+                    'product_image': item.product_image,
+                    'price': float(item.price),
+                    'quantity': item.quantity,
+                    'size': item.size,
+                    'subtotal': float(item.price) * item.quantity
+                } for item in view.items],
+                'item_count': view.item_count,
+                'total': view.total,
+                'version': view.version
+            }
+            result['cart_version'] = view.version
+        return result
+    except Exception as e:
+        db.session.rollback()
+        return {'success': False, 'message': f'Cart operations failed: {str(e)}'}
+
+CartService.apply_cart_ops = apply_cart_ops_advanced
+
 def get_cart_recommendations_advanced(cart_service_self, user_id: int, limit: int = 5) -> Dict[str, Any]:
     """Get personalized product recommendations based on cart items."""
     try:
-        cart = cart_service_self.get_user_cart(user_id)
+        cart = cart_service_self.get_cart_view(user_id)
         
         current_product_ids = [item.product_id for item in cart.items]
         current_categories = set()
@@ -0,0 +1,151 @@
+"""
+Static Asset Manifest Service
+Maps every static file to a content-hashed copy under static/dist so URLs
+change whenever the bytes do. url_for('static', ...) emits the hashed URL
+when one exists, and only those URLs are served as immutable.
+"""
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+ASSET_MANIFEST_FILENAME = '.asset_manifest.json'
+ASSET_MANIFEST_VERSION = 1
+HASHED_ASSET_DIR = 'dist'
+HASH_LENGTH = 10
+SKIP_DIRECTORIES = {HASHED_ASSET_DIR, 'uploads', 'mockup_templates'}
+COMPRESSED_SUFFIXES = ('.br', '.gz')
+IMMUTABLE_MAX_AGE = 31536000  # One year
+
+
+def hashed_filename(filename: str, content_hash: str) -> str:
+    """'css/style.css' -> 'dist/css/style.<hash>.css'"""
+    stem, extension = os.path.splitext(filename)
+    return f'{HASHED_ASSET_DIR}/{stem}.{content_hash[:HASH_LENGTH]}{extension}'
+
+
+def build_asset_manifest(static_dir: str) -> Dict[str, Any]:
+    """
+    Copy each static file to its content-hashed name under static/dist.
+    Copies that already exist are left alone, so rebuilding is cheap.
+    Returns: {'version': int, 'assets': {filename: hashed_filename}}
+    """
+    assets = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRECTORIES and not d.startswith('.'))
+
+        for name in sorted(files):
+            if name.startswith('.') or name.endswith(('.tmp',) + COMPRESSED_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_dir).replace(os.sep, '/')
+
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(64 * 1024), b''):
+                    digest.update(chunk)
+
+            target = hashed_filename(filename, digest.hexdigest())
+            target_path = os.path.join(static_dir, *target.split('/'))
+            if not os.path.exists(target_path):
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                shutil.copyfile(path, target_path)
+            assets[filename] = target
+
+    return {'version': ASSET_MANIFEST_VERSION, 'assets': assets}
+
+
+def prune_hashed_assets(static_dir: str, manifest: Dict[str, Any]) -> int:
+    """Delete hashed copies no longer referenced by the manifest; returns count removed."""
+    live = set(manifest['assets'].values())
+    dist_dir = os.path.join(static_dir, HASHED_ASSET_DIR)
+    removed = 0
+    for root, _, files in os.walk(dist_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            if filename.endswith(COMPRESSED_SUFFIXES):
+                filename = filename[:-3]
+            if filename not in live:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def write_asset_manifest(static_dir: str, manifest: Dict[str, Any] = None) -> str:
+    """Build (unless given) and atomically write the manifest into static_dir."""
+    manifest = manifest or build_asset_manifest(static_dir)
+    path = os.path.join(static_dir, ASSET_MANIFEST_FILENAME)
+    fd, tmp_path = tempfile.mkstemp(dir=static_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+class AssetManifest:
+    """Lookup from logical static filenames to their hashed copies."""
+
+    def __init__(self, assets: Dict[str, str] = None):
+        self.assets = assets or {}
+
+    @classmethod
+    def load(cls, path: str) -> 'AssetManifest':
+        """Load a manifest file; a missing or unreadable file yields an empty manifest."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            logger.info(f"No asset manifest at {path}; serving unhashed static URLs")
+            return cls()
+        if data.get('version') != ASSET_MANIFEST_VERSION:
+            logger.warning(f"Ignoring asset manifest with version {data.get('version')}")
+            return cls()
+        return cls(data.get('assets', {}))
+
+    def get(self, filename: str) -> Optional[str]:
+        """Hashed filename for a logical static filename, or None."""
+        return self.assets.get(filename.lstrip('/'))
+
+    def resolve(self, filename: str) -> str:
+        return self.get(filename) or filename
+
+    @staticmethod
+    def is_hashed(filename: str) -> bool:
+        """
+        True for files under static/dist. Their names are content-addressed, so
+        this holds even for copies built by another deploy's manifest.
+        """
+        return filename.lstrip('/').startswith(HASHED_ASSET_DIR + '/')
+
+
+asset_manifest = AssetManifest()
+
+
+def init_asset_manifest(app) -> AssetManifest:
+    """
+    Load the manifest once for this worker and rewrite url_for('static') to
+    the hashed filename. Set ASSET_FINGERPRINTING = False to disable.
+    """
+    global asset_manifest
+    if not app.config.get('ASSET_FINGERPRINTING', True):
+        asset_manifest = AssetManifest()
+    else:
+        asset_manifest = AssetManifest.load(os.path.join(app.static_folder, ASSET_MANIFEST_FILENAME))
+    app.extensions['asset_manifest'] = asset_manifest
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = app.extensions['asset_manifest'].resolve(values['filename'])
+
+    return asset_manifest
+
+
+def get_asset_manifest() -> AssetManifest:
+    return asset_manifest
@@ -6,6 +6,8 @@ cart merging, and inventory tracking.
 from typing import Dict, Any, List
 from datetime import datetime, timezone
 from repositories import CartRepository, CartItemRepository
+from services import CartService
+from services.image_manifest import get_image_manifest
 
 
 class AdvancedCartService:
@@ -28,6 +30,7 @@ class AdvancedCartService:
                     'product_id': item.product_id,
                     'product_name': item.product_name,
                     'product_image': item.product_image,
+                    'image': get_image_manifest().public_fields(item.product_image) if item.product_image else None,
                     'price': float(item.price),
                     'quantity': item.quantity,
                     'size': item.size,
@@ -49,82 +52,12 @@ class AdvancedCartService:
             return {'success': False, 'message': f'Failed to get cart summary: {str(e)}'}
     
     def bulk_add_to_cart(self, user_id: int, items: List[Dict]) -> Dict[str, Any]:
-        """Add multiple items to cart at once."""
-        try:
-            cart = self.cart_repo.find_or_create_by_user(user_id)
-            added_count = 0
-            failed_items = []
-            
-            for item in items:
-                try:
-                    self.cart_item_repo.add_item(
-                        cart.id,
-                        product_id=item.get('product_id'),
-                        product_name=item.get('product_name'),
-                        price=item.get('price'),
-                        product_image=item.get('product_image'),
-                        quantity=item.get('quantity', 1),
-                        size=item.get('size', 'M')
-                    )
-                    added_count += 1
-                except Exception as item_error:
-                    failed_items.append({
-                        'product_id': item.get('product_id'),
-                        'error': str(item_error)
-                    })
-            
-            return {
-                'success': True,
-                'message': f'Added {added_count} items to cart',
-                'added_count': added_count,
-                'failed_count': len(failed_items),
-                'failed_items': failed_items,
-                'cart_count': cart.get_item_count()
-            }
-        except Exception as e:
-            return {'success': False, 'message': f'Bulk add failed: {str(e)}'}
+        """Add multiple items to cart at once (set-based upsert, see CartService.bulk_add_to_cart)."""
+        return CartService().bulk_add_to_cart(user_id, items)
     
     def bulk_update_quantities(self, user_id: int, updates: List[Dict]) -> Dict[str, Any]:
-        """Update quantities for multiple cart items at once."""
-        try:
-            cart = self.cart_repo.find_or_create_by_user(user_id)
-            updated_count = 0
-            removed_count = 0
-            failed_updates = []
-            
-            for update in updates:
-                try:
-                    item_id = update.get('item_id')
-                    quantity = update.get('quantity', 0)
-                    
-                    cart_item = self.cart_item_repo.find_by_id(item_id)
-                    if not cart_item:
-                        failed_updates.append({'item_id': item_id, 'error': 'Item not found'})
-                        continue
-                    
-                    if quantity <= 0:
-                        self.cart_item_repo.remove_item(cart_item)
-                        removed_count += 1
-                    else:
-                        self.cart_item_repo.update_quantity(cart_item, quantity)
-                        updated_count += 1
-                except Exception as update_error:
-                    failed_updates.append({
-                        'item_id': update.get('item_id'),
-                        'error': str(update_error)
-                    })
-            
-            return {
-                'success': True,
-                'message': f'Updated {updated_count} items, removed {removed_count}',
-                'updated_count': updated_count,
-                'removed_count': removed_count,
-                'failed_count': len(failed_updates),
-                'failed_updates': failed_updates,
-                'cart_total': float(cart.get_total())
-            }
-        except Exception as e:
-            return {'success': False, 'message': f'Batch update failed: {str(e)}'}
+        """Update quantities for multiple cart items at once (batched, see CartService.bulk_update_quantities)."""
+        return CartService().bulk_update_quantities(user_id, updates)
     
     def check_abandoned_cart(self, user_id: int, hours: int = 24) -> Dict[str, Any]:
         """Check if cart has been abandoned (not updated in specified hours)."""
@@ -149,56 +82,8 @@ class AdvancedCartService:
             return {'success': False, 'message': f'Failed to check abandoned cart: {str(e)}'}
     
     def merge_carts(self, target_user_id: int, source_user_id: int) -> Dict[str, Any]:
-        """Merge one user's cart into another (guest to registered user conversion)."""
-        try:
-            target_cart = self.cart_repo.find_or_create_by_user(target_user_id)
-            source_cart = self.cart_repo.find_or_create_by_user(source_user_id)
-            
-            merged_count = 0
-            quantity_merged = 0
-            
-            for source_item in source_cart.items:
-                # Check if item already in target cart
-                existing_item = None
-                for target_item in target_cart.items:
-                    if (target_item.product_id == source_item.product_id and
-                        target_item.size == source_item.size):
-                        existing_item = target_item
-                        break
-                
-                if existing_item:
-                    # Merge quantities
-                    self.cart_item_repo.update_quantity(
-                        existing_item,
-                        existing_item.quantity + source_item.quantity
-                    )
-                    quantity_merged += source_item.quantity
-                else:
-                    # Add as new item
-                    self.cart_item_repo.add_item(
-                        target_cart.id,
-                        source_item.product_id,
-                        source_item.product_name,
-                        source_item.price,
-                        source_item.product_image,
-                        source_item.quantity,
-                        source_item.size
-                    )
-                    quantity_merged += source_item.quantity
-                merged_count += 1
-            
-            # Clear source cart
-            self.cart_repo.clear_cart(source_cart)
-            
-            return {
-                'success': True,
-                'message': f'Merged {merged_count} product types ({quantity_merged} items) from guest cart',
-                'merged_count': merged_count,
-                'quantity_merged': quantity_merged,
-                'target_cart_total': float(target_cart.get_total())
-            }
-        except Exception as e:
-            return {'success': False, 'message': f'Merge failed: {str(e)}'}
+        """Merge one user's cart into another (one transaction, see CartService.merge_carts)."""
+        return CartService().merge_carts(target_user_id, source_user_id)
     
     def get_cart_recommendations(self, user_id: int, limit: int = 5) -> Dict[str, Any]:
         """Get personalized product recommendations based on cart items."""
@@ -0,0 +1,86 @@
+"""
+Cart Badge State
+Keeps the logged-in user's cart item count and cart version in the signed
+session, refreshed only on requests that wrote to the cart, and mirrors them
+(with the display name) into small script-readable cookies. Pages render the
+badge from the session and main.js reads the cookies, so navigation needs no
+/cart/count or /api/session round trip; tabs stay in sync via BroadcastChannel.
+Guests get the same cart_state cookie for their signed-cookie guest cart.
+Versions are only comparable within one cart, so the cookie also names the
+cart's owner ('g' for the guest cart, 'u<id>' for a user's cart).
+"""
+from typing import Dict, Any, Optional
+
+from flask import g, request, session
+
+from services.guest_cart import GUEST_CART_COOKIE, load_guest_cart
+
+CART_STATE_COOKIE = 'cart_state'
+DISPLAY_NAME_COOKIE = 'display_name'
+
+
+def current_cart_state() -> Optional[Dict[str, Any]]:
+    """
+    {'count', 'version', 'owner'} of the logged-in user's cart, from the session.
+    Reads the cart row only when this request changed the cart or the session
+    has no state yet (first request after login), and not even then if the
+    request already loaded the cart view.
+    """
+    if 'user_id' not in session:
+        return None
+    if g.get('cart_changed') or 'cart_version' not in session:
+        view = g.get('cart_views', {}).get(session['user_id'])
+        if view is not None:  # Already loaded by this request's view
+            session['cart_count'], session['cart_version'] = view.item_count, view.version
+        else:
+            from services import CartService
+            totals = CartService().get_cart_totals(session['user_id'])
+            session['cart_count'], session['cart_version'] = totals['item_count'], totals['version']
+        g.cart_changed = False
+    return {'count': session['cart_count'], 'version': session['cart_version'], 'owner': f"u{session['user_id']}"}
+
+
+def init_cart_state(app) -> None:
+    """Register the header_state template value and the cookie sync hook."""
+
+    @app.context_processor
+    def inject_header_state():
+        # Pages in the shared page cache must not contain one visitor's data
+        if g.get('shared_page') or not ('user_id' in session or 'admin_id' in session):
+            return {'header_state': None}
+        state = current_cart_state()
+        return {'header_state': {
+            'username': session.get('username') or session.get('admin_username'),
+            'cart_count': state['count'] if state else 0
+        }}
+
+    @app.after_request
+    def sync_cart_state_cookies(response):
+        if request.path.startswith(app.static_url_path + '/'):
+            return response
+
+        cookie_options = {
+            'secure': app.config.get('SESSION_COOKIE_SECURE', False),
+            'domain': app.config.get('SESSION_COOKIE_DOMAIN') or None,
+            'samesite': app.config.get('SESSION_COOKIE_SAMESITE') or 'Lax',
+        }
+        name = session.get('username') or session.get('admin_username')
+        values = {DISPLAY_NAME_COOKIE: name}
+        state = current_cart_state()
+        if state is not None:
+            values[CART_STATE_COOKIE] = f"{state['count']}.{state['version']}.{state['owner']}"
+        elif g.get('guest_cart_changed') or GUEST_CART_COOKIE in request.cookies:
+            guest_cart = load_guest_cart()
+            values[CART_STATE_COOKIE] = (f"{guest_cart.item_count}.{guest_cart.version}.g"
+                                         if guest_cart.lines else None)
+        else:
+            values[CART_STATE_COOKIE] = None
+
+        for cookie, value in values.items():
+            if value is None:
+                if cookie in request.cookies:
+                    response.delete_cookie(cookie, domain=cookie_options['domain'])
+                continue
+            if request.cookies.get(cookie) != value:
+                response.set_cookie(cookie, value, httponly=False, **cookie_options)
+        return response
@@ -0,0 +1,578 @@
+"""
+Hot Cart Store
+Optional cart backend for sale traffic. Active carts live in a key-value
+store - in this process, or one shared store served over local TCP for
+several app nodes - and CartService reads and writes them there instead of
+committing every click. A background flusher coalesces the changes and writes
+each changed cart to carts/cart_items every few seconds; checkout and any
+code that writes the cart in the database flush that user's cart
+synchronously first and hold it out of the store until they are done.
+
+Run the shared store with: python -m services.cart_store --port 6380
+"""
+from typing import Dict, Any, Iterable, List, Optional
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from multiprocessing.managers import BaseManager
+import argparse
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+
+from flask import g, has_app_context
+
+from config import Config
+from models import db
+from repositories import CartRepository, CartView
+
+logger = logging.getLogger(__name__)
+
+# Ids of lines added in the store, far above the cart_items autoincrement
+# range. They only mean something while the cart stays in the store (a
+# released cart is reloaded with the database ids), so the store keys lines by
+# (product_id, size) and callers that may outlive a release refer to them so.
+HOT_LINE_ID_BASE = 1 << 40
+
+
+class HotCartLine:
+    """Cart line served from the store; quacks like CartItem for templates and checkout."""
+
+    __slots__ = ('id', 'product_id', 'product_name', 'product_image', 'price', 'quantity', 'size')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def get_subtotal(self) -> float:
+        return self.price * self.quantity
+
+
+class HotCartStore:
+    """
+    Thread-safe store of active carts keyed by user id, each cart's lines
+    keyed by (product_id, size). Every method takes and returns plain data,
+    so the same object can be shared over a manager connection. Mutations
+    raise KeyError for a cart that is not loaded; given an expected_version
+    the cart is no longer at, they change nothing and return its snapshot
+    with 'stale': True.
+
+    Each cart remembers the database version it was loaded at or last
+    flushed to ('base_version') and the operations applied since, so a flush
+    that finds the database cart changed underneath it can rebase() them onto
+    the new database copy. A cart held for a database write (hold()) is not
+    loaded until the hold is dropped.
+    """
+
+    def __init__(self, line_id_base: int = HOT_LINE_ID_BASE):
+        self._carts = {}
+        self._dirty = set()
+        self._flushing = {}
+        self._held = {}
+        self._unheld = {}
+        self._sequence = 0
+        self._next_line_id = line_id_base
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _snapshot(state: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'user_id': state['user_id'],
+            'cart_id': state['cart_id'],
+            'version': state['version'],
+            'base_version': state['base_version'],
+            'created_at': state['created_at'],
+            'updated_at': state['updated_at'],
+            'lines': [dict(line) for line in state['lines'].values()]
+        }
+
+    @staticmethod
+    def _line_key(lines: Dict[tuple, Dict[str, Any]], line) -> Optional[tuple]:
+        """Key of a line referred to by (product_id, size) or by its current id."""
+        if isinstance(line, (tuple, list)):
+            key = (int(line[0]), line[1])
+            return key if key in lines else None
+        return next((key for key, existing in lines.items() if existing['id'] == line), None)
+
+    @staticmethod
+    def _lines(snapshot: Dict[str, Any]) -> Dict[tuple, Dict[str, Any]]:
+        return {(line['product_id'], line['size']): dict(line) for line in snapshot['lines']}
+
+    def _apply(self, lines: Dict[tuple, Dict[str, Any]], operation: tuple) -> None:
+        name, args = operation[0], operation[1:]
+        if name == 'add_line':
+            line = args[0]
+            key = (line['product_id'], line['size'])
+            if key in lines:
+                lines[key]['quantity'] += line['quantity']
+            else:
+                lines[key] = dict(line, id=self._next_line_id)
+                self._next_line_id += 1
+        elif name == 'set_quantity':
+            key, quantity = args
+            if key not in lines:
+                return
+            if quantity <= 0:
+                del lines[key]
+            else:
+                lines[key]['quantity'] = quantity
+        elif name == 'clear':
+            lines.clear()
+
+    def _stale(self, user_id: int, expected_version: Optional[int]) -> Optional[Dict[str, Any]]:
+        state = self._carts[user_id]
+        if expected_version is None or state['version'] == expected_version:
+            return None
+        return dict(self._snapshot(state), stale=True)
+
+    def _changed(self, user_id: int, *operations: tuple) -> Dict[str, Any]:
+        state = self._carts[user_id]
+        for operation in operations:
+            self._apply(state['lines'], operation)
+            state['operations'].append(operation)
+        state['version'] += 1
+        state['touched'] = time.monotonic()
+        state['updated_at'] = datetime.now(timezone.utc)
+        self._dirty.add(user_id)
+        return self._snapshot(state)
+
+    def snapshot(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._carts.get(user_id)
+            return self._snapshot(state) if state else None
+
+    def sequence(self) -> int:
+        """Pass to seed() with a snapshot read after this call."""
+        with self._lock:
+            return self._sequence
+
+    def seed(self, user_id: int, snapshot: Dict[str, Any], sequence: int = None) -> Optional[Dict[str, Any]]:
+        """
+        Load a cart read from the database, unless another request already
+        did. None while the cart is held, or when a hold was dropped after
+        sequence() was read (the snapshot may predate that write).
+        """
+        with self._lock:
+            state = self._carts.get(user_id)
+            if state is None:
+                unheld_at = self._unheld.get(user_id, (0, 0))[0]
+                if user_id in self._held or (sequence is not None and unheld_at > sequence):
+                    return None
+                state = self._carts[user_id] = {
+                    'user_id': user_id,
+                    'cart_id': snapshot['cart_id'],
+                    'version': snapshot['version'],
+                    'base_version': snapshot['version'],
+                    'lines': self._lines(snapshot),
+                    'operations': [],
+                    'created_at': snapshot.get('created_at'),
+                    'updated_at': snapshot.get('updated_at'),
+                    'touched': time.monotonic()
+                }
+            return self._snapshot(state)
+
+    def hold(self, user_id: int) -> bool:
+        """
+        Keep a cart out of the store while it is written in the database;
+        False (not held) if it is loaded, i.e. has to be released first.
+        Holds may overlap; each is dropped with unhold().
+        """
+        with self._lock:
+            if user_id in self._carts:
+                return False
+            self._held[user_id] = self._held.get(user_id, 0) + 1
+            return True
+
+    def unhold(self, user_id: int) -> None:
+        with self._lock:
+            self._held[user_id] -= 1
+            if not self._held[user_id]:
+                del self._held[user_id]
+            self._sequence += 1
+            self._unheld[user_id] = (self._sequence, time.monotonic())
+
+    def add_line(self, user_id: int, line: Dict[str, Any], expected_version: int = None) -> Dict[str, Any]:
+        """Add a line, or add its quantity to the line with the same product and size."""
+        with self._lock:
+            stale = self._stale(user_id, expected_version)
+            if stale:
+                return stale
+            return self._changed(user_id, ('add_line', dict(line)))
+
+    def set_quantity(self, user_id: int, line, quantity: int,
+                     expected_version: int = None) -> Optional[Dict[str, Any]]:
+        """
+        Set the quantity of the line referred to by (product_id, size) or by
+        id (<= 0 removes it); None if the cart has no such line.
+        """
+        with self._lock:
+            stale = self._stale(user_id, expected_version)
+            if stale:
+                return stale
+            key = self._line_key(self._carts[user_id]['lines'], line)
+            if key is None:
+                return None
+            return self._changed(user_id, ('set_quantity', key, quantity))
+
+    def clear(self, user_id: int, expected_version: int = None) -> Dict[str, Any]:
+        with self._lock:
+            stale = self._stale(user_id, expected_version)
+            if stale:
+                return stale
+            return self._changed(user_id, ('clear',))
+
+    def apply(self, user_id: int, operations: List[tuple], expected_version: int = None) -> Dict[str, Any]:
+        """
+        Apply several operations - ('add_line', line), ('set_quantity',
+        (product_id, size), quantity), ('clear',) - as one change.
+        """
+        with self._lock:
+            stale = self._stale(user_id, expected_version)
+            if stale:
+                return stale
+            return self._changed(user_id, *[tuple(operation) for operation in operations])
+
+    def rebase(self, user_id: int, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Replay the operations since the last flush onto the cart as the
+        database now has it (snapshot), after a flush found it changed. The
+        cart moves past both versions and stays dirty.
+        """
+        with self._lock:
+            state = self._carts[user_id]
+            lines = self._lines(snapshot)
+            for operation in state['operations']:
+                self._apply(lines, operation)
+            state.update(cart_id=snapshot['cart_id'], lines=lines, base_version=snapshot['version'],
+                         version=max(state['version'], snapshot['version']) + 1)
+            self._dirty.add(user_id)
+            return self._snapshot(state)
+
+    def take_dirty(self, user_ids: Iterable[int] = None) -> List[Dict[str, Any]]:
+        """
+        Snapshots of changed carts (all, or only user_ids) for a flush. A cart
+        already being flushed is skipped and stays dirty for the next one.
+        Report the outcome with finish_flush().
+        """
+        with self._lock:
+            candidates = self._dirty if user_ids is None else self._dirty & set(user_ids)
+            taken = [user_id for user_id in candidates if user_id not in self._flushing]
+            snapshots = []
+            for user_id in taken:
+                state = self._carts[user_id]
+                self._dirty.discard(user_id)
+                self._flushing[user_id] = (state['version'], len(state['operations']))
+                snapshots.append(self._snapshot(state))
+            return snapshots
+
+    def finish_flush(self, user_ids: Iterable[int], ok: bool = True) -> None:
+        """
+        A successful flush makes the flushed version the cart's base and
+        forgets the operations it covered; a failed one leaves the cart dirty.
+        """
+        with self._lock:
+            for user_id in user_ids:
+                version, operations = self._flushing.pop(user_id, (None, 0))
+                state = self._carts.get(user_id)
+                if state is None:
+                    continue
+                if ok:
+                    state['base_version'] = version
+                    del state['operations'][:operations]
+                else:
+                    self._dirty.add(user_id)
+
+    def evict(self, user_id: int, version: int) -> bool:
+        """
+        Drop a cart whose database copy is current (not dirty, not being
+        flushed, still at version). True if it is gone.
+        """
+        with self._lock:
+            state = self._carts.get(user_id)
+            if state is None:
+                return True
+            if user_id in self._dirty or user_id in self._flushing or state['version'] != version:
+                return False
+            del self._carts[user_id]
+            return True
+
+    def evict_idle(self, max_idle: float) -> int:
+        """Drop clean carts untouched for max_idle seconds; returns how many."""
+        cutoff = time.monotonic() - max_idle
+        with self._lock:
+            idle = [user_id for user_id, state in self._carts.items()
+                    if state['touched'] < cutoff and user_id not in self._dirty
+                    and user_id not in self._flushing]
+            for user_id in idle:
+                del self._carts[user_id]
+            # Only seeds in flight when a hold was dropped need its sequence
+            self._unheld = {user_id: unheld for user_id, unheld in self._unheld.items() if unheld[1] >= cutoff}
+            return len(idle)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'carts': len(self._carts), 'dirty': len(self._dirty), 'flushing': len(self._flushing),
+                    'held': len(self._held)}
+
+
+class _StoreServer(BaseManager):
+    pass
+
+
+class _StoreClient(BaseManager):
+    pass
+
+
+_StoreClient.register('cart_store')
+
+
+def serve_cart_store(host: str, port: int, authkey: bytes) -> None:
+    """Serve one HotCartStore to every app node over TCP (blocks)."""
+    store = HotCartStore()
+    _StoreServer.register('cart_store', callable=lambda: store)
+    server = _StoreServer(address=(host, port), authkey=authkey).get_server()
+    logger.info(f"Cart store listening on {host}:{port}")
+    server.serve_forever()
+
+
+def connect_cart_store(host: str, port: int, authkey: bytes):
+    """Proxy for the shared store; method calls are forwarded over the connection."""
+    client = _StoreClient(address=(host, port), authkey=authkey)
+    client.connect()
+    return client.cart_store()
+
+
+_store = None
+
+
+def get_cart_store():
+    """The hot cart store, or None when carts go straight to the database."""
+    return _store
+
+
+def use_cart_store(store) -> None:
+    global _store
+    _store = store
+
+
+def load_snapshot(user_id: int) -> Dict[str, Any]:
+    """A user's cart read from the database in the store's format (creates the cart row)."""
+    view = CartRepository.load_view(user_id)
+    cart_id = view.id or CartRepository.find_or_create_by_user(user_id).id
+    return {
+        'user_id': user_id,
+        'cart_id': cart_id,
+        'version': view.version,
+        'created_at': view.created_at,
+        'updated_at': view.updated_at,
+        'lines': [{
+            'id': item.id,
+            'product_id': item.product_id,
+            'product_name': item.product_name,
+            'product_image': item.product_image,
+            'price': float(item.price),
+            'quantity': item.quantity,
+            'size': item.size
+        } for item in view.items]
+    }
+
+
+def _seed(store, user_id: int, timeout: float = 5.0) -> Dict[str, Any]:
+    """Load a user's cart into the store, waiting out a database write that holds it."""
+    deadline = time.monotonic() + timeout
+    while True:
+        sequence = store.sequence()
+        snapshot = store.seed(user_id, load_snapshot(user_id), sequence)
+        if snapshot is not None:
+            return snapshot
+        if time.monotonic() > deadline:
+            raise TimeoutError(f'Cart of user {user_id} is held for a database write')
+        time.sleep(0.01)
+        db.session.expire_all()  # Read what that write committed
+        if has_app_context():
+            g.pop('cart_views', None)
+
+
+def hot_cart(store, user_id: int, operation: str = 'snapshot', *args) -> Optional[Dict[str, Any]]:
+    """
+    Run a store operation on a user's cart, loading the cart from the
+    database on first use. Mutations mark the request's cart as changed
+    (a stale result changed nothing, so it does not).
+    """
+    if operation == 'snapshot':
+        snapshot = store.snapshot(user_id)
+        return snapshot if snapshot is not None else _seed(store, user_id)
+    try:
+        result = getattr(store, operation)(user_id, *args)
+    except KeyError:
+        _seed(store, user_id)
+        result = getattr(store, operation)(user_id, *args)
+    if has_app_context() and not (result and result.get('stale')):
+        g.cart_changed = True
+    return result
+
+
+def snapshot_view(snapshot: Dict[str, Any]) -> CartView:
+    """CartView of a store snapshot, for the cart and checkout pages."""
+    view = CartView(None, [HotCartLine(**line) for line in snapshot['lines']])
+    view.id, view.user_id, view.version = snapshot['cart_id'], snapshot['user_id'], snapshot['version']
+    view.created_at, view.updated_at = snapshot.get('created_at'), snapshot.get('updated_at')
+    return view
+
+
+def flush_carts(store, user_ids: Iterable[int] = None) -> int:
+    """
+    Write changed carts (all, or only user_ids) in one transaction; returns
+    how many. Each write only applies while the database cart is still at
+    the version the store loaded or last flushed; a cart that was changed
+    there meanwhile is rebased onto the new copy and left for the next flush.
+    """
+    snapshots = store.take_dirty(user_ids)
+    if not snapshots:
+        return 0
+    flushed, rebased = [], []
+    try:
+        for snapshot in snapshots:
+            user_id = snapshot['user_id']
+            if CartRepository.save_lines(snapshot['cart_id'], snapshot['lines'], snapshot['version'],
+                                         expected_version=snapshot['base_version']):
+                flushed.append(user_id)
+                continue
+            logger.warning(f"Cart of user {user_id} changed in the database; rebasing the store's changes")
+            db.session.expire_all()
+            store.rebase(user_id, load_snapshot(user_id))
+            rebased.append(user_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        store.finish_flush([snapshot['user_id'] for snapshot in snapshots], ok=False)
+        raise
+    store.finish_flush(flushed)
+    store.finish_flush(rebased, ok=False)
+    return len(flushed)
+
+
+def release_cart(store, user_id: int, timeout: float = 5.0) -> None:
+    """
+    Flush a user's cart now and drop it from the store, so the database copy
+    is authoritative. Waits for a flush already in flight rather than racing
+    it. To write the cart in the database, use held_cart() so it is not
+    loaded again meanwhile.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        flush_carts(store, [user_id])
+        snapshot = store.snapshot(user_id)
+        if snapshot is None or store.evict(user_id, snapshot['version']):
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(f'Cart of user {user_id} is still being flushed')
+        time.sleep(0.01)
+
+
+@contextmanager
+def held_cart(store, *user_ids: int, timeout: float = 5.0):
+    """
+    Release the users' carts and keep them out of the store for the block
+    (database writes: bulk operations, merges, checkout). Store operations
+    on them wait until the block ends. No-op without a store.
+    """
+    held = []
+    try:
+        if store is not None:
+            deadline = time.monotonic() + timeout
+            for user_id in user_ids:
+                while True:
+                    release_cart(store, user_id, max(deadline - time.monotonic(), 0))
+                    if store.hold(user_id):
+                        held.append(user_id)
+                        break
+                    if time.monotonic() > deadline:  # Loaded again before we could hold it
+                        raise TimeoutError(f'Cart of user {user_id} is busy in the cart store')
+        yield
+    finally:
+        for user_id in held:
+            store.unhold(user_id)
+
+
+class CartFlusher(threading.Thread):
+    """Background write-behind: flush changed carts every interval, drop idle ones."""
+
+    def __init__(self, app, store, interval: float, max_idle: float):
+        super().__init__(name='cart-flusher', daemon=True)
+        self.app = app
+        self.store = store
+        self.interval = interval
+        self.max_idle = max_idle
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self) -> None:
+        with self.app.app_context():
+            try:
+                flush_carts(self.store)
+                self.store.evict_idle(self.max_idle)
+            except Exception:
+                logger.exception("Cart flush failed; changes stay queued")
+
+    def stop(self) -> None:
+        """Stop the loop and write what is still queued (process exit)."""
+        self._stopped.set()
+        self.flush()
+
+
+def _server_workers() -> int:
+    """Worker processes the app server was asked for (WEB_CONCURRENCY, gunicorn -w/--workers)."""
+    match = re.search(r'(?:-w|--workers)[=\s]*(\d+)', os.environ.get('GUNICORN_CMD_ARGS', ''))
+    workers = match.group(1) if match else os.environ.get('WEB_CONCURRENCY', '1')
+    try:
+        return int(workers)
+    except ValueError:
+        return 1
+
+
+def init_cart_store(app):
+    """
+    Set up the backend named by CART_STORE: 'sql' (default, no store),
+    'memory' (this process only, so a single-worker server) or 'tcp' (shared
+    store at CART_STORE_ADDRESS, for several workers or nodes).
+    """
+    backend = app.config.get('CART_STORE', 'sql')
+    if backend == 'sql':
+        use_cart_store(None)
+        return None
+    if backend == 'memory':
+        workers = _server_workers()
+        if workers > 1:
+            # Each worker would hold its own copy of a cart and the copies diverge
+            raise ValueError(f"CART_STORE='memory' keeps carts in one process but the server runs "
+                             f"{workers} workers; use CART_STORE='tcp' with a shared store")
+        store = HotCartStore()
+    elif backend == 'tcp':
+        host, _, port = app.config['CART_STORE_ADDRESS'].rpartition(':')
+        store = connect_cart_store(host or '127.0.0.1', int(port), app.secret_key.encode())
+    else:
+        raise ValueError(f'Unknown CART_STORE backend: {backend}')
+
+    use_cart_store(store)
+    app.extensions['cart_store'] = store
+    flusher = CartFlusher(app, store, app.config.get('CART_STORE_FLUSH_INTERVAL', 2.0),
+                          app.config.get('CART_STORE_MAX_IDLE', 1800))
+    flusher.start()
+    atexit.register(flusher.stop)
+    app.extensions['cart_flusher'] = flusher
+    return store
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the shared hot cart store')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6380)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    serve_cart_store(args.host, args.port, Config.SECRET_KEY.encode())
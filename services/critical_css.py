@@ -0,0 +1,230 @@
+"""
+Critical CSS Service
+Build step that splits style.css per template, computed offline from the
+Jinja source: an inline "critical" subset for the markup above the fold and
+a bundle with the selectors the template never uses removed. base.html
+inlines the critical subset and loads the bundle without blocking render.
+"""
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
+import json
+import logging
+import os
+import re
+import tempfile
+
+from flask import before_render_template
+
+logger = logging.getLogger(__name__)
+
+CSS_MANIFEST_FILENAME = '.css_manifest.json'
+CSS_MANIFEST_VERSION = 1
+SOURCE_STYLESHEET = 'css/style.css'
+BUNDLE_DIR = 'css/pages'
+FOLD_CHARS = 2500  # Markup of the content block treated as above the fold
+ALWAYS_CRITICAL = {'*', ':root', 'html', 'body'}
+
+_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_TOKEN = re.compile(r'[A-Za-z_][\w-]*')
+_PSEUDO = re.compile(r'::?[\w-]+(\([^)]*\))?')
+_ATTRIBUTE = re.compile(r'\[[^\]]*\]')
+_EXTENDS = re.compile(r'{%-?\s*extends\s+[\'"]([^\'"]+)[\'"]')
+_CONTENT_BLOCK = re.compile(r'{%-?\s*block\s+content\s*-?%}')
+
+Rule = Tuple[str, Union[str, list]]
+
+
+def parse_css(css: str) -> List[Rule]:
+    """
+    Split a stylesheet into (prelude, body) pairs. @media/@supports bodies are
+    parsed recursively into lists; every other body is kept as text.
+    """
+    css = _COMMENT.sub('', css)
+    rules, position = [], 0
+    while True:
+        start = css.find('{', position)
+        if start == -1:
+            return rules
+        prelude = css[position:start].strip()
+        depth, end = 1, start + 1
+        while depth and end < len(css):
+            depth += {'{': 1, '}': -1}.get(css[end], 0)
+            end += 1
+        body = css[start + 1:end - 1]
+        if prelude.startswith(('@media', '@supports')):
+            rules.append((prelude, parse_css(body)))
+        else:
+            rules.append((prelude, ' '.join(body.split())))
+        position = end
+
+
+def serialize_css(rules: List[Rule]) -> str:
+    parts = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            parts.append(f'{prelude}{{{serialize_css(body)}}}')
+        else:
+            parts.append(f'{prelude}{{{body}}}')
+    return '\n'.join(parts)
+
+
+def markup_tokens(text: str) -> Set[str]:
+    """Every identifier-like word in template or script source."""
+    return set(_TOKEN.findall(text))
+
+
+def selector_used(selector: str, tokens: Set[str]) -> bool:
+    """
+    True if every class, id and element name in selector occurs in tokens.
+    Tokens ending in '-' come from dynamic names such as
+    class="status-{{ order.status }}" and match as prefixes.
+    """
+    if selector in ALWAYS_CRITICAL:
+        return True
+    prefixes = tuple(t for t in tokens if t.endswith('-'))
+    for name in _TOKEN.findall(_ATTRIBUTE.sub('', _PSEUDO.sub('', selector))):
+        if name not in tokens and not (prefixes and name.startswith(prefixes)):
+            return False
+    return True
+
+
+def prune_rules(rules: List[Rule], tokens: Set[str], keep_at_rules: bool = True) -> List[Rule]:
+    """Rules (and selectors within rules) that can match markup made of tokens."""
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            inner = prune_rules(body, tokens, keep_at_rules)
+            if inner:
+                kept.append((prelude, inner))
+        elif prelude.startswith('@'):
+            if keep_at_rules:
+                kept.append((prelude, body))
+        else:
+            selectors = [s.strip() for s in prelude.split(',')]
+            used = [s for s in selectors if selector_used(s, tokens)]
+            if used:
+                kept.append((', '.join(used), body))
+    return kept
+
+
+def template_sources(templates_dir: str, name: str) -> List[str]:
+    """Source of a template followed by the templates it extends."""
+    sources = []
+    while name:
+        with open(os.path.join(templates_dir, *name.split('/'))) as f:
+            source = f.read()
+        sources.append(source)
+        match = _EXTENDS.search(source)
+        name = match.group(1) if match else None
+    return sources
+
+
+def above_the_fold(sources: List[str]) -> str:
+    """Layout markup before the content block plus the start of the page's content."""
+    fold = []
+    for source in sources:
+        match = _CONTENT_BLOCK.search(source)
+        if match is None:
+            continue
+        if _EXTENDS.search(source):
+            fold.append(source[match.end():match.end() + FOLD_CHARS])
+        else:
+            fold.append(source[:match.start()])
+    return '\n'.join(fold)
+
+
+def build_css_bundles(static_dir: str, templates_dir: str, script_files: List[str] = ()) -> Dict[str, Any]:
+    """
+    Write static/css/pages/<template>.css for every page template and
+    return {'version': int, 'templates': {name: {'critical': css, 'bundle': filename}}}.
+    Tokens from script_files count as used by every page (classes added at runtime).
+    """
+    with open(os.path.join(static_dir, *SOURCE_STYLESHEET.split('/'))) as f:
+        rules = parse_css(f.read())
+
+    script_tokens = set()
+    for path in script_files:
+        with open(path) as f:
+            script_tokens |= markup_tokens(f.read())
+
+    templates = {}
+    for root, dirs, files in os.walk(templates_dir):
+        dirs.sort()
+        for filename in sorted(files):
+            if not filename.endswith('.html'):
+                continue
+            name = os.path.relpath(os.path.join(root, filename), templates_dir).replace(os.sep, '/')
+            sources = template_sources(templates_dir, name)
+            if len(sources) == 1:
+                continue  # Layouts are never rendered on their own
+
+            bundle_rules = prune_rules(rules, markup_tokens('\n'.join(sources)) | script_tokens)
+            critical_rules = prune_rules(bundle_rules, markup_tokens(above_the_fold(sources)),
+                                         keep_at_rules=False)
+
+            bundle = f'{BUNDLE_DIR}/{os.path.splitext(name)[0]}.css'
+            bundle_path = os.path.join(static_dir, *bundle.split('/'))
+            os.makedirs(os.path.dirname(bundle_path), exist_ok=True)
+            css = serialize_css(bundle_rules) + '\n'
+            try:
+                with open(bundle_path) as f:
+                    unchanged = f.read() == css
+            except OSError:
+                unchanged = False
+            if not unchanged:  # Keep mtimes stable so .br/.gz siblings stay valid
+                with open(bundle_path, 'w') as f:
+                    f.write(css)
+            templates[name] = {'critical': serialize_css(critical_rules), 'bundle': bundle}
+
+    return {'version': CSS_MANIFEST_VERSION, 'templates': templates}
+
+
+def write_css_manifest(static_dir: str, manifest: Dict[str, Any]) -> str:
+    """Atomically write the manifest into static_dir."""
+    path = os.path.join(static_dir, CSS_MANIFEST_FILENAME)
+    fd, tmp_path = tempfile.mkstemp(dir=static_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+class CssManifest:
+    """Lookup from template names to their critical CSS and pruned bundle."""
+
+    def __init__(self, templates: Dict[str, Dict[str, str]] = None):
+        self.templates = templates or {}
+
+    @classmethod
+    def load(cls, path: str) -> 'CssManifest':
+        """Load a manifest file; a missing or unreadable file yields an empty manifest."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            logger.info(f"No CSS manifest at {path}; pages load the full stylesheet")
+            return cls()
+        if data.get('version') != CSS_MANIFEST_VERSION:
+            logger.warning(f"Ignoring CSS manifest with version {data.get('version')}")
+            return cls()
+        return cls(data.get('templates', {}))
+
+    def get(self, template_name: str) -> Optional[Dict[str, str]]:
+        return self.templates.get(template_name)
+
+
+def init_css_manifest(app) -> CssManifest:
+    """
+    Load the manifest once for this worker and expose the rendered template's
+    entry to base.html as page_css. Set CRITICAL_CSS = False to disable.
+    """
+    if app.config.get('CRITICAL_CSS', True):
+        css_manifest = CssManifest.load(os.path.join(app.static_folder, CSS_MANIFEST_FILENAME))
+    else:
+        css_manifest = CssManifest()
+    app.extensions['css_manifest'] = css_manifest
+
+    def set_page_css(sender, template, context, **extra):
+        context.setdefault('page_css', app.extensions['css_manifest'].get(template.name))
+
+    before_render_template.connect(set_page_css, app, weak=False)
+    return css_manifest
@@ -0,0 +1,172 @@
+"""
+Frozen Public Pages
+Renders the catalog-only public pages (home, about, contact, gallery,
+heritage, shop categories, every product) to static HTML with .br/.gz
+siblings at deploy time, and serves them to anonymous visitors without
+running the views.
+"""
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+from urllib.parse import parse_qsl, urlencode
+
+from flask import request, send_from_directory
+
+from services.precompressed import negotiate_encoding, precompress_file, ENCODING_SUFFIXES
+
+logger = logging.getLogger(__name__)
+
+FROZEN_MANIFEST_FILENAME = '.frozen_manifest.json'
+STATIC_PAGE_URLS = ['/', '/about', '/contact', '/design-gallery', '/indian-heritage']
+
+
+def public_page_urls(products: List[Dict[str, Any]]) -> List[str]:
+    """Every URL that is a pure function of the catalog."""
+    categories = sorted({p['category'] for p in products})
+    return (
+        STATIC_PAGE_URLS
+        + ['/shop'] + [f'/shop?category={c}' for c in ['all'] + categories]
+        + [f"/product/{p['id']}" for p in products]
+    )
+
+
+def page_key(path: str, query_string: str = '') -> str:
+    """Canonical lookup key: path plus sorted query parameters."""
+    query = urlencode(sorted(parse_qsl(query_string, keep_blank_values=True)))
+    return f'{path}?{query}' if query else path
+
+
+def frozen_filename(key: str) -> str:
+    """'/' -> 'index.html', '/shop?category=heritage' -> 'shop/category-heritage/index.html'"""
+    path, _, query = key.partition('?')
+    parts = [p for p in path.split('/') if p]
+    if query:
+        parts.append(''.join(c if c.isalnum() else '-' for c in query))
+    return '/'.join(parts + ['index.html'])
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def render_pages(urls: List[str], output_dir: str) -> Dict[str, str]:
+    """
+    Process pool entry point - render URLs as an anonymous visitor.
+    Returns {page key: filename} for pages that rendered with 200.
+    """
+    from app import app
+    app.config['PAGE_CACHE_ENABLED'] = False
+
+    pages = {}
+    client = app.test_client()
+    for url in urls:
+        response = client.get(url, headers={'Accept-Encoding': 'identity'})
+        if response.status_code != 200 or response.mimetype != 'text/html':
+            logger.warning(f"Not freezing {url}: {response.status_code}")
+            continue
+        path, _, query = url.partition('?')
+        key = page_key(path, query)
+        filename = frozen_filename(key)
+        target = os.path.join(output_dir, *filename.split('/'))
+        _write_atomic(target, response.get_data())
+        precompress_file(target)
+        pages[key] = filename
+    return pages
+
+
+def freeze_pages(app, urls: List[str], output_dir: str, workers: int = None) -> Dict[str, Any]:
+    """
+    Render urls into output_dir in parallel and write the frozen manifest.
+    The manifest records the release and catalog versions so a server only
+    uses pages built from the code it is running.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(urls)))
+    chunks = [urls[i::workers] for i in range(workers)]
+
+    pages = {}
+    if workers == 1:
+        pages.update(render_pages(urls, output_dir))
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            for result in executor.map(render_pages, chunks, [output_dir] * workers):
+                pages.update(result)
+
+    manifest = {
+        'release_version': app.config.get('RELEASE_VERSION'),
+        'catalog_version': app.config.get('CATALOG_VERSION'),
+        'pages': pages
+    }
+    _write_atomic(os.path.join(output_dir, FROZEN_MANIFEST_FILENAME),
+                  json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+class FrozenPages:
+    """Lookup of frozen pages that match the running release."""
+
+    def __init__(self, directory: str, pages: Dict[str, str] = None):
+        self.directory = directory
+        self.pages = pages or {}
+
+    @classmethod
+    def load(cls, directory: str, release_version: str, catalog_version: str) -> 'FrozenPages':
+        try:
+            with open(os.path.join(directory, FROZEN_MANIFEST_FILENAME)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f"No frozen pages in {directory}; run 'python build_assets.py --freeze'")
+            return cls(directory)
+        if (manifest.get('release_version'), manifest.get('catalog_version')) != \
+                (release_version, catalog_version):
+            logger.warning("Frozen pages were built from another release; ignoring them")
+            return cls(directory)
+        return cls(directory, manifest.get('pages', {}))
+
+    def lookup(self, path: str, query_string: str = '') -> Optional[str]:
+        return self.pages.get(page_key(path, query_string))
+
+
+def init_frozen_pages(app) -> Optional[FrozenPages]:
+    """
+    With SERVE_FROZEN_PAGES on, answer anonymous GETs for frozen URLs from
+    disk (sendfile, precompressed) before any view runs.
+    """
+    if not app.config.get('SERVE_FROZEN_PAGES'):
+        return None
+
+    directory = app.config['FROZEN_PAGES_DIR']
+    if not os.path.isabs(directory):
+        directory = os.path.join(app.root_path, directory)
+    frozen = FrozenPages.load(directory, app.config.get('RELEASE_VERSION'), app.config.get('CATALOG_VERSION'))
+    app.extensions['frozen_pages'] = frozen
+
+    @app.before_request
+    def serve_frozen_page():
+        if request.method not in ('GET', 'HEAD') or app.config['SESSION_COOKIE_NAME'] in request.cookies:
+            return None
+        filename = frozen.lookup(request.path, request.query_string.decode('latin-1'))
+        if filename is None:
+            return None
+
+        encoding = negotiate_encoding(frozen.directory, filename)
+        response = send_from_directory(
+            frozen.directory,
+            filename + ENCODING_SUFFIXES[encoding] if encoding else filename,
+            mimetype='text/html'
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.update(['Accept-Encoding', 'Cookie'])
+        return response
+
+    return frozen
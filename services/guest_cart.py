@@ -0,0 +1,156 @@
+"""
+Guest Carts
+Anonymous visitors' carts live in a compact signed cookie holding only
+(product_id, size, quantity) lines, priced from the catalog when needed, so
+browsing and adding to cart write nothing server-side. At login the lines are
+merged into the user's cart in one transaction by the bulk upsert path.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+from flask import current_app, g, request
+from itsdangerous import BadSignature, URLSafeSerializer
+
+logger = logging.getLogger(__name__)
+
+GUEST_CART_COOKIE = 'guest_cart'
+GUEST_CART_SALT = 'guest-cart'
+
+Line = Tuple[int, str, int]  # (product_id, size, quantity)
+
+
+class GuestCart:
+    """Lines of an anonymous visitor's cart and a version bumped on each change."""
+
+    __slots__ = ('lines', 'version')
+
+    def __init__(self, lines: List[Line] = None, version: int = 0):
+        self.lines = list(lines or [])
+        self.version = version
+
+    @property
+    def item_count(self) -> int:
+        return sum(quantity for _, _, quantity in self.lines)
+
+    def add(self, product_id: int, size: str, quantity: int) -> None:
+        for index, (line_product, line_size, line_quantity) in enumerate(self.lines):
+            if (line_product, line_size) == (product_id, size):
+                self.lines[index] = (product_id, size, line_quantity + quantity)
+                break
+        else:
+            self.lines.append((product_id, size, quantity))
+        self.version += 1
+
+
+def _serializer() -> URLSafeSerializer:
+    # URLSafeSerializer zlib-compresses payloads when that makes them shorter
+    return URLSafeSerializer(current_app.secret_key, salt=GUEST_CART_SALT)
+
+
+def dump_guest_cart(cart: GuestCart) -> str:
+    return _serializer().dumps([cart.version, [list(line) for line in cart.lines]])
+
+
+def load_guest_cart() -> GuestCart:
+    """This request's guest cart; a missing, tampered or stale cookie yields an empty cart."""
+    if 'guest_cart' in g:
+        return g.guest_cart
+
+    cart = GuestCart()
+    raw = request.cookies.get(GUEST_CART_COOKIE)
+    if raw:
+        catalog = current_app.extensions.get('product_catalog', {})
+        try:
+            version, lines = _serializer().loads(raw)
+            cart = GuestCart([
+                (int(product_id), str(size), int(quantity))
+                for product_id, size, quantity in lines
+                if int(product_id) in catalog and int(quantity) > 0
+            ], int(version))
+        except (BadSignature, TypeError, ValueError):
+            logger.info("Ignoring unreadable guest cart cookie")
+    g.guest_cart = cart
+    return cart
+
+
+def add_to_guest_cart(product_id, quantity=1, size: str = 'M') -> Dict[str, Any]:
+    """Add a catalog product to the guest cart; the cookie is rewritten after the request."""
+    catalog = current_app.extensions.get('product_catalog', {})
+    try:
+        product_id, quantity = int(product_id), int(quantity)
+    except (TypeError, ValueError):
+        return {'success': False, 'message': 'Invalid product or quantity'}
+    size = str(size or 'M')[:10]
+    if product_id not in catalog:
+        return {'success': False, 'message': 'Product not found'}
+    if quantity <= 0:
+        return {'success': False, 'message': 'Quantity must be positive'}
+
+    cart = load_guest_cart()
+    max_lines = current_app.config.get('GUEST_CART_MAX_LINES', 20)
+    if len(cart.lines) >= max_lines and all((p, s) != (product_id, size) for p, s, _ in cart.lines):
+        return {'success': False, 'message': f'A guest cart holds at most {max_lines} products; log in to add more'}
+
+    cart.add(product_id, size, quantity)
+    g.guest_cart_changed = True
+    return {'success': True, 'message': 'Item added to cart', 'cart_count': cart.item_count}
+
+
+def guest_cart_items(cart: GuestCart) -> List[Dict[str, Any]]:
+    """Guest cart lines as bulk_add_to_cart items, with name, price and image from the catalog."""
+    catalog = current_app.extensions.get('product_catalog', {})
+    return [{
+        'product_id': product_id,
+        'product_name': catalog[product_id]['name'],
+        'price': catalog[product_id]['price'],
+        'product_image': catalog[product_id].get('image'),
+        'quantity': quantity,
+        'size': size
+    } for product_id, size, quantity in cart.lines if product_id in catalog]
+
+
+def claim_guest_cart(user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Merge the guest cart into a user's cart at login (one upsert, one commit)
+    and drop the cookie. Returns the bulk add result, or None without a
+    guest cart. On failure the cookie is kept so the next login retries.
+    """
+    cart = load_guest_cart()
+    if not cart.lines:
+        return None
+
+    from services import CartService
+    result = CartService().bulk_add_to_cart(user_id, guest_cart_items(cart))
+    if result['success']:
+        g.guest_cart = GuestCart()
+        g.guest_cart_changed = True
+    else:
+        logger.warning(f"Could not merge guest cart for user {user_id}: {result['message']}")
+    return result
+
+
+def init_guest_cart(app, products: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """Index the catalog for guest carts and register the cookie writer."""
+    catalog = {product['id']: product for product in products}
+    app.extensions['product_catalog'] = catalog
+
+    @app.after_request
+    def write_guest_cart_cookie(response):
+        if not g.get('guest_cart_changed'):
+            return response
+        domain = app.config.get('SESSION_COOKIE_DOMAIN') or None
+        cart = g.guest_cart
+        if cart.lines:
+            response.set_cookie(
+                GUEST_CART_COOKIE, dump_guest_cart(cart),
+                max_age=app.config.get('GUEST_CART_MAX_AGE', 30 * 24 * 3600),
+                secure=app.config.get('SESSION_COOKIE_SECURE', False),
+                httponly=True,
+                samesite=app.config.get('SESSION_COOKIE_SAMESITE') or 'Lax',
+                domain=domain
+            )
+        else:
+            response.delete_cookie(GUEST_CART_COOKIE, domain=domain)
+        return response
+
+    return catalog
@@ -0,0 +1,74 @@
+"""
+HTTP validators for conditional GET.
+Strong ETags are derived from the release (templates + build manifests), the
+catalog version, the request and a per-route data version, so a 304 can be
+answered before any rendering or serialization.
+"""
+from typing import Optional
+import hashlib
+import os
+
+from flask import current_app, request, session
+
+
+def compute_release_version(app) -> str:
+    """Hash of every template and the asset/image/CSS manifests; changes with each deploy."""
+    digest = hashlib.sha256()
+    folder = os.path.join(app.root_path, app.template_folder)
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, folder).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+
+    assets = app.extensions.get('asset_manifest')
+    if assets is not None:
+        digest.update(repr(sorted(assets.assets.items())).encode())
+    images = app.extensions.get('image_manifest')
+    if images is not None:
+        digest.update(repr(sorted((key, entry['hash']) for key, entry in images.images.items())).encode())
+    css = app.extensions.get('css_manifest')
+    if css is not None:
+        digest.update(repr(sorted((name, entry['bundle']) for name, entry in css.templates.items())).encode())
+    return digest.hexdigest()[:12]
+
+
+def make_etag(data_version: str = '', variant: str = '') -> str:
+    """Strong ETag for the current request and data version."""
+    key = '|'.join([
+        current_app.config.get('RELEASE_VERSION', ''),
+        current_app.config.get('CATALOG_VERSION', ''),
+        request.path,
+        request.query_string.decode('latin-1'),
+        variant,
+        data_version
+    ])
+    return hashlib.sha256(key.encode()).hexdigest()[:24]
+
+
+def matching_etag(etag: str) -> Optional[str]:
+    """
+    The If-None-Match entry that matches etag, or None.
+    Encoded representations carry a suffix ('-br' from our caches, ':gzip'
+    from Flask-Compress), which still identifies the same data.
+    """
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return None
+    if if_none_match.star_tag:
+        return etag
+    for candidate in if_none_match.as_set():
+        if candidate == etag or candidate.startswith((etag + '-', etag + ':')):
+            return candidate
+    return None
+
+
+def visitor_variant() -> str:
+    """Which shared variant of a public page this visitor sees."""
+    if 'user_id' in session:
+        return 'user'
+    if 'admin_id' in session:
+        return 'admin'
+    return 'anonymous'
@@ -0,0 +1,226 @@
+"""
+Image Manifest Service
+Build-time metadata for every image under static/images (dimensions, bytes,
+dominant colour, content hash, responsive derivatives). The manifest is read
+once per worker so templates and JSON APIs never touch the filesystem at
+request time.
+"""
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MANIFEST_FILENAME = '.image_manifest.json'
+IMAGE_MANIFEST_VERSION = 1
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg'}
+SKIP_DIRECTORIES = {'mockup_templates'}
+DEFAULT_DOMINANT_COLOR = '#f0f0f0'
+DERIVATIVE_PATTERN = re.compile(r'^(?P<stem>.+)-(?P<width>\d+)w\.(?P<ext>jpg|webp)$')
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dominant_color(img) -> str:
+    """Most common colour of a small palette-reduced copy, as '#rrggbb'."""
+    small = img.convert('RGB')
+    small.thumbnail((64, 64))
+    palette_img = small.quantize(colors=5)
+    count, index = max(palette_img.getcolors())
+    palette = palette_img.getpalette()
+    r, g, b = palette[index * 3:index * 3 + 3]
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def describe_image(path: str) -> Dict[str, Any]:
+    """Metadata for a single image file."""
+    entry = {
+        'bytes': os.path.getsize(path),
+        'hash': _file_hash(path)[:12],
+        'width': None,
+        'height': None,
+        'dominant_color': DEFAULT_DOMINANT_COLOR,
+        'derivatives': []
+    }
+    if path.lower().endswith('.svg'):
+        return entry
+
+    from PIL import Image
+    with Image.open(path) as img:
+        entry['width'], entry['height'] = img.size
+        entry['dominant_color'] = dominant_color(img)
+    return entry
+
+
+def build_image_manifest(images_dir: str) -> Dict[str, Any]:
+    """
+    Walk images_dir and describe every image.
+    Derivatives named '<stem>-<width>w.jpg|webp' are attached to their source image.
+    Returns: {'version': int, 'images': {relative_path: entry}}
+    """
+    images = {}
+    derivatives = []
+
+    for root, dirs, files in os.walk(images_dir):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRECTORIES and not d.startswith('.'))
+        for filename in sorted(files):
+            if filename.startswith('.') or os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            path = os.path.join(root, filename)
+            relative = os.path.relpath(path, images_dir).replace(os.sep, '/')
+
+            match = DERIVATIVE_PATTERN.match(filename)
+            if match:
+                derivatives.append((relative, match))
+                continue
+
+            try:
+                images[relative] = describe_image(path)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable image {relative}: {e}")
+
+    for relative, match in derivatives:
+        directory = os.path.dirname(relative)
+        stem = f"{directory}/{match.group('stem')}" if directory else match.group('stem')
+        source = next((key for key in images if os.path.splitext(key)[0] == stem), None)
+        if source:
+            images[source]['derivatives'].append({
+                'path': relative,
+                'width': int(match.group('width')),
+                'format': match.group('ext')
+            })
+
+    for entry in images.values():
+        entry['derivatives'].sort(key=lambda d: (d['format'], d['width']))
+
+    return {'version': IMAGE_MANIFEST_VERSION, 'images': images}
+
+
+def write_image_manifest(images_dir: str, manifest: Dict[str, Any] = None) -> str:
+    """Build (unless given) and atomically write the manifest into images_dir."""
+    manifest = manifest or build_image_manifest(images_dir)
+    path = os.path.join(images_dir, IMAGE_MANIFEST_FILENAME)
+    fd, tmp_path = tempfile.mkstemp(dir=images_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+class ImageManifest:
+    """Read-only view of the image manifest with template-ready lookups."""
+
+    def __init__(self, images: Dict[str, Dict[str, Any]] = None, static_url_path: str = '/static',
+                 assets=None):
+        self.images = images or {}
+        self.static_url_path = static_url_path.rstrip('/')
+        self.assets = assets
+        self._views = {}
+
+    @classmethod
+    def load(cls, path: str, static_url_path: str = '/static', assets=None) -> 'ImageManifest':
+        """Load a manifest file; a missing or unreadable file yields an empty manifest."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            logger.info(f"No image manifest at {path}; image metadata disabled")
+            return cls(static_url_path=static_url_path, assets=assets)
+        if data.get('version') != IMAGE_MANIFEST_VERSION:
+            logger.warning(f"Ignoring image manifest with version {data.get('version')}")
+            return cls(static_url_path=static_url_path, assets=assets)
+        return cls(data.get('images', {}), static_url_path, assets)
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        """Map '/static/images/x.jpg', 'images/x.jpg' and 'x.jpg' to the manifest key 'x.jpg'."""
+        path = (path or '').split('?', 1)[0].lstrip('/')
+        for prefix in ('static/', 'images/'):
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+        return path
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """Raw manifest entry for an image, or None if it is not in the manifest."""
+        return self.images.get(self.normalize(path))
+
+    def _url(self, key: str, content_hash: str = None) -> str:
+        hashed = self.assets.get(f'images/{key}') if self.assets else None
+        if hashed:
+            return f'{self.static_url_path}/{hashed}'
+        url = f'{self.static_url_path}/images/{key}'
+        return f'{url}?v={content_hash}' if content_hash else url
+
+    def image(self, path: str) -> Dict[str, Any]:
+        """
+        Template/API view of an image.
+        Returns: {'url': str, 'width': int, 'height': int, 'dominant_color': str,
+                  'srcset': str, 'webp_srcset': str, 'bytes': int}
+        Unknown images get a plain URL and no dimensions.
+        """
+        key = self.normalize(path)
+        view = self._views.get(key)
+        if view is not None:
+            return view
+
+        entry = self.images.get(key)
+        if not entry:
+            return {
+                'url': self._url(key),
+                'width': None,
+                'height': None,
+                'dominant_color': DEFAULT_DOMINANT_COLOR,
+                'srcset': '',
+                'webp_srcset': '',
+                'bytes': None
+            }
+
+        def srcset(fmt: str) -> str:
+            return ', '.join(
+                f"{self._url(d['path'], entry['hash'])} {d['width']}w"
+                for d in entry['derivatives'] if d['format'] == fmt
+            )
+
+        view = {
+            'url': self._url(key, entry['hash']),
+            'width': entry['width'],
+            'height': entry['height'],
+            'dominant_color': entry['dominant_color'],
+            'srcset': srcset('jpg'),
+            'webp_srcset': srcset('webp'),
+            'bytes': entry['bytes']
+        }
+        self._views[key] = view
+        return view
+
+    def public_fields(self, path: str) -> Dict[str, Any]:
+        """Subset of image() for JSON APIs."""
+        view = self.image(path)
+        return {key: view[key] for key in ('url', 'width', 'height', 'dominant_color')}
+
+
+image_manifest = ImageManifest()
+
+
+def init_image_manifest(app) -> ImageManifest:
+    """Load the manifest once for this worker and expose image_meta() to templates."""
+    global image_manifest
+    path = os.path.join(app.static_folder, 'images', IMAGE_MANIFEST_FILENAME)
+    image_manifest = ImageManifest.load(path, app.static_url_path, app.extensions.get('asset_manifest'))
+    app.extensions['image_manifest'] = image_manifest
+    app.jinja_env.globals['image_meta'] = image_manifest.image
+    return image_manifest
+
+
+def get_image_manifest() -> ImageManifest:
+    return image_manifest
@@ -0,0 +1,254 @@
+"""
+JavaScript Bundle Service
+Build step that concatenates the page scripts, drops top-level functions
+nothing calls (neither the scripts nor the templates' inline handlers) and
+minifies the result into static/js/app.min.js. The asset manifest then gives
+it a content-hashed URL; base.html preloads it and loads it with defer.
+"""
+from typing import Dict, Any, List, Set, Tuple
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FILENAME = 'js/app.min.js'
+BUNDLE_SOURCES = ['js/main.js']  # Scripts base.html loads on every page, in order
+
+_IDENTIFIER = re.compile(r'[A-Za-z_$][\w$]*')
+_FUNCTION = re.compile(r'(?:async\s+)?function\s+([A-Za-z_$][\w$]*)\s*\(')
+# After these characters (or keywords) a '/' starts a regex literal, not a division
+_REGEX_PREFIX = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw'}
+# Whitespace between these and a neighbour can go; a newline is kept elsewhere for ASI
+_NO_NEWLINE_AFTER = set('{;,([=:?&|+*<>!')
+_NO_NEWLINE_BEFORE = set('});,.]:?&|=')
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char in '_$'
+
+
+def _skip_string(source: str, i: int) -> int:
+    """Index just past the string/template literal starting at source[i]."""
+    quote, i = source[i], i + 1
+    depth = 0
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if quote == '`' and source.startswith('${', i):
+            depth += 1
+            i += 2
+            continue
+        if quote == '`' and depth and char == '}':
+            depth -= 1
+        elif char == quote and not depth:
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_regex(source: str, i: int) -> int:
+    """Index just past the regex literal (and flags) starting at source[i]."""
+    i += 1
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            i += 1
+            while i < len(source) and _is_word(source[i]):
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def _regex_allowed(out: List[str]) -> bool:
+    text = ''.join(out[-12:]).rstrip()
+    if not text:
+        return True
+    if text[-1] in _REGEX_PREFIX:
+        return True
+    match = re.search(r'[A-Za-z_$][\w$]*$', text)
+    return bool(match) and match.group(0) in _REGEX_KEYWORDS
+
+
+def minify_js(source: str) -> str:
+    """
+    Strip comments and collapse whitespace. Strings, template literals and
+    regex literals are copied verbatim; line breaks that automatic semicolon
+    insertion may depend on are kept.
+    """
+    out = []
+    i, length = 0, len(source)
+    pending_space = pending_newline = False
+
+    while i < length:
+        char = source[i]
+        if char in ' \t\r\n':
+            pending_space = True
+            pending_newline = pending_newline or char == '\n'
+            i += 1
+            continue
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = length if end == -1 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            pending_space = True
+            i = length if end == -1 else end + 2
+            continue
+
+        if pending_space and out:
+            prev = out[-1][-1]
+            if pending_newline and prev not in _NO_NEWLINE_AFTER and char not in _NO_NEWLINE_BEFORE:
+                out.append('\n')
+            elif (_is_word(prev) and _is_word(char)) or (prev == char and char in '+-'):
+                out.append(' ')
+        pending_space = pending_newline = False
+
+        if char in '\'"`':
+            end = _skip_string(source, i)
+        elif char == '/' and _regex_allowed(out):
+            end = _skip_regex(source, i)
+        else:
+            end = i + 1
+        out.append(source[i:end])
+        i = end
+
+    return ''.join(out).strip() + '\n'
+
+
+def _block_end(source: str, start: int) -> int:
+    """Index just past the brace block opened at or after start."""
+    i = source.index('{', start)
+    depth = 0
+    while i < len(source):
+        char = source[i]
+        if char in '\'"`':
+            i = _skip_string(source, i)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _top_level_functions(source: str) -> List[tuple]:
+    """(name, start, end) of every function declaration at brace depth 0 of minified source."""
+    functions = []
+    depth, i = 0, 0
+    while i < len(source):
+        char = source[i]
+        if char in '\'"`':
+            i = _skip_string(source, i)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif depth == 0 and (i == 0 or not _is_word(source[i - 1])):
+            match = _FUNCTION.match(source, i)
+            if match:
+                end = _block_end(source, match.end())
+                functions.append((match.group(1), i, end))
+                i = end
+                continue
+        i += 1
+    return functions
+
+
+def shake_unused_functions(source: str, external_tokens: Set[str]) -> Tuple[str, List[str]]:
+    """
+    Remove top-level function declarations whose name appears nowhere else in
+    source or external_tokens (e.g. onclick="addToCart(...)" in templates).
+    Repeats until nothing more can go. Returns (source, removed names).
+    """
+    removed = []
+    while True:
+        unused = None
+        for name, start, end in _top_level_functions(source):
+            rest = source[:start] + source[end:]
+            if name not in external_tokens and not re.search(rf'(?<![\w$]){re.escape(name)}(?![\w$])', rest):
+                unused = (name, start, end)
+                break
+        if unused is None:
+            return source, removed
+        name, start, end = unused
+        source = source[:start] + source[end:]
+        removed.append(name)
+
+
+def template_tokens(templates_dir: str) -> Set[str]:
+    """Identifiers used anywhere in the Jinja templates (inline scripts and handlers)."""
+    tokens = set()
+    for root, _, files in os.walk(templates_dir):
+        for name in files:
+            if name.endswith('.html'):
+                with open(os.path.join(root, name)) as f:
+                    tokens |= set(_IDENTIFIER.findall(f.read()))
+    return tokens
+
+
+def build_js_bundle(static_dir: str, templates_dir: str, sources: List[str] = None) -> Dict[str, Any]:
+    """
+    Write static/js/app.min.js from the page scripts.
+    Returns {'bundle': filename, 'sources': [...], 'removed': [...], 'bytes': (before, after)}
+    """
+    sources = sources or BUNDLE_SOURCES
+    parts = []
+    for filename in sources:
+        with open(os.path.join(static_dir, *filename.split('/'))) as f:
+            parts.append(f.read())
+    # ';' guards against a file whose last statement relies on ASI at EOF
+    combined = '\n;\n'.join(parts)
+
+    minified, removed = shake_unused_functions(minify_js(combined), template_tokens(templates_dir))
+
+    path = os.path.join(static_dir, *BUNDLE_FILENAME.split('/'))
+    try:
+        with open(path) as f:
+            unchanged = f.read() == minified
+    except OSError:
+        unchanged = False
+    if not unchanged:  # Keep the mtime so .br/.gz siblings stay valid
+        with open(path, 'w') as f:
+            f.write(minified)
+    if removed:
+        logger.info(f"Removed unused functions from {BUNDLE_FILENAME}: {', '.join(removed)}")
+
+    return {
+        'bundle': BUNDLE_FILENAME,
+        'sources': sources,
+        'removed': removed,
+        'bytes': (len(combined.encode()), len(minified.encode()))
+    }
+
+
+def init_js_bundle(app) -> List[str]:
+    """
+    Expose page_scripts to templates: the built bundle when present and
+    JS_BUNDLE is on, otherwise the unminified sources.
+    """
+    bundle_path = os.path.join(app.static_folder, *BUNDLE_FILENAME.split('/'))
+    if app.config.get('JS_BUNDLE', True) and os.path.exists(bundle_path):
+        scripts = [BUNDLE_FILENAME]
+    else:
+        scripts = list(BUNDLE_SOURCES)
+    app.extensions['page_scripts'] = scripts
+    app.jinja_env.globals['page_scripts'] = scripts
+    return scripts
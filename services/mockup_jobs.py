@@ -0,0 +1,253 @@
+"""
+Mockup Job Service for admin design uploads.
+Uploads are streamed to disk while hashed, deduplicated by content hash, and
+rendered into product mockups on a background process pool.
+"""
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+GARMENT_TYPES = ('tshirt', 'hoodie')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _write_job(jobs_folder: str, job: Dict[str, Any]) -> None:
+    """Atomically persist a job record so any worker process can poll it."""
+    job['updated_at'] = datetime.now(timezone.utc).isoformat()
+    fd, tmp_path = tempfile.mkstemp(dir=jobs_folder, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, os.path.join(jobs_folder, f"{job['job_id']}.json"))
+
+
+def _abandoned(job: Dict[str, Any], timeout: float) -> bool:
+    """
+    True for a queued or running job whose record has not been updated for
+    timeout seconds: its worker or pool died, so it will never finish.
+    """
+    if job['status'] not in ('queued', 'running'):
+        return False
+    try:
+        updated_at = datetime.fromisoformat(job.get('updated_at') or job['created_at'])
+    except (KeyError, TypeError, ValueError):
+        return True
+    return (datetime.now(timezone.utc) - updated_at).total_seconds() > timeout
+
+
+def run_mockup_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Process pool entry point - render mockups and derivatives for one design.
+    Imports the image pipeline lazily so the web process never loads it.
+    """
+    jobs_folder = job['jobs_folder']
+    job['status'] = 'running'
+    _write_job(jobs_folder, job)
+
+    try:
+        from generate_mockups import create_colour_variants, create_image_derivatives
+
+        variants = [(color, path) for color, path in job['variants']]
+        mockups = create_colour_variants(job['design_path'], variants, job['garment'])
+        if len(mockups) != len(variants):
+            raise RuntimeError('Design could not be rendered')
+
+        derivatives = []
+        for mockup_path in mockups:
+            derivatives.extend(create_image_derivatives(mockup_path))
+
+        job['status'] = 'done'
+        job['outputs'] = {'mockups': mockups, 'derivatives': derivatives}
+    except Exception as e:
+        job['status'] = 'failed'
+        job['error'] = str(e)
+
+    _write_job(jobs_folder, job)
+    return job
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Lazily create the shared render pool (spawned, so it is safe under threads)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=current_app.config.get('MOCKUP_JOB_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+
+class MockupJobService:
+    """Service for design uploads and background mockup rendering jobs."""
+
+    def _upload_folder(self) -> str:
+        folder = current_app.config['UPLOAD_FOLDER']
+        if not os.path.isabs(folder):
+            folder = os.path.join(current_app.root_path, folder)
+        return folder
+
+    def _jobs_folder(self) -> str:
+        folder = current_app.config.get('MOCKUP_JOBS_FOLDER') or \
+            os.path.join(current_app.instance_path, 'mockup_jobs')
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def _abandoned(self, job: Dict[str, Any]) -> bool:
+        return _abandoned(job, current_app.config.get('MOCKUP_JOB_TIMEOUT', 900))
+
+    def _allowed_extension(self, filename: str) -> Optional[str]:
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        return extension if extension in current_app.config['ALLOWED_EXTENSIONS'] else None
+
+    def save_design(self, file_storage) -> Dict[str, Any]:
+        """
+        Stream an uploaded design to disk, hashing it on the way.
+        Returns: {'success': bool, 'message': str, 'content_hash': str, 'path': str, 'duplicate': bool}
+        """
+        extension = self._allowed_extension(file_storage.filename or '')
+        if not extension:
+            return {'success': False, 'message': 'Unsupported file type'}
+
+        designs_folder = os.path.join(self._upload_folder(), 'designs')
+        os.makedirs(designs_folder, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=designs_folder, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: file_storage.stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            content_hash = digest.hexdigest()
+            path = os.path.join(designs_folder, f"{content_hash}.{extension}")
+            duplicate = os.path.exists(path)
+            if duplicate:
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+        except OSError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return {'success': False, 'message': f'Failed to save design: {str(e)}'}
+
+        return {
+            'success': True,
+            'message': 'Design saved',
+            'content_hash': content_hash,
+            'path': path,
+            'duplicate': duplicate
+        }
+
+    def submit_upload(self, file_storage, garment: str = 'tshirt', colors: List[str] = None) -> Dict[str, Any]:
+        """
+        Save an uploaded design and queue its mockups.
+        Identical design + garment + colours map to the same job, which is only rendered once;
+        a failed job, or one queued/running for over MOCKUP_JOB_TIMEOUT seconds, is resubmitted.
+        Returns: {'success': bool, 'message': str, 'job_id': str, 'status': str, 'duplicate': bool}
+        """
+        if garment not in GARMENT_TYPES:
+            return {'success': False, 'message': f'Unknown garment type: {garment}'}
+        colors = [c.strip() for c in (colors or ['White']) if c and c.strip()] or ['White']
+
+        saved = self.save_design(file_storage)
+        if not saved['success']:
+            return saved
+
+        job_key = f"{saved['content_hash']}|{garment}|{','.join(c.lower() for c in colors)}"
+        job_id = hashlib.sha256(job_key.encode()).hexdigest()[:20]
+
+        existing = self.get_job(job_id)
+        if existing and existing['status'] != 'failed' and not self._abandoned(existing):
+            return {
+                'success': True,
+                'message': 'Design already uploaded',
+                'job_id': job_id,
+                'status': existing['status'],
+                'duplicate': True
+            }
+
+        mockups_folder = os.path.join(self._upload_folder(), 'mockups')
+        os.makedirs(mockups_folder, exist_ok=True)
+        prefix = f"{saved['content_hash'][:16]}_{garment}"
+
+        job = {
+            'job_id': job_id,
+            'status': 'queued',
+            'content_hash': saved['content_hash'],
+            'design_path': saved['path'],
+            'garment': garment,
+            'variants': [
+                (color, os.path.join(mockups_folder, f"{prefix}_{color.lower().replace(' ', '_')}.jpg"))
+                for color in colors
+            ],
+            'jobs_folder': self._jobs_folder(),
+            'created_at': datetime.now(timezone.utc).isoformat()
+        }
+        _write_job(job['jobs_folder'], job)
+
+        try:
+            get_executor().submit(run_mockup_job, dict(job))
+        except Exception as e:
+            logger.error(f"Failed to queue mockup job {job_id}: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            _write_job(job['jobs_folder'], job)
+            return {'success': False, 'message': f'Failed to queue mockup job: {str(e)}'}
+
+        return {
+            'success': True,
+            'message': 'Mockup rendering queued',
+            'job_id': job_id,
+            'status': 'queued',
+            'duplicate': saved['duplicate']
+        }
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Load a job record by id, or None if unknown."""
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self._jobs_folder(), f"{job_id}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_job_status(self, job_id: str) -> Dict[str, Any]:
+        """
+        Public view of a job for polling.
+        Returns: {'success': bool, 'job_id': str, 'status': str, 'outputs': dict (when done), 'error': str (when failed)}
+        """
+        job = self.get_job(job_id)
+        if not job:
+            return {'success': False, 'message': 'Job not found'}
+
+        if self._abandoned(job):
+            job = dict(job, status='failed', error='Job timed out; upload the design again to retry')
+
+        static_folder = current_app.static_folder
+        result = {'success': True, 'job_id': job_id, 'status': job['status']}
+        if job['status'] == 'done':
+            result['outputs'] = {
+                kind: ['/static/' + os.path.relpath(path, static_folder).replace(os.sep, '/')
+                       if path.startswith(static_folder) else path
+                       for path in paths]
+                for kind, paths in job['outputs'].items()
+            }
+        elif job['status'] == 'failed':
+            result['error'] = job.get('error')
+        return result
@@ -0,0 +1,239 @@
+"""
+Compressed Page Cache
+Keeps rendered HTML for public pages together with its gzip and brotli
+encodings, so repeat hits skip both rendering and compression. Entries are
+keyed by endpoint, query string, catalog version and visitor variant.
+"""
+from typing import Dict, Any, Callable, Optional, Tuple, Union
+from collections import OrderedDict
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# (load per CPU below which the level applies, gzip level, brotli quality)
+COMPRESSION_LEVELS = [
+    (0.5, 9, 11),
+    (1.0, 6, 5),
+    (float('inf'), 1, 1),
+]
+
+
+def cpu_load() -> float:
+    """1-minute load average per CPU (0.0 where the platform has no loadavg)."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return 0.0
+
+
+def compression_levels(load: float = None) -> Tuple[int, int]:
+    """(gzip level, brotli quality) for the current CPU load - cheaper when busy."""
+    load = cpu_load() if load is None else load
+    for threshold, gzip_level, brotli_quality in COMPRESSION_LEVELS:
+        if load < threshold:
+            return gzip_level, brotli_quality
+    return COMPRESSION_LEVELS[-1][1:]
+
+
+class CachedPage:
+    """A rendered page and its encodings, compressed lazily on first request."""
+
+    def __init__(self, body: bytes, mimetype: str, expires_at: float, stale_until: float = None):
+        self.body = body
+        self.mimetype = mimetype
+        self.expires_at = expires_at
+        self.stale_until = expires_at if stale_until is None else stale_until
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        self.encodings = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self.encodings.get(encoding)
+        if data is not None:
+            return data
+        with self._lock:
+            if encoding not in self.encodings:
+                gzip_level, brotli_quality = compression_levels()
+                if encoding == 'br':
+                    self.encodings[encoding] = brotli.compress(self.body, quality=brotli_quality)
+                else:
+                    self.encodings[encoding] = gzip.compress(self.body, compresslevel=gzip_level, mtime=0)
+            return self.encodings[encoding]
+
+
+class PageCache:
+    """
+    Thread-safe, size-bounded LRU of CachedPage entries with a TTL.
+    get_or_render() lets only one request per key render (single flight);
+    concurrent requests wait for it, or get the expired copy for up to
+    stale_ttl seconds while it re-renders, or if the render fails.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: int = 300, stale_ttl: int = 60,
+                 render_timeout: float = 10.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.render_timeout = render_timeout
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.waits = 0
+
+    @staticmethod
+    def make_key(endpoint: str, query_string: bytes, catalog_version: str, variant: str) -> str:
+        query = b'&'.join(sorted(query_string.split(b'&'))) if query_string else b''
+        return f"{endpoint}|{query.decode('latin-1')}|{catalog_version}|{variant}"
+
+    def _lookup(self, key: str, now: float) -> Tuple[Optional[CachedPage], Optional[CachedPage]]:
+        """(fresh entry, stale entry) for key; caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        if entry.expires_at >= now:
+            self._entries.move_to_end(key)
+            return entry, None
+        if entry.stale_until >= now:
+            return None, entry
+        del self._entries[key]
+        return None, None
+
+    def get(self, key: str) -> Optional[CachedPage]:
+        with self._lock:
+            entry, _ = self._lookup(key, time.monotonic())
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def store(self, key: str, body: bytes, mimetype: str) -> CachedPage:
+        now = time.monotonic()
+        entry = CachedPage(body, mimetype, now + self.ttl, now + self.ttl + self.stale_ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_or_render(self, key: str, render: Callable[[], Response]) -> Union[CachedPage, Response, None]:
+        """
+        Cached page for key, rendering it at most once at a time.
+        render() returns a Response; 200 text/html responses are cached and
+        returned as a CachedPage, anything else is returned as-is.
+        Returns None to a waiting request whose leader produced nothing
+        cacheable, so it can render for itself.
+        """
+        with self._lock:
+            entry, stale = self._lookup(key, time.monotonic())
+            if entry is not None:
+                self.hits += 1
+                return entry
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = threading.Event()
+                self.misses += 1
+            elif stale is not None:
+                self.stale_hits += 1
+                return stale
+            else:
+                self.waits += 1
+
+        if not leader:
+            flight.wait(self.render_timeout)
+            with self._lock:
+                entry, stale = self._lookup(key, time.monotonic())
+            return entry or stale
+
+        try:
+            response = render()
+            if response.status_code == 200 and response.mimetype == 'text/html' \
+                    and not response.direct_passthrough:
+                return self.store(key, response.get_data(), response.mimetype)
+            if stale is not None and response.status_code >= 500:
+                return self._serve_stale(stale)
+            return response
+        except Exception:
+            if stale is None:
+                raise
+            return self._serve_stale(stale)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.set()
+
+    def _serve_stale(self, stale: CachedPage) -> CachedPage:
+        with self._lock:
+            self.stale_hits += 1
+        return stale
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_hits': self.stale_hits,
+                'waits': self.waits
+            }
+
+
+def negotiate_encoding() -> Optional[str]:
+    """'br', 'gzip' or None for the current request's Accept-Encoding."""
+    accepted = request.accept_encodings
+    if brotli and accepted.quality('br'):
+        return 'br'
+    if accepted.quality('gzip'):
+        return 'gzip'
+    return None
+
+
+def cached_response(entry: CachedPage) -> Response:
+    """Preencoded response for a cached page, or 304 if the client's copy is current."""
+    encoding = negotiate_encoding()
+    etag = f'{entry.etag}-{encoding}' if encoding else entry.etag
+
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        body = entry.encoded(encoding) if encoding else entry.body
+        response = Response(body, mimetype=entry.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Content-Length'] = str(len(body))
+
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+page_cache = PageCache()
+
+
+def init_page_cache(app) -> PageCache:
+    """Configure the shared page cache from the PAGE_CACHE_* settings."""
+    page_cache.max_entries = app.config.get('PAGE_CACHE_MAX_ENTRIES', 256)
+    page_cache.ttl = app.config.get('PAGE_CACHE_TTL', 300)
+    page_cache.stale_ttl = app.config.get('PAGE_CACHE_STALE_TTL', 60)
+    page_cache.render_timeout = app.config.get('PAGE_CACHE_RENDER_TIMEOUT', 10.0)
+    page_cache.clear()
+    app.extensions['page_cache'] = page_cache
+    return page_cache
@@ -0,0 +1,130 @@
+"""
+Precompressed Static Files
+Build step that writes .br and .gz siblings for text assets at maximum
+compression, and a static view that negotiates Accept-Encoding and streams the
+matching sibling with send_file, so static compression never costs CPU at
+request time.
+"""
+from typing import List, Optional
+import gzip
+import mimetypes
+import os
+import tempfile
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PRECOMPRESS_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.html', '.txt', '.xml', '.map'}
+SKIP_DIRECTORIES = {'uploads', 'mockup_templates'}
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def _available_encodings() -> List[str]:
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def precompress_file(path: str) -> List[str]:
+    """
+    Write <path>.br / <path>.gz unless an up-to-date sibling already exists.
+    Siblings that would not be smaller than the source are removed instead.
+    Returns the paths written.
+    """
+    written = []
+    source_mtime = os.path.getmtime(path)
+    data = None
+
+    for encoding in _available_encodings():
+        target = path + ENCODING_SUFFIXES[encoding]
+        if os.path.exists(target) and os.path.getmtime(target) >= source_mtime:
+            continue
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        compressed = _compress(data, encoding)
+        if len(compressed) >= len(data):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        _write_atomic(target, compressed)
+        written.append(target)
+
+    return written
+
+
+def precompress_static(static_dir: str) -> List[str]:
+    """Precompress every text asset under static_dir; returns the paths written."""
+    written = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRECTORIES and not d.startswith('.')]
+        for name in files:
+            if name.startswith('.') or os.path.splitext(name)[1].lower() not in PRECOMPRESS_EXTENSIONS:
+                continue
+            written.extend(precompress_file(os.path.join(root, name)))
+    return written
+
+
+def negotiate_encoding(static_folder: str, filename: str) -> Optional[str]:
+    """
+    Best encoding the client accepts that has an up-to-date sibling on disk.
+    Returns 'br', 'gzip' or None.
+    """
+    if os.path.splitext(filename)[1].lower() not in PRECOMPRESS_EXTENSIONS:
+        return None
+
+    accepted = request.accept_encodings
+    source = os.path.join(static_folder, filename)
+    try:
+        source_mtime = os.path.getmtime(source)
+    except OSError:
+        return None
+
+    for encoding in _available_encodings():
+        if not accepted.quality(encoding):
+            continue
+        try:
+            if os.path.getmtime(source + ENCODING_SUFFIXES[encoding]) >= source_mtime:
+                return encoding
+        except OSError:
+            continue
+    return None
+
+
+def init_precompressed_static(app) -> None:
+    """Replace the static view with one that serves precompressed siblings."""
+    send_plain = app.send_static_file
+
+    def send_precompressed_static(filename):
+        encoding = negotiate_encoding(app.static_folder, filename)
+        if encoding is None:
+            response = send_plain(filename)
+        else:
+            response = send_from_directory(
+                app.static_folder,
+                filename + ENCODING_SUFFIXES[encoding],
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                max_age=app.get_send_file_max_age(filename)
+            )
+            response.headers['Content-Encoding'] = encoding
+
+        if os.path.splitext(filename)[1].lower() in PRECOMPRESS_EXTENSIONS:
+            response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = send_precompressed_static
@@ -0,0 +1,68 @@
+"""
+Preload Hints
+Adds a Link header to HTML pages listing the assets every page needs before
+it can paint (page stylesheet, script bundle, logo) so the browser fetches
+them while the HTML is still downloading. Where the WSGI server exposes
+wsgi.early_hints, the same links are also sent as a 103 Early Hints response
+before the view runs.
+"""
+from typing import Dict, List, Optional
+
+from flask import before_render_template, g, request, url_for
+
+PRELOAD_IMAGES = ['images/mockups/Roots_logo.jpg']  # In the navbar on every page
+PRECONNECT_ORIGINS = ['https://fonts.gstatic.com', 'https://cdnjs.cloudflare.com']
+FALLBACK_STYLESHEET = 'css/style.css'
+
+
+def page_links(app, template_name: Optional[str]) -> List[str]:
+    """Link header entries for a page rendered from template_name."""
+    css_manifest = app.extensions.get('css_manifest')
+    entry = css_manifest.get(template_name) if css_manifest is not None and template_name else None
+    stylesheet = entry['bundle'] if entry else FALLBACK_STYLESHEET
+
+    links = [f"<{url_for('static', filename=stylesheet)}>; rel=preload; as=style"]
+    links += [f"<{url_for('static', filename=script)}>; rel=preload; as=script"
+              for script in app.extensions.get('page_scripts', [])]
+    links += [f"<{url_for('static', filename=image)}>; rel=preload; as=image" for image in PRELOAD_IMAGES]
+    links += [f'<{origin}>; rel=preconnect; crossorigin' for origin in PRECONNECT_ORIGINS]
+    return links
+
+
+def init_preload_headers(app) -> Dict[str, List[str]]:
+    """
+    Register the Link header hook. Links are remembered per endpoint, so
+    page-cache hits and early hints (sent before the view runs) reuse them.
+    Set PRELOAD_HEADERS = False to disable, EARLY_HINTS = False to skip 103s.
+    """
+    links_by_endpoint = {}
+    app.extensions['preload_links'] = links_by_endpoint
+    if not app.config.get('PRELOAD_HEADERS', True):
+        return links_by_endpoint
+
+    def remember_template(sender, template, context, **extra):
+        g.setdefault('page_template', template.name)
+
+    before_render_template.connect(remember_template, app, weak=False)
+
+    @app.before_request
+    def send_early_hints():
+        send = request.environ.get('wsgi.early_hints')
+        links = links_by_endpoint.get(request.endpoint)
+        if callable(send) and links and app.config.get('EARLY_HINTS', True) and request.method == 'GET':
+            send([('Link', link) for link in links])
+
+    @app.after_request
+    def add_preload_links(response):
+        if request.method != 'GET' or response.status_code != 200 or response.mimetype != 'text/html':
+            return response
+        template_name = g.get('page_template')
+        if template_name is not None:
+            links_by_endpoint[request.endpoint] = page_links(app, template_name)
+        links = links_by_endpoint.get(request.endpoint)
+        if links:
+            existing = response.headers.get('Link')
+            response.headers['Link'] = ', '.join(([existing] if existing else []) + links)
+        return response
+
+    return links_by_endpoint
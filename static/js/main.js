@@ -122,8 +122,9 @@ async function addToCart(productId, productName, price, image) {
         const data = await response.json();
         
         if (data.success) {
-            // Update cart badge
+            // Update cart badge here and in other tabs (the response refreshed the cookie)
             updateCartBadge(data.cart_count);
+            applyCartState(readCartState(), true);
             
             // Show success message
             showNotification('✅ ' + productName + ' added to cart!', 'success');
@@ -173,8 +174,9 @@ async function addToCartWithQty(productId, productName, price, image, qtyInputId
         const data = await response.json();
         
         if (data.success) {
-            // Update cart badge
+            // Update cart badge here and in other tabs (the response refreshed the cookie)
             updateCartBadge(data.cart_count);
+            applyCartState(readCartState(), true);
             
             // Show success message with quantity
             if (quantity === 1) {
@@ -194,6 +196,50 @@ async function addToCartWithQty(productId, productName, price, image, qtyInputId
     }
 }
 
+// Cart badge state shared across tabs; the server keeps it in the
+// cart_state cookie ("count.version.owner") whenever the cart changes
+const cartChannel = 'BroadcastChannel' in window ? new BroadcastChannel('cart') : null;
+let shownCartVersion = -1;
+let shownCartOwner = null;
+
+function readCookie(name) {
+    const match = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
+    return match ? decodeURIComponent(match[1].replace(/^"|"$/g, '')) : null;
+}
+
+function readCartState() {
+    const raw = readCookie('cart_state');
+    if (!raw) {
+        return null;
+    }
+    const [count, version, owner] = raw.split('.');
+    return { count: Number(count), version: Number(version), owner };
+}
+
+// Show a cart state unless a newer one of the same cart is already shown;
+// optionally tell other tabs. Versions restart with each owner (guest, user)
+function applyCartState(state, broadcast) {
+    if (!state) {
+        return;
+    }
+    if (state.owner !== shownCartOwner) {
+        shownCartOwner = state.owner;
+        shownCartVersion = -1;
+    }
+    if (state.version < shownCartVersion) {
+        return;
+    }
+    shownCartVersion = state.version;
+    updateCartBadge(state.count);
+    if (broadcast && cartChannel) {
+        cartChannel.postMessage(state);
+    }
+}
+
+if (cartChannel) {
+    cartChannel.onmessage = (event) => applyCartState(event.data, false);
+}
+
 // Update cart badge count
 function updateCartBadge(count) {
     const badge = document.getElementById('cartBadge');
@@ -255,9 +301,44 @@ function showNotification(message, type = 'info') {
     }, 3000);
 }
 
-// Load cart count when page loads
-if (document.querySelector('.cart-icon')) {
-    loadCartCount();
+// Fill per-user header fragments (name, cart badge) from one small JSON call;
+// only needed when the display_name/cart_state cookies are missing
+async function loadSessionInfo() {
+    try {
+        const response = await fetch('/api/session', { credentials: 'same-origin' });
+        const data = await response.json();
+        if (!data.success) {
+            return;
+        }
+        if (data.username) {
+            document.querySelectorAll('.session-username').forEach(el => {
+                el.textContent = data.username;
+            });
+        }
+        if (data.cart_count !== null) {
+            applyCartState({ count: data.cart_count, version: data.cart_version, owner: data.cart_owner }, true);
+        }
+    } catch (error) {
+        console.error('Error loading session info:', error);
+    }
+}
+
+// Fill name and cart count when page loads (logged-in pages only): from the
+// cookies the server keeps current, falling back to /api/session without them
+if (document.querySelector('.session-username')) {
+    const displayName = readCookie('display_name');
+    const cartState = readCartState();
+    if (displayName && (cartState || !document.getElementById('cartBadge'))) {
+        document.querySelectorAll('.session-username').forEach(el => {
+            el.textContent = displayName;
+        });
+        applyCartState(cartState, true);
+    } else {
+        loadSessionInfo();
+    }
+} else {
+    // Guests: the badge counts the signed-cookie guest cart
+    applyCartState(readCartState(), false);
 }
 
 // Smooth scrolling for anchor links
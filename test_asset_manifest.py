@@ -0,0 +1,83 @@
+"""
+Test suite for content-hashed static assets.
+Tests: hashed copies, url_for('static') override, immutable caching on hashed URLs only.
+"""
+import os
+import tempfile
+
+from app import app
+from services.page_cache import page_cache
+from services.asset_manifest import AssetManifest, build_asset_manifest, prune_hashed_assets
+from services.critical_css import CssManifest
+
+
+def test_build_asset_manifest():
+    """Test that hashed names follow content and unchanged files keep their name."""
+    print("\n=== Testing Asset Manifest Build ===")
+    with tempfile.TemporaryDirectory() as static_dir:
+        os.makedirs(os.path.join(static_dir, 'css'))
+        os.makedirs(os.path.join(static_dir, 'uploads'))
+        with open(os.path.join(static_dir, 'css', 'style.css'), 'w') as f:
+            f.write('body { color: #333; }')
+        with open(os.path.join(static_dir, 'uploads', 'design.png'), 'wb') as f:
+            f.write(b'upload')
+
+        first = build_asset_manifest(static_dir)['assets']
+        assert list(first) == ['css/style.css']
+        hashed = first['css/style.css']
+        assert hashed.startswith('dist/css/style.') and hashed.endswith('.css')
+        assert os.path.exists(os.path.join(static_dir, hashed))
+        assert build_asset_manifest(static_dir)['assets'] == first
+        print(f"✅ css/style.css -> {hashed} (uploads skipped)")
+
+        with open(os.path.join(static_dir, 'css', 'style.css'), 'w') as f:
+            f.write('body { color: #000; }')
+        second = build_asset_manifest(static_dir)
+        assert second['assets']['css/style.css'] != hashed
+        assert prune_hashed_assets(static_dir, second) == 1
+        assert not os.path.exists(os.path.join(static_dir, hashed))
+        print(f"✅ Edited file re-hashed to {second['assets']['css/style.css']}, old copy pruned")
+
+
+def test_hashed_urls_and_cache_headers():
+    """Test url_for('static') rewriting and Cache-Control per URL type."""
+    print("\n=== Testing Hashed Static URLs ===")
+    manifest = AssetManifest(build_asset_manifest(app.static_folder)['assets'])
+    original = app.extensions['asset_manifest']
+    original_css = app.extensions['css_manifest']
+    app.extensions['asset_manifest'] = manifest
+    app.extensions['css_manifest'] = CssManifest()  # Full stylesheet link, no critical CSS
+    try:
+        page_cache.clear()
+        client = app.test_client()
+        html = client.get('/about').get_data(as_text=True)
+        hashed_css = manifest.get('css/style.css')
+        assert f'/static/{hashed_css}' in html
+        assert '/static/css/style.css' not in html
+        print(f"✅ base.html links /static/{hashed_css}")
+
+        response = client.get(f'/static/{hashed_css}')
+        assert response.status_code == 200
+        assert response.cache_control.max_age == 31536000
+        assert response.cache_control.immutable
+        assert not response.cache_control.no_cache
+        print(f"✅ Hashed URL: {response.headers['Cache-Control']}")
+
+        response = client.get('/static/css/style.css')
+        assert response.status_code == 200
+        assert response.cache_control.max_age == app.config['UNHASHED_STATIC_MAX_AGE']
+        assert not response.cache_control.immutable
+        print(f"✅ Unhashed URL: {response.headers['Cache-Control']}")
+
+        with app.test_request_context():
+            from flask import url_for
+            assert url_for('static', filename='js/not-built.js') == '/static/js/not-built.js'
+        print("✅ Files missing from the manifest keep their plain URL")
+    finally:
+        app.extensions['asset_manifest'] = original
+        app.extensions['css_manifest'] = original_css
+
+
+if __name__ == '__main__':
+    test_build_asset_manifest()
+    test_hashed_urls_and_cache_headers()
@@ -0,0 +1,112 @@
+"""
+Test suite for denormalized cart aggregates.
+Tests: item_count/total/version kept current by every CartItemRepository
+mutation, single-row reads, and the schema upgrade for existing databases.
+"""
+import os
+import sqlite3
+import tempfile
+
+from sqlalchemy import create_engine, event
+
+from app import app, db
+from models import CartItem
+from models.migrations import upgrade_schema
+from repositories import CartRepository, CartItemRepository
+from services import CartService
+from conftest import new_user_id
+
+
+def _assert_matches_items(cart):
+    items = CartItem.query.filter_by(cart_id=cart.id).all()
+    assert cart.item_count == sum(i.quantity for i in items)
+    assert round(cart.total, 2) == round(sum(i.price * i.quantity for i in items), 2)
+
+
+def test_aggregates_follow_mutations():
+    """Test add/update/remove/clear keep item_count, total and version current."""
+    print("\n=== Testing Cart Aggregates ===")
+    with app.app_context():
+        user_id = new_user_id('agg')
+        service = CartService()
+        cart = service.get_user_cart(user_id)
+        versions = [cart.version]
+
+        service.add_to_cart(user_id, 1, 'Tanjore Temple Graphic Tee', 1299.99, 'mockups/tanjore.jpg', 2, 'M')
+        service.add_to_cart(user_id, 1, 'Tanjore Temple Graphic Tee', 1299.99, 'mockups/tanjore.jpg', 1, 'M')
+        service.add_to_cart(user_id, 2, 'ISRO Space Missions Hoodie', 1999.99, 'mockups/isro.jpg', 1, 'L')
+        cart = service.get_user_cart(user_id)
+        assert cart.get_item_count() == 4
+        assert cart.get_total() == round(3 * 1299.99 + 1999.99, 2)
+        _assert_matches_items(cart)
+        versions.append(cart.version)
+        print(f"✅ After adds: {cart.item_count} items, ₹{cart.total}")
+
+        item = CartItem.query.filter_by(cart_id=cart.id, product_id=1).first()
+        service.update_cart_item(item.id, 1)
+        cart = service.get_user_cart(user_id)
+        assert cart.get_item_count() == 2
+        _assert_matches_items(cart)
+        versions.append(cart.version)
+
+        service.remove_from_cart(item.id)
+        cart = service.get_user_cart(user_id)
+        assert cart.get_item_count() == 1 and cart.get_total() == 1999.99
+        versions.append(cart.version)
+
+        service.clear_cart(user_id)
+        cart = service.get_user_cart(user_id)
+        assert cart.get_item_count() == 0 and cart.get_total() == 0
+        versions.append(cart.version)
+        assert versions == sorted(set(versions)), versions
+        print(f"✅ Update/remove/clear kept aggregates exact; versions {versions}")
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            totals = CartRepository.get_totals(user_id)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert totals == {'cart_id': cart.id, 'item_count': 0, 'total': 0.0, 'version': cart.version}
+        assert len(statements) == 1 and 'cart_items' not in statements[0]
+        print("✅ get_totals reads one cart row")
+
+
+def test_schema_upgrade_backfills_existing_carts():
+    """Test the ALTER TABLE upgrade on a database created before the columns."""
+    print("\n=== Testing Cart Aggregate Schema Upgrade ===")
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(path)
+        connection.executescript("""
+            CREATE TABLE carts (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, session_id VARCHAR(100),
+                                created_at DATETIME, updated_at DATETIME);
+            CREATE TABLE cart_items (id INTEGER PRIMARY KEY, cart_id INTEGER NOT NULL, product_id INTEGER NOT NULL,
+                                     product_name VARCHAR(200) NOT NULL, product_image VARCHAR(500),
+                                     price FLOAT NOT NULL, quantity INTEGER NOT NULL, size VARCHAR(10),
+                                     created_at DATETIME);
+            INSERT INTO carts (id, user_id) VALUES (1, 1), (2, 2);
+            INSERT INTO cart_items (cart_id, product_id, product_name, price, quantity)
+                VALUES (1, 1, 'Tee', 1299.99, 2), (1, 2, 'Hoodie', 1999.99, 1);
+        """)
+        connection.commit()
+        connection.close()
+
+        engine = create_engine(f'sqlite:///{path}')
+        assert upgrade_schema(engine) == ['carts.item_count', 'carts.total', 'carts.version',
+                                          'uq_cart_items_cart_product_size']
+        assert upgrade_schema(engine) == []
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql('SELECT id, item_count, total, version FROM carts ORDER BY id').fetchall()
+        engine.dispose()
+        assert [tuple(r) for r in rows] == [(1, 3, 4599.97, 0), (2, 0, 0.0, 0)]
+        print(f"✅ Columns added and backfilled: {[tuple(r) for r in rows]}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    test_aggregates_follow_mutations()
+    test_schema_upgrade_backfills_existing_carts()
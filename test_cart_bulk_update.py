@@ -0,0 +1,75 @@
+"""
+Test suite for the batched cart quantity update.
+Tests: one scoped SELECT, one UPDATE ... CASE, one DELETE and one COMMIT per
+payload, exact aggregates, and that other users' items are never touched.
+"""
+
+from sqlalchemy import event
+
+from app import app, db
+from models import CartItem
+from services import CartService
+from conftest import new_user_id
+
+
+def _fill_cart(service, user_id):
+    service.bulk_add_to_cart(user_id, [
+        {'product_id': pid, 'product_name': f'Product {pid}', 'price': 100.0 * pid,
+         'product_image': None, 'quantity': 1, 'size': 'M'} for pid in (1, 2, 3)
+    ])
+    return {i.product_id: i.id for i in CartItem.query.filter_by(cart_id=service.get_user_cart(user_id).id)}
+
+
+def test_bulk_update_is_batched():
+    """Test updates and removals are applied with one UPDATE and one DELETE."""
+    print("\n=== Testing Batched Cart Quantity Update ===")
+    with app.app_context():
+        service = CartService()
+        user_id = new_user_id('bupd')
+        items = _fill_cart(service, user_id)
+
+        updates = [{'item_id': items[1], 'quantity': 4}, {'item_id': items[2], 'quantity': 2},
+                   {'item_id': items[3], 'quantity': 0}, {'item_id': 'x'}]
+        statements = []
+        listener = lambda *args: statements.append(args[2].lstrip().split()[0].upper())
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = service.bulk_update_quantities(user_id, updates)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert result['success'], result
+        assert (result['updated_count'], result['removed_count'], result['failed_count']) == (2, 1, 1)
+        # Cart lookup, scoped IN select, UPDATE items, DELETE items, UPDATE cart aggregates, totals
+        assert statements.count('DELETE') == 1 and statements.count('UPDATE') == 2, statements
+        assert result['cart_total'] == 4 * 100.0 + 2 * 200.0
+        print(f"✅ {len(updates)} updates in {len(statements)} statements: {statements}")
+
+        quantities = {i.product_id: i.quantity for i in CartItem.query.filter_by(
+            cart_id=service.get_user_cart(user_id).id)}
+        assert quantities == {1: 4, 2: 2}
+        print(f"✅ Quantities applied: {quantities}")
+
+
+def test_bulk_update_ignores_other_carts():
+    """Test item ids from another user's cart are reported, not changed."""
+    print("\n=== Testing Bulk Update Ownership ===")
+    with app.app_context():
+        service = CartService()
+        owner_id, other_id = new_user_id('bupd'), new_user_id('bupd')
+        owner_items = _fill_cart(service, owner_id)
+        version = service.get_user_cart(owner_id).version
+
+        result = service.bulk_update_quantities(other_id, [{'item_id': owner_items[1], 'quantity': 0},
+                                                           {'item_id': owner_items[2], 'quantity': 9}])
+        assert result['success'] and result['updated_count'] == 0 and result['removed_count'] == 0
+        assert [f['item_id'] for f in result['failed_updates']] == [owner_items[1], owner_items[2]]
+
+        owner_cart = service.get_user_cart(owner_id)
+        assert owner_cart.get_item_count() == 3 and owner_cart.version == version
+        print("✅ Another user's items left untouched")
+
+
+if __name__ == '__main__':
+    test_bulk_update_is_batched()
+    test_bulk_update_ignores_other_carts()
@@ -0,0 +1,155 @@
+"""
+Test suite for the set-based bulk cart upsert.
+Tests: one INSERT ... ON CONFLICT for an N-item payload, quantities merged
+into existing lines, per-item results, the batch limit, the UPDATE plus
+INSERT fallback for databases without ON CONFLICT, and the unique index
+upgrade that folds duplicate lines on existing databases.
+"""
+import os
+import sqlite3
+import tempfile
+
+from sqlalchemy import create_engine, event
+
+import repositories
+from app import app, db
+from models import Cart, CartItem
+from models.migrations import upgrade_schema
+from services import CartService
+from conftest import new_user_id
+
+
+def _item(product_id, quantity=1, size='M', price=1299.99):
+    return {'product_id': product_id, 'product_name': f'Product {product_id}', 'price': price,
+            'product_image': f'mockups/{product_id}.jpg', 'quantity': quantity, 'size': size}
+
+
+def test_bulk_add_is_one_upsert():
+    """Test an N-item payload is applied with one INSERT and one COMMIT."""
+    print("\n=== Testing Bulk Cart Upsert ===")
+    with app.app_context():
+        user_id = new_user_id('bulk')
+        service = CartService()
+        service.add_to_cart(user_id, 1, 'Product 1', 1000.0, 'mockups/1.jpg', 2, 'M')
+
+        items = [_item(1, 3, price=1.0), _item(2, 1, 'L'), _item(2, 2, 'L'),
+                 {'product_id': 'x', 'product_name': 'Bad'}, _item(3, 1, 'XL')]
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = service.bulk_add_to_cart(user_id, items)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert result['success'], result
+        inserts = [s for s in statements if s.lstrip().upper().startswith('INSERT INTO CART_ITEMS')]
+        assert len(inserts) == 1 and 'ON CONFLICT' in inserts[0].upper(), inserts
+        print(f"✅ {len(items)} items applied with 1 upsert ({len(statements)} statements)")
+
+        statuses = [(r['index'], r['status']) for r in result['results']]
+        assert statuses == [(0, 'updated'), (1, 'added'), (2, 'added'), (3, 'failed'), (4, 'added')]
+        assert result['added_count'] == 4 and result['failed_count'] == 1
+        print(f"✅ Per-item results: {statuses}")
+
+        lines = {(i.product_id, i.size): i for i in CartItem.query.filter_by(
+            cart_id=service.get_user_cart(user_id).id)}
+        assert lines[(1, 'M')].quantity == 5 and lines[(1, 'M')].price == 1000.0
+        assert lines[(2, 'L')].quantity == 3 and len(lines) == 3
+        # Existing line keeps its price: 5 x 1000 + 3 x 1299.99 + 1 x 1299.99
+        assert result['cart_count'] == 9
+        assert service.get_user_cart(user_id).get_total() == round(5000 + 4 * 1299.99, 2)
+        print(f"✅ Lines merged, aggregates exact: {result['cart_count']} items")
+
+
+def test_bulk_add_batch_limit():
+    """Test payloads over CART_BULK_MAX_ITEMS are rejected without writing."""
+    print("\n=== Testing Bulk Cart Batch Limit ===")
+    with app.app_context():
+        user_id = new_user_id('bulk')
+        limit = app.config['CART_BULK_MAX_ITEMS']
+        result = CartService().bulk_add_to_cart(user_id, [_item(i) for i in range(limit + 1)])
+        assert not result['success'] and str(limit) in result['message']
+        assert CartService().get_user_cart(user_id).get_item_count() == 0
+        print(f"✅ {limit + 1} items rejected: {result['message']}")
+
+
+def test_upsert_fallback_without_on_conflict():
+    """Test bulk add, merge and save_lines on a database without ON CONFLICT."""
+    print("\n=== Testing Cart Upsert Fallback ===")
+    upsert_insert = repositories._upsert_insert
+    repositories._upsert_insert = lambda table: None  # As on a dialect other than sqlite/postgresql
+    statements = []
+    listener = lambda *args: statements.append(args[2].lstrip().split()[0].upper())
+    try:
+        with app.app_context():
+            service = CartService()
+            user_id, guest_id = new_user_id('bulk'), new_user_id('bulk')
+            first = service.bulk_add_to_cart(user_id, [_item(1), _item(2, 2)])
+            assert [r['status'] for r in first['results']] == ['added', 'added'], first
+
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                second = service.bulk_add_to_cart(user_id, [_item(1, 2), _item(3, size='L', price=10.0)])
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            assert [(r['product_id'], r['quantity'], r['status']) for r in second['results']] == \
+                [(1, 3, 'updated'), (3, 1, 'added')], second
+            assert [s for s in statements if s in ('INSERT', 'UPDATE')].count('INSERT') == 1
+
+            service.bulk_add_to_cart(guest_id, [_item(2, 1), _item(4, 1)])
+            assert service.merge_carts(user_id, guest_id)['success']
+            cart = service.get_user_cart(user_id)
+            lines = {i.product_id: i.quantity for i in CartItem.query.filter_by(cart_id=cart.id)}
+            assert lines == {1: 3, 2: 3, 3: 1, 4: 1}
+            assert cart.get_item_count() == 8 and cart.get_total() == round(7 * 1299.99 + 10.0, 2)
+
+            assert repositories.CartRepository.save_lines(cart.id, [_item(1, 5), _item(4, 1)], cart.version + 1,
+                                                          expected_version=cart.version)
+            db.session.commit()
+            lines = {i.product_id: i.quantity for i in CartItem.query.filter_by(cart_id=cart.id)}
+            assert lines == {1: 5, 4: 1} and db.session.get(Cart, cart.id).item_count == 6
+    finally:
+        repositories._upsert_insert = upsert_insert
+    print(f"✅ Bulk add, merge and save_lines without ON CONFLICT: {lines}")
+
+
+def test_unique_index_upgrade_folds_duplicates():
+    """Test the unique index upgrade merges duplicate lines first."""
+    print("\n=== Testing Cart Item Unique Index Upgrade ===")
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(path)
+        connection.executescript("""
+            CREATE TABLE carts (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, session_id VARCHAR(100),
+                                created_at DATETIME, updated_at DATETIME, item_count INTEGER NOT NULL DEFAULT 0,
+                                total FLOAT NOT NULL DEFAULT 0, version INTEGER NOT NULL DEFAULT 0);
+            CREATE TABLE cart_items (id INTEGER PRIMARY KEY, cart_id INTEGER NOT NULL, product_id INTEGER NOT NULL,
+                                     product_name VARCHAR(200) NOT NULL, product_image VARCHAR(500),
+                                     price FLOAT NOT NULL, quantity INTEGER NOT NULL, size VARCHAR(10),
+                                     created_at DATETIME);
+            INSERT INTO carts (id, user_id) VALUES (1, 1);
+            INSERT INTO cart_items (cart_id, product_id, product_name, price, quantity, size)
+                VALUES (1, 1, 'Tee', 1299.99, 2, 'M'), (1, 1, 'Tee', 1299.99, 1, 'M'), (1, 1, 'Tee', 1299.99, 1, 'L');
+        """)
+        connection.commit()
+        connection.close()
+
+        engine = create_engine(f'sqlite:///{path}')
+        assert upgrade_schema(engine) == ['uq_cart_items_cart_product_size']
+        assert upgrade_schema(engine) == []
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql('SELECT id, size, quantity FROM cart_items ORDER BY id').fetchall()
+        engine.dispose()
+        assert [tuple(r) for r in rows] == [(1, 'M', 3), (3, 'L', 1)]
+        print(f"✅ Duplicates folded before indexing: {[tuple(r) for r in rows]}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    test_bulk_add_is_one_upsert()
+    test_bulk_add_batch_limit()
+    test_upsert_fallback_without_on_conflict()
+    test_unique_index_upgrade_folds_duplicates()
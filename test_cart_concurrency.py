@@ -0,0 +1,168 @@
+"""
+Test suite for optimistic concurrency on carts.
+Tests: concurrent adds never lose an update, a write that loses a race is
+retried against the re-read cart (single-line, bulk and merge writes), and a
+client's stale version is refused with 409 instead of overwriting a newer cart.
+"""
+import threading
+
+from sqlalchemy import update
+
+from app import app, db
+from models import Cart, CartItem
+from repositories import CartItemRepository
+from services import CartService
+from conftest import login_client, new_user_id
+
+
+ITEM = {'product_id': 1, 'product_name': 'Product 1', 'price': 250.0, 'product_image': None, 'size': 'M'}
+
+
+def test_concurrent_adds_keep_every_unit():
+    """Test simultaneous adds of the same product from several tabs."""
+    print("\n=== Testing Concurrent Cart Adds ===")
+    user_id = new_user_id('occ')
+    login_client(user_id).post('/cart/add', json=dict(ITEM, quantity=1))
+
+    barrier = threading.Barrier(6)
+    responses = []
+
+    def add():
+        client = login_client(user_id)
+        barrier.wait()
+        responses.append(client.post('/cart/add', json=dict(ITEM, quantity=1)).get_json())
+
+    threads = [threading.Thread(target=add) for _ in range(6)]
+    retries = app.config['CART_WRITE_RETRIES']
+    app.config['CART_WRITE_RETRIES'] = len(threads)  # Enough for the last of six to win
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        app.config['CART_WRITE_RETRIES'] = retries
+
+    assert all(r['success'] for r in responses), responses
+    with app.app_context():
+        cart = Cart.query.filter_by(user_id=user_id).one()
+        item = CartItem.query.filter_by(cart_id=cart.id).one()
+        assert item.quantity == 7 and cart.item_count == 7 and cart.total == 7 * 250.0
+        assert cart.version == 7
+    print(f"✅ 7 adds from 7 requests: quantity {item.quantity}, item_count {cart.item_count}, version {cart.version}")
+
+
+def test_lost_race_is_retried():
+    """Test a write whose conditional UPDATE misses re-reads the cart and retries."""
+    print("\n=== Testing Conflict Retry ===")
+    user_id = new_user_id('occ')
+    with app.app_context():
+        service = CartService()
+        service.add_to_cart(user_id, quantity=2, **ITEM)
+        cart = service.get_user_cart(user_id)
+        item_id, version = CartItem.query.filter_by(cart_id=cart.id).one().id, cart.version
+
+        assert CartItemRepository.add_item(cart.id, quantity=1, expected_version=version - 1, **ITEM) is None
+        assert db.session.get(CartItem, item_id).quantity == 2 and service.get_user_cart(user_id).version == version
+        print("✅ Stale conditional write changed nothing")
+
+        original, calls = service.cart_item_repo.update_quantity, []
+
+        def racing_update(cart_item, quantity, expected_version=None):
+            if not calls:  # Another request commits between our read and our write
+                with db.engine.begin() as other:
+                    other.execute(update(CartItem).where(CartItem.id == item_id).values(quantity=5))
+                    other.execute(update(Cart).where(Cart.id == cart.id).values(
+                        item_count=5, total=1250.0, version=Cart.version + 1))
+            calls.append(expected_version)
+            return original(cart_item, quantity, expected_version)
+
+        service.cart_item_repo.update_quantity = racing_update
+        result = service.update_cart_item(item_id, 3, user_id)
+        assert result['success'] and result['cart_version'] == version + 2, result
+        assert calls == [version, version + 1], calls
+        cart = service.get_user_cart(user_id)
+        assert db.session.get(CartItem, item_id).quantity == 3 and cart.item_count == 3 and cart.total == 750.0
+    print(f"✅ Lost race retried at version {calls[1]}; aggregates exact")
+
+
+def test_bulk_writes_retry_lost_races():
+    """Test bulk updates and merges recompute from the re-read cart after a race."""
+    print("\n=== Testing Bulk Write Conflict Retry ===")
+    user_id, guest_id = new_user_id('occ'), new_user_id('occ')
+    with app.app_context():
+        service = CartService()
+        service.add_to_cart(user_id, quantity=2, **ITEM)
+        service.add_to_cart(guest_id, quantity=1, **ITEM)
+        cart = service.get_user_cart(user_id)
+        item_id, version = CartItem.query.filter_by(cart_id=cart.id).one().id, cart.version
+
+        def other_request(cart_id, quantity):
+            with db.engine.begin() as other:
+                other.execute(update(CartItem).where(CartItem.cart_id == cart_id).values(quantity=quantity))
+                other.execute(update(Cart).where(Cart.id == cart_id).values(
+                    item_count=quantity, total=quantity * 250.0, version=Cart.version + 1))
+
+        original_set, calls = service.cart_item_repo.bulk_set_quantities, []
+
+        def racing_set(cart_id, quantities, expected_version=None):
+            if not calls:  # Read at quantity 2, another tab sets 5 before our write
+                other_request(cart_id, 5)
+            calls.append(expected_version)
+            return original_set(cart_id, quantities, expected_version)
+
+        service.cart_item_repo.bulk_set_quantities = racing_set
+        result = service.bulk_update_quantities(user_id, [{'item_id': item_id, 'quantity': 3}])
+        assert result['success'] and calls == [version, version + 1], (result, calls)
+        cart = service.get_user_cart(user_id)
+        assert cart.item_count == 3 and cart.total == 750.0 and result['cart_version'] == version + 2
+        print(f"✅ Bulk update retried at version {calls[1]}; item_count {cart.item_count}")
+
+        original_merge, merges = service.cart_repo.merge_carts, []
+
+        def racing_merge(target_id, source_id, target_version=None, source_version=None):
+            if not merges:  # The guest tab adds between our read and the merge
+                other_request(source_id, 4)
+            merges.append(source_version)
+            return original_merge(target_id, source_id, target_version, source_version)
+
+        service.cart_repo.merge_carts = racing_merge
+        result = service.merge_carts(user_id, guest_id)
+        assert result['success'] and len(merges) == 2 and merges[1] == merges[0] + 1, (result, merges)
+        cart, guest = service.get_user_cart(user_id), service.get_user_cart(guest_id)
+        item = CartItem.query.filter_by(cart_id=cart.id).one()
+        assert item.quantity == 7 and cart.item_count == 7 and cart.total == 7 * 250.0
+        assert guest.item_count == 0 and CartItem.query.filter_by(cart_id=guest.id).count() == 0
+    print(f"✅ Merge retried after the guest cart moved; merged quantity {result['quantity_merged']}")
+
+
+def test_stale_client_version_conflicts():
+    """Test an update from a page showing an old cart version is refused."""
+    print("\n=== Testing Stale Client Version ===")
+    user_id = new_user_id('occ')
+    client = login_client(user_id)
+    client.post('/cart/add', json=dict(ITEM, quantity=1))
+    with app.app_context():
+        cart = Cart.query.filter_by(user_id=user_id).one()
+        item_id, seen_version = CartItem.query.filter_by(cart_id=cart.id).one().id, cart.version
+
+    client.post('/cart/add', json=dict(ITEM, quantity=1))  # Another tab
+    stale = client.post(f'/cart/update/{item_id}', data={'quantity': 1, 'version': seen_version})
+    assert stale.status_code == 302  # Flashed, back to the cart page
+    refused = client.post('/cart/add', json=dict(ITEM, quantity=1, version=seen_version))
+    assert refused.status_code == 409 and refused.get_json()['cart_version'] == seen_version + 1
+    with app.app_context():
+        assert db.session.get(CartItem, item_id).quantity == 2
+
+    fresh = client.post(f'/cart/update/{item_id}', data={'quantity': 1, 'version': seen_version + 1})
+    assert fresh.status_code == 302
+    with app.app_context():
+        assert db.session.get(CartItem, item_id).quantity == 1
+    print(f"✅ Version {seen_version} refused after another tab's add; version {seen_version + 1} applied")
+
+
+if __name__ == '__main__':
+    test_concurrent_adds_keep_every_unit()
+    test_lost_race_is_retried()
+    test_bulk_writes_retry_lost_races()
+    test_stale_client_version_conflicts()
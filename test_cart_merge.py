@@ -0,0 +1,88 @@
+"""
+Test suite for the set-based cart merge.
+Tests: lines combined by (product_id, size), exact aggregates on both carts,
+a statement count independent of cart size, and refusing a self-merge.
+"""
+
+from sqlalchemy import event
+
+from app import app, db
+from models import CartItem
+from services import CartService
+from conftest import new_user_id
+
+
+def _items(product_ids, price=100.0, quantity=1):
+    return [{'product_id': pid, 'product_name': f'Product {pid}', 'price': price,
+             'product_image': None, 'quantity': quantity, 'size': 'M'} for pid in product_ids]
+
+
+def _merge_statements(service, items):
+    target_id, source_id = new_user_id('merge'), new_user_id('merge')
+    batch = app.config['CART_BULK_MAX_ITEMS']
+    for start in range(0, items, batch):  # Stay under the bulk add limit
+        stop = min(start + batch, items)
+        assert service.bulk_add_to_cart(target_id, _items(range(start, stop)))['success']
+        assert service.bulk_add_to_cart(source_id, _items(range(start + items // 2, stop + items // 2),
+                                                          price=200.0, quantity=2))['success']
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = service.merge_carts(target_id, source_id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert result['success'], result
+    return target_id, source_id, result, len(statements)
+
+
+def test_merge_combines_lines():
+    """Test overlapping lines are combined and the source cart is emptied."""
+    print("\n=== Testing Set-Based Cart Merge ===")
+    with app.app_context():
+        service = CartService()
+        target_id, source_id, result, _ = _merge_statements(service, 4)
+
+        assert (result['merged_count'], result['combined_count'], result['quantity_merged']) == (4, 2, 8)
+        target = service.get_user_cart(target_id)
+        quantities = {i.product_id: (i.quantity, i.price) for i in CartItem.query.filter_by(cart_id=target.id)}
+        # Combined lines keep the target's price
+        assert quantities == {0: (1, 100.0), 1: (1, 100.0), 2: (3, 100.0), 3: (3, 100.0),
+                              4: (2, 200.0), 5: (2, 200.0)}
+        assert target.get_item_count() == 12 and target.get_total() == 8 * 100.0 + 4 * 200.0
+        assert result['target_cart_total'] == target.get_total()
+
+        source = service.get_user_cart(source_id)
+        assert source.get_item_count() == 0 and CartItem.query.filter_by(cart_id=source.id).count() == 0
+        print(f"✅ {result['message']}; target total ₹{target.get_total():.2f}")
+
+
+def test_merge_statement_count_is_constant():
+    """Test a 100-line merge runs as many statements as a 4-line one."""
+    print("\n=== Testing Cart Merge Statement Count ===")
+    with app.app_context():
+        service = CartService()
+        small = _merge_statements(service, 4)[3]
+        large = _merge_statements(service, 100)[3]
+        assert small == large, (small, large)
+        print(f"✅ {large} statements for 4-line and 100-line carts")
+
+
+def test_merge_into_itself_is_refused():
+    """Test merging a cart into itself leaves it unchanged."""
+    print("\n=== Testing Cart Self-Merge ===")
+    with app.app_context():
+        service = CartService()
+        user_id = new_user_id('merge')
+        service.bulk_add_to_cart(user_id, _items([1, 2]))
+        result = service.merge_carts(user_id, user_id)
+        assert not result['success']
+        assert service.get_user_cart(user_id).get_item_count() == 2
+        print(f"✅ {result['message']}")
+
+
+if __name__ == '__main__':
+    test_merge_combines_lines()
+    test_merge_statement_count_is_constant()
+    test_merge_into_itself_is_refused()
@@ -0,0 +1,149 @@
+"""
+Test suite for the batched cart operations endpoint.
+Tests: add, update, remove and apply-coupon in one request are applied with
+one cart UPDATE, one upsert, one DELETE and one COMMIT; an invalid operation
+writes nothing; a stale version gets 409; with a hot cart store the
+operations apply to the store on the lines the cart page shows.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from app import app, db
+from models import Cart, CartItem
+from repositories import CouponRepository
+from services import CartService
+from services.cart_store import HotCartStore, release_cart, use_cart_store
+from conftest import logged_in_client
+
+
+def _client_with_cart():
+    client, user_id = logged_in_client('ops')
+    with app.app_context():
+        CartService().bulk_add_to_cart(user_id, [
+            {'product_id': pid, 'product_name': f'Product {pid}', 'price': 100.0 * pid,
+             'product_image': None, 'quantity': 1, 'size': 'M'} for pid in (1, 2, 3)
+        ])
+        cart = Cart.query.filter_by(user_id=user_id).one()
+        items = {i.product_id: i.id for i in CartItem.query.filter_by(cart_id=cart.id)}
+        return client, items, cart.version
+
+
+def test_cart_ops_single_transaction():
+    """Test an ordered batch of operations is one transaction and one response."""
+    print("\n=== Testing Batched Cart Operations ===")
+    client, items, version = _client_with_cart()
+    code = f"OPS{uuid.uuid4().hex[:6].upper()}"
+    with app.app_context():
+        CouponRepository.create(code, 'percentage', 10, datetime.now(timezone.utc) + timedelta(days=1))
+
+    ops = [
+        {'op': 'update', 'item_id': items[1], 'quantity': 3},
+        {'op': 'remove', 'item_id': items[2]},
+        {'op': 'add', 'product_id': 3, 'product_name': 'Product 3', 'price': 999.0, 'quantity': 1},
+        {'op': 'add', 'product_id': 4, 'product_name': 'Product 4', 'price': 400.0, 'quantity': 2, 'size': 'L'},
+        {'op': 'apply-coupon', 'coupon_code': code}
+    ]
+    statements = []
+    listener = lambda *args: statements.append(args[2].lstrip().split()[0].upper())
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.post('/cart/ops', json={'ops': ops, 'version': version})
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+    result = response.get_json()
+    assert response.status_code == 200 and result['success'], result
+    writes = [s for s in statements if s in ('INSERT', 'UPDATE', 'DELETE')]
+    assert sorted(writes) == ['DELETE', 'INSERT', 'UPDATE'], statements
+    print(f"✅ 5 operations: {len(writes)} writes, {len(statements)} statements in total")
+
+    cart = result['cart']
+    lines = {(i['product_id'], i['size']): i['quantity'] for i in cart['items']}
+    assert lines == {(1, 'M'): 3, (3, 'M'): 2, (4, 'L'): 2}
+    assert cart['total'] == 300.0 + 600.0 + 800.0  # Product 3 keeps its stored price
+    assert cart['version'] == result['cart_version'] == version + 1
+    coupon = result['results'][4]
+    assert coupon['success'] and coupon['discount_amount'] == 170.0
+    with app.app_context():
+        stored = Cart.query.filter_by(id=db.session.get(CartItem, items[1]).cart_id).one()
+        assert (stored.item_count, stored.total, stored.version) == (7, 1700.0, version + 1)
+    print(f"✅ Snapshot returned: {lines}, total ₹{cart['total']}, coupon saves ₹{coupon['discount_amount']}")
+
+
+def test_cart_ops_all_or_nothing():
+    """Test an invalid operation or a stale version leaves the cart untouched."""
+    print("\n=== Testing Cart Operations Atomicity ===")
+    client, items, version = _client_with_cart()
+
+    response = client.post('/cart/ops', json={'ops': [
+        {'op': 'update', 'item_id': items[1], 'quantity': 5},
+        {'op': 'remove', 'item_id': 999999999}
+    ]})
+    assert response.status_code == 400 and response.get_json()['failed_op'] == 1
+    response = client.post('/cart/ops', json={'ops': [{'op': 'rename'}]})
+    assert response.status_code == 400
+    response = client.post('/cart/ops', json={'ops': [{'op': 'remove', 'item_id': items[1]}],
+                                              'version': version - 1})
+    assert response.status_code == 409 and response.get_json()['cart_version'] == version
+    with app.app_context():
+        assert db.session.get(CartItem, items[1]).quantity == 1
+        assert CartService().get_cart_totals(db.session.get(CartItem, items[1]).cart.user_id)['version'] == version
+    print("✅ Invalid operation (400) and stale version (409) wrote nothing")
+
+
+def test_cart_ops_through_hot_store():
+    """Test ops update and remove lines added in the hot store (CART_STORE=memory)."""
+    print("\n=== Testing Cart Operations on the Hot Store ===")
+    store = HotCartStore()
+    use_cart_store(store)
+    try:
+        client, user_id = logged_in_client('ops')
+        for pid in (1, 2):
+            client.post('/cart/add', json={'product_id': pid, 'product_name': f'Product {pid}',
+                                           'price': 100.0 * pid, 'quantity': 1, 'size': 'M'})
+        page = {line['product_id']: line['id'] for line in store.snapshot(user_id)['lines']}
+        version = store.snapshot(user_id)['version']
+
+        statements = []
+        listener = lambda *args: statements.append(args[2].lstrip().split()[0].upper())
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = client.post('/cart/ops', json={'version': version, 'ops': [
+                {'op': 'update', 'item_id': page[1], 'quantity': 4},
+                {'op': 'remove', 'product_id': 2, 'size': 'M'},
+                {'op': 'add', 'product_id': 3, 'product_name': 'Product 3', 'price': 300.0, 'quantity': 1}
+            ]})
+        finally:
+            with app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        result = response.get_json()
+        assert response.status_code == 200 and result['success'], result
+        assert [s for s in statements if s in ('INSERT', 'UPDATE', 'DELETE')] == [], statements
+        lines = {i['product_id']: i['quantity'] for i in result['cart']['items']}
+        assert lines == {1: 4, 3: 1} and result['cart_version'] == version + 1
+        print(f"✅ Hot ids and (product_id, size) resolved in the store: {lines}, no SQL writes")
+
+        stale = client.post('/cart/ops', json={'version': version, 'ops': [{'op': 'remove', 'item_id': page[1]}]})
+        assert stale.status_code == 409
+
+        with app.app_context():
+            release_cart(store, user_id)
+            response = client.post('/cart/ops', json={'ops': [{'op': 'update', 'product_id': 1, 'size': 'M',
+                                                               'quantity': 2}]})
+            assert response.status_code == 200, response.get_json()
+            view = CartService().get_cart_view(user_id)
+            assert {i.product_id: i.quantity for i in view.items} == {1: 2, 3: 1}
+        print("✅ Stale version refused; the key still works after the cart was released")
+    finally:
+        use_cart_store(None)
+
+
+if __name__ == '__main__':
+    test_cart_ops_single_transaction()
+    test_cart_ops_all_or_nothing()
+    test_cart_ops_through_hot_store()
@@ -0,0 +1,67 @@
+"""
+Test suite for the session-carried cart badge state.
+Tests: count/version in the session and cart_state cookie after cart writes,
+the badge rendered on private pages but not in shared cached pages, and
+cookie removal on logout.
+"""
+from app import app
+from services.page_cache import page_cache
+from conftest import logged_in_client, login_client, new_user
+
+
+def test_cart_state_cookie_follows_writes():
+    """Test the session and cookies are refreshed by cart writes only."""
+    print("\n=== Testing Cart Badge State ===")
+    user_id, username = new_user('badge')
+    client = login_client(user_id, username)
+
+    client.get('/user/profile')
+    assert client.get_cookie('cart_state').value == f'0.0.u{user_id}'
+    assert client.get_cookie('display_name').value == username
+    assert not client.get_cookie('cart_state').http_only
+    print("✅ First request after login stores 0.0 in the session and cookie")
+
+    response = client.post('/cart/add', json={
+        'product_id': 1, 'product_name': 'Tanjore Temple Graphic Tee', 'price': 1299.99,
+        'product_image': 'mockups/tanjore.jpg', 'quantity': 2, 'size': 'M'
+    })
+    assert response.get_json()['cart_count'] == 2
+    count, version, owner = client.get_cookie('cart_state').value.split('.')
+    assert count == '2' and int(version) > 0 and owner == f'u{user_id}'
+    with client.session_transaction() as sess:
+        assert sess['cart_count'] == 2 and sess['cart_version'] == int(version)
+    print(f"✅ Add to cart updated the cookie to {count}.{version}")
+
+    response = client.get('/cart/')
+    assert 'Set-Cookie' not in response.headers or 'cart_state' not in response.headers['Set-Cookie']
+    html = response.get_data(as_text=True)
+    assert 'class="cart-badge active" id="cartBadge">2<' in html
+    assert f'class="session-username">{username}<' in html
+    print("✅ /cart/ renders the badge and name from the session, no cookie rewrite")
+
+    page_cache.clear()
+    html = client.get('/about').get_data(as_text=True)
+    assert 'id="cartBadge">0<' in html and username not in html
+    print("✅ Shared cached pages keep the placeholder for main.js to fill")
+
+    data = client.get('/api/session').get_json()
+    assert data['cart_count'] == 2 and data['cart_version'] == int(version)
+    print("✅ /api/session fallback returns count and version")
+
+
+def test_cart_state_cookies_cleared_on_logout():
+    """Test the readable cookies go away with the session."""
+    print("\n=== Testing Cart Badge State Logout ===")
+    client, _ = logged_in_client('badge')
+    client.get('/user/profile')
+    assert client.get_cookie('cart_state') is not None
+    client.get('/auth/logout')
+    client.get('/about')
+    assert client.get_cookie('cart_state') is None
+    assert client.get_cookie('display_name') is None
+    print("✅ cart_state and display_name removed after logout")
+
+
+if __name__ == '__main__':
+    test_cart_state_cookie_follows_writes()
+    test_cart_state_cookies_cleared_on_logout()
@@ -0,0 +1,278 @@
+"""
+Test suite for the hot cart store.
+Tests: cart clicks go to the store without SQL writes, the flusher coalesces
+them into one write per cart, read-only cart endpoints read the store without
+flushing it, checkout-style release flushes synchronously,
+lines shown from the store can still be edited after the cart is released,
+a flush never overwrites a cart changed in the database meanwhile, database
+writes keep the cart out of the store until they commit, the per-process
+store is refused under several workers, and the shared store works over its
+local TCP connection.
+"""
+import os
+import socket
+import threading
+import time
+
+from sqlalchemy import event
+
+from app import app, db
+from models import Cart, CartItem
+from repositories import CartItemRepository
+from services import CartService
+from services.cart_store import (HotCartStore, connect_cart_store, flush_carts, held_cart, init_cart_store,
+                                 release_cart, serve_cart_store, use_cart_store)
+from conftest import logged_in_client
+
+
+def _writes(statements):
+    return [s for s in statements if s.lstrip().split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+
+
+def _add(client, product_id, quantity=1):
+    return client.post('/cart/add', json={'product_id': product_id, 'product_name': f'Product {product_id}',
+                                          'price': 100.0 * product_id, 'product_image': None,
+                                          'quantity': quantity, 'size': 'M'}).get_json()
+
+
+def test_hot_store_write_behind():
+    """Test clicks stay in the store until one coalesced flush."""
+    print("\n=== Testing Hot Cart Store ===")
+    store = HotCartStore()
+    use_cart_store(store)
+    try:
+        client, user_id = logged_in_client('hot')
+        _add(client, 1)  # First use loads the cart into the store
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            for _ in range(3):
+                _add(client, 1)
+            result = _add(client, 2, 2)
+            page = client.get('/cart/')
+            count = client.get('/cart/count').get_json()['count']
+        finally:
+            with app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        assert result['success'] and result['cart_count'] == 6
+        assert _writes(statements) == [], _writes(statements)
+        assert page.status_code == 200 and 'Product 2' in page.get_data(as_text=True) and count == 6
+        print(f"✅ 4 clicks, page view and count: 0 SQL writes ({len(statements)} reads)")
+
+        with app.app_context():
+            cart_id = CartService().get_cart_view(user_id).id
+            assert CartItem.query.filter_by(cart_id=cart_id).count() == 0
+            statements.clear()
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                assert flush_carts(store) == 1
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            assert len(_writes(statements)) == 3, statements  # upsert, delete, cart row
+            lines = {i.product_id: i.quantity for i in CartItem.query.filter_by(cart_id=cart_id)}
+            assert lines == {1: 4, 2: 2}
+            assert flush_carts(store) == 0
+        print(f"✅ One flush wrote the coalesced cart: {lines}")
+
+        hot_line = next(line for line in store.snapshot(user_id)['lines'] if line['product_id'] == 2)
+        client.post(f"/cart/remove/{hot_line['id']}", headers={'Accept': 'application/json'})
+        with app.app_context():
+            release_cart(store, user_id)  # What checkout does
+            assert store.snapshot(user_id) is None
+            view = CartService().get_cart_view(user_id)
+            assert [(i.product_id, i.quantity) for i in view.items] == [(1, 4)] and view.item_count == 4
+            assert CartService().get_cart_totals(user_id)['version'] == view.version
+        print("✅ Release flushed the removal and handed the cart back to the database")
+    finally:
+        use_cart_store(None)
+
+
+def test_read_only_endpoints_keep_the_cart_hot():
+    """Test summary, analytics and similar reads neither flush nor release the cart."""
+    print("\n=== Testing Hot Cart Reads ===")
+    store = HotCartStore()
+    use_cart_store(store)
+    try:
+        client, user_id = logged_in_client('hot')
+        _add(client, 1, 2)
+        version = store.snapshot(user_id)['version']
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            responses = [client.get('/cart/advanced/summary'), client.get('/cart/advanced/analytics'),
+                         client.get('/cart/advanced/abandoned-check'), client.get('/cart/advanced/recommendations'),
+                         client.get('/cart/advanced/estimated-delivery'), client.post('/cart/advanced/validate-items')]
+        finally:
+            with app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        assert all(r.status_code == 200 and r.get_json()['success'] for r in responses), \
+            [r.get_json() for r in responses]
+        assert responses[0].get_json()['item_count'] == 2 and responses[1].get_json()['total_items'] == 2
+        assert _writes(statements) == [], _writes(statements)
+        assert store.snapshot(user_id)['version'] == version and store.stats()['dirty'] == 1
+        print(f"✅ 6 read-only cart endpoints: 0 SQL writes, cart still in the store at version {version}")
+    finally:
+        use_cart_store(None)
+
+
+def test_hot_lines_survive_release():
+    """Test a line added in the store is edited by its (product_id, size) after a release."""
+    print("\n=== Testing Hot Cart Line Keys ===")
+    store = HotCartStore()
+    use_cart_store(store)
+    try:
+        client, user_id = logged_in_client('hot')
+        _add(client, 3, 2)
+        hot_id = store.snapshot(user_id)['lines'][0]['id']
+        page = client.get('/cart/').get_data(as_text=True)
+        assert f'/cart/update/{hot_id}' in page and 'name="product_id" value="3"' in page
+
+        with app.app_context():
+            release_cart(store, user_id)  # Idle eviction, checkout, a bulk operation...
+        client.post(f'/cart/update/{hot_id}', data={'quantity': 5, 'product_id': 3, 'size': 'M'})
+        with app.app_context():
+            view = CartService().get_cart_view(user_id)
+            assert [(i.product_id, i.quantity) for i in view.items] == [(3, 5)]
+            release_cart(store, user_id)
+            assert [(i.product_id, i.quantity) for i in CartItem.query.filter_by(cart_id=view.id)] == [(3, 5)]
+        print(f"✅ Line {hot_id} updated by (3, 'M') after the cart was written back and reloaded")
+
+        client.post(f'/cart/remove/{hot_id}', data={'product_id': 3, 'size': 'M'})
+        with app.app_context():
+            assert CartService().get_cart_view(user_id).items == []
+        print("✅ Removed by (product_id, size) as well")
+    finally:
+        use_cart_store(None)
+
+
+def test_flush_rebases_on_database_changes():
+    """Test a flush after a database write keeps both the write and the store's changes."""
+    print("\n=== Testing Hot Cart Flush Conflicts ===")
+    store = HotCartStore()
+    use_cart_store(store)
+    try:
+        client, user_id = logged_in_client('hot')
+        _add(client, 1)
+        _add(client, 1)
+        with app.app_context():
+            cart_id = store.snapshot(user_id)['cart_id']
+            # A writer that did not hold the cart, e.g. one that released it
+            # just before a hot request loaded it again
+            CartItemRepository.bulk_upsert(cart_id, [{'product_id': 4, 'product_name': 'Product 4', 'price': 400.0,
+                                                      'product_image': None, 'quantity': 3, 'size': 'M'}])
+            db_version = db.session.get(Cart, cart_id).version
+            hot_version = store.snapshot(user_id)['version']
+
+            assert flush_carts(store) == 0  # Rebased, not written
+            rebased = store.snapshot(user_id)
+            assert rebased['version'] == max(db_version, hot_version) + 1
+            assert {(line['product_id'], line['quantity']) for line in rebased['lines']} == {(1, 2), (4, 3)}
+            assert flush_carts(store) == 1
+            db.session.expire_all()
+            lines = {i.product_id: i.quantity for i in CartItem.query.filter_by(cart_id=cart_id)}
+            cart = db.session.get(Cart, cart_id)
+            assert lines == {1: 2, 4: 3} and cart.item_count == 5 and cart.version == rebased['version']
+        print(f"✅ Database write kept and store changes replayed: {lines}, version {cart.version}")
+    finally:
+        use_cart_store(None)
+
+
+def test_database_writes_hold_the_cart():
+    """Test a hot add waits while a database write holds the cart."""
+    print("\n=== Testing Hot Cart Holds ===")
+    store = HotCartStore()
+    use_cart_store(store)
+    try:
+        client, user_id = logged_in_client('hot')
+        _add(client, 1)
+        added = []
+        with app.app_context():
+            with held_cart(store, user_id):
+                assert store.snapshot(user_id) is None  # Released for the database write
+                adder = threading.Thread(target=lambda: added.append(_add(client, 2)))
+                adder.start()
+                time.sleep(0.2)
+                assert added == [] and store.snapshot(user_id) is None
+                result = CartService().bulk_add_to_cart(user_id, [{'product_id': 5, 'product_name': 'Product 5',
+                                                                   'price': 500.0, 'quantity': 1, 'size': 'M'}])
+                assert result['success'], result
+            adder.join(5)
+            assert added and added[0]['success'] and added[0]['cart_count'] == 3
+            release_cart(store, user_id)
+            view = CartService().get_cart_view(user_id)
+            assert sorted((i.product_id, i.quantity) for i in view.items) == [(1, 1), (2, 1), (5, 1)]
+        print("✅ The add waited for the held database write and saw its line")
+    finally:
+        use_cart_store(None)
+
+
+def test_memory_store_refused_with_several_workers():
+    """Test CART_STORE='memory' fails at startup when the server runs several workers."""
+    print("\n=== Testing Memory Cart Store Worker Check ===")
+    saved = {name: os.environ.pop(name, None) for name in ('WEB_CONCURRENCY', 'GUNICORN_CMD_ARGS')}
+    backend = app.config['CART_STORE']
+    app.config['CART_STORE'] = 'memory'
+    try:
+        for name, value in (('WEB_CONCURRENCY', '3'), ('GUNICORN_CMD_ARGS', '--bind 0.0.0.0:80 --workers=2')):
+            os.environ[name] = value
+            try:
+                init_cart_store(app)
+                raise AssertionError(f'{name}={value} should refuse the memory store')
+            except ValueError as error:
+                assert "CART_STORE='tcp'" in str(error)
+            del os.environ[name]
+        print("✅ WEB_CONCURRENCY=3 and gunicorn --workers=2 refused with a pointer to 'tcp'")
+    finally:
+        app.config['CART_STORE'] = backend
+        for name, value in saved.items():
+            if value is not None:
+                os.environ[name] = value
+        use_cart_store(None)
+
+
+def test_shared_store_over_tcp():
+    """Test the store proxy forwards calls and errors over TCP."""
+    print("\n=== Testing Shared Cart Store over TCP ===")
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    threading.Thread(target=serve_cart_store, args=('127.0.0.1', port, b'test-key'), daemon=True).start()
+
+    for _ in range(50):
+        try:
+            store = connect_cart_store('127.0.0.1', port, b'test-key')
+            break
+        except OSError:
+            time.sleep(0.05)
+    try:
+        store.add_line(7, {'product_id': 1, 'size': 'M', 'quantity': 1})
+        raise AssertionError('KeyError expected for a cart that is not loaded')
+    except KeyError:
+        pass
+    store.seed(7, {'cart_id': 70, 'version': 3, 'lines': []})
+    snapshot = store.add_line(7, {'product_id': 1, 'product_name': 'Tee', 'price': 1.0,
+                                  'product_image': None, 'size': 'M', 'quantity': 2})
+    assert snapshot['version'] == 4 and snapshot['lines'][0]['quantity'] == 2
+    stale = store.set_quantity(7, snapshot['lines'][0]['id'], 5, 3)
+    assert stale['stale'] and stale['version'] == 4 and stale['lines'][0]['quantity'] == 2
+
+    other_node = connect_cart_store('127.0.0.1', port, b'test-key')
+    assert [s['user_id'] for s in other_node.take_dirty()] == [7]
+    assert store.take_dirty() == []
+    print(f"✅ Two connections share one store on port {port}")
+
+
+if __name__ == '__main__':
+    test_hot_store_write_behind()
+    test_read_only_endpoints_keep_the_cart_hot()
+    test_hot_lines_survive_release()
+    test_flush_rebases_on_database_changes()
+    test_database_writes_hold_the_cart()
+    test_memory_store_refused_with_several_workers()
+    test_shared_store_over_tcp()
@@ -0,0 +1,98 @@
+"""
+Test suite for the request-scoped cart view.
+Tests: one query for the cart and its items, memoization on flask.g with
+invalidation on writes, and the query count of the cart pages.
+"""
+
+from flask import g
+from sqlalchemy import event
+
+from app import app, db
+from repositories import AddressRepository, CartRepository
+from services import CartService
+from conftest import new_user
+
+
+class QueryCounter:
+    """Counts SQL statements sent to the engine inside a with block."""
+
+    def __enter__(self):
+        self.statements = []
+        with app.app_context():
+            self.engine = db.engine
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+def _user_with_cart():
+    user_id, username = new_user('view')
+    with app.app_context():
+        service = CartService()
+        for product_id, name, price, qty in [(1, 'Tanjore Temple Graphic Tee', 1299.99, 2),
+                                             (2, 'ISRO Space Missions Hoodie', 1999.99, 1),
+                                             (3, 'Hampi Ruins Heritage Tee', 1399.99, 3)]:
+            service.add_to_cart(user_id, product_id, name, price, 'mockups/test.jpg', qty, 'M')
+        AddressRepository.create(user_id, full_name='View Test', phone='9999999999',
+                                 address_line1='1 MG Road', city='Pune', state='MH', postal_code='411001')
+    return user_id, username
+
+
+def test_cart_view_memoized():
+    """Test the view is loaded once per request and refreshed after writes."""
+    print("\n=== Testing Request-Scoped Cart View ===")
+    user_id, _ = _user_with_cart()
+    with app.test_request_context():
+        with QueryCounter() as queries:
+            view = CartRepository.load_view(user_id)
+            again = CartRepository.load_view(user_id)
+        assert queries.count == 1 and view is again
+        assert view.item_count == 6
+        assert view.total == round(2 * 1299.99 + 1999.99 + 3 * 1399.99, 2)
+        assert [item.product_id for item in view.items] == [1, 2, 3]
+        print(f"✅ 1 query for {len(view.items)} items, memoized on g")
+
+        CartService().update_cart_item(view.items[0].id, 1)
+        assert 'cart_views' not in g
+        assert CartRepository.load_view(user_id).item_count == 5
+        print("✅ Cart writes drop the memoized view")
+
+        assert CartRepository.load_view(-1).is_empty
+        print("✅ Users without a cart get an empty view")
+
+
+def test_cart_pages_query_count():
+    """Test the number of SQL statements per cart page."""
+    print("\n=== Testing Cart Page Query Counts ===")
+    user_id, username = _user_with_cart()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = username
+
+    with QueryCounter() as queries:
+        response = client.get('/cart/')
+    assert response.status_code == 200
+    assert 'Hampi Ruins Heritage Tee' in response.get_data(as_text=True)
+    assert queries.count == 1, queries.statements
+    print(f"✅ /cart/: {queries.count} query")
+
+    with QueryCounter() as queries:
+        response = client.get('/cart/checkout')
+    assert response.status_code == 200
+    assert queries.count == 2, queries.statements  # Cart + items, then addresses
+    print(f"✅ /cart/checkout: {queries.count} queries")
+
+
+if __name__ == '__main__':
+    test_cart_view_memoized()
+    test_cart_pages_query_count()
@@ -0,0 +1,120 @@
+"""
+Test suite for conditional GET.
+Tests: strong ETags, 304 before rendering, invalidation on cart/order changes.
+"""
+
+from sqlalchemy import event
+
+from app import app, db
+from services import CartService
+from repositories import AddressRepository, OrderRepository
+from conftest import logged_in_client
+
+
+def _assert_not_modified(client, url, etag, **headers):
+    response = client.get(url, headers={'If-None-Match': etag, **headers})
+    assert response.status_code == 304, (url, response.status_code)
+    assert response.get_data() == b''
+    return response
+
+
+def test_public_pages_conditional_get():
+    """Test /shop and /product/<id> validators per visitor variant."""
+    print("\n=== Testing Conditional GET on Catalog Pages ===")
+    client = app.test_client()
+    for url in ['/shop', '/shop?category=heritage', '/product/1']:
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert not etag.startswith('W/')
+        _assert_not_modified(client, url, etag, **{'Accept-Encoding': 'gzip'})
+        print(f"✅ {url}: ETag {etag} -> 304")
+
+    anonymous_etag = client.get('/product/1').headers['ETag']
+    logged_in, _ = logged_in_client('etag')
+    assert logged_in.get('/product/1').headers['ETag'] != anonymous_etag
+    assert logged_in.get('/product/1', headers={'If-None-Match': anonymous_etag}).status_code == 200
+    print("✅ Logged-in variant has its own ETag")
+
+
+def test_cart_conditional_get():
+    """Test /cart/count and /cart/advanced/summary change ETag with the cart."""
+    print("\n=== Testing Conditional GET on Cart APIs ===")
+    client, user_id = logged_in_client('etag')
+
+    etags = {}
+    for url in ['/cart/count', '/cart/advanced/summary']:
+        response = client.get(url)
+        assert response.status_code == 200
+        etags[url] = response.headers['ETag']
+        assert 'private' in response.headers['Cache-Control']
+        _assert_not_modified(client, url, etags[url])
+    print(f"✅ Empty cart: 304 for {', '.join(etags)}")
+
+    with app.app_context():
+        CartService().add_to_cart(user_id, 1, 'Tanjore Temple Graphic Tee', 1299.99,
+                                  'mockups/tanjore.jpg', 2, 'M')
+
+    for url, old_etag in etags.items():
+        response = client.get(url, headers={'If-None-Match': old_etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != old_etag
+        _assert_not_modified(client, url, response.headers['ETag'])
+    assert client.get('/cart/count').get_json()['count'] == 2
+    print("✅ Adding an item changes both ETags")
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/cart/count', headers={'If-None-Match': '"stale"'})
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    cart_queries = [s for s in statements if 'FROM carts' in s]
+    assert response.status_code == 200 and len(cart_queries) == 1, cart_queries
+    print("✅ /cart/count reads its ETag and count in one cart query")
+
+
+def test_order_pages_conditional_get():
+    """Test order list/detail ETags follow order status."""
+    print("\n=== Testing Conditional GET on Order Pages ===")
+    client, user_id = logged_in_client('etag')
+    with app.app_context():
+        order = OrderRepository.create(user_id, 1299.99, subtotal_amount=1299.99)
+        order_id = order.id
+
+    for url in ['/user/orders', f'/user/orders/{order_id}', f'/cart/order-success/{order_id}']:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        etag = response.headers['ETag']
+        _assert_not_modified(client, url, etag)
+
+        with app.app_context():
+            order = OrderRepository.find_by_id(order_id)
+            OrderRepository.update_status(order, 'shipped' if order.status != 'shipped' else 'delivered')
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+        print(f"✅ {url}: 304 until the order status changed")
+
+    with app.app_context():
+        address = AddressRepository.create(user_id, full_name='Test User', phone='9999999999',
+                                           address_line1='1 MG Road', city='Pune', state='MH',
+                                           postal_code='411001')
+        order = OrderRepository.find_by_id(order_id)
+        order.shipping_address_id = address.id
+        db.session.commit()
+        address_id = address.id
+    url = f'/user/orders/{order_id}'
+    etag = client.get(url).headers['ETag']
+    _assert_not_modified(client, url, etag)
+    with app.app_context():
+        AddressRepository.update(AddressRepository.find_by_id(address_id), address_line1='2 FC Road')
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+    print(f"✅ {url}: 304 until the shipping address changed")
+
+
+if __name__ == '__main__':
+    test_public_pages_conditional_get()
+    test_cart_conditional_get()
+    test_order_pages_conditional_get()
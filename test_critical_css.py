@@ -0,0 +1,82 @@
+"""
+Test suite for critical CSS and per-template pruned bundles.
+Tests: CSS parsing, selector pruning (including dynamic class prefixes),
+bundle/manifest build, and the inline critical CSS in base.html.
+"""
+import os
+import shutil
+import tempfile
+
+from app import app
+from services.page_cache import page_cache
+from services.critical_css import (
+    parse_css, serialize_css, prune_rules, selector_used, build_css_bundles, CssManifest
+)
+
+CSS = """
+/* layout */
+body { color: red; }
+.navbar, .unused-nav { display: flex; }
+.hero h1:hover { font-size: 3rem; }
+.status-paid { color: green; }
+.footer { padding: 1rem; }
+@media (max-width: 768px) {
+    .navbar { display: block; }
+    .modal { display: none; }
+}
+"""
+
+
+def test_prune_rules():
+    """Test that unused selectors are dropped and used ones kept."""
+    print("\n=== Testing CSS Pruning ===")
+    rules = parse_css(CSS)
+    assert len(rules) == 6
+    tokens = {'navbar', 'hero', 'h1', 'footer', 'status-'}
+    css = serialize_css(prune_rules(rules, tokens))
+    assert '.navbar{' in css and '.unused-nav' not in css
+    assert '.hero h1:hover' in css
+    assert '.status-paid' in css
+    assert '.modal' not in css and '@media (max-width: 768px){.navbar' in css
+    assert selector_used('body', set())
+    assert not selector_used('.footer a', {'footer'})
+    print("✅ Unused selectors pruned, pseudo-classes and dynamic prefixes handled")
+
+
+def test_build_bundles_and_inline_critical_css():
+    """Test per-template bundles and the critical CSS inlined by base.html."""
+    print("\n=== Testing Critical CSS ===")
+    static_dir = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(static_dir, 'css'))
+        shutil.copy(os.path.join(app.static_folder, 'css', 'style.css'), os.path.join(static_dir, 'css'))
+        manifest = build_css_bundles(static_dir, os.path.join(app.root_path, 'templates'),
+                                     [os.path.join(app.static_folder, 'js', 'main.js')])
+        assert 'base.html' not in manifest['templates']
+        entry = manifest['templates']['shop.html']
+        full_size = os.path.getsize(os.path.join(app.static_folder, 'css', 'style.css'))
+        bundle_size = os.path.getsize(os.path.join(static_dir, entry['bundle']))
+        assert len(entry['critical']) < bundle_size < full_size
+        assert '.navbar' in entry['critical']
+        print(f"✅ shop.html: {len(entry['critical'])} B critical, {bundle_size} B bundle "
+              f"(style.css is {full_size} B)")
+    finally:
+        shutil.rmtree(static_dir)
+
+    original = app.extensions['css_manifest']
+    app.extensions['css_manifest'] = CssManifest(manifest['templates'])
+    try:
+        page_cache.clear()
+        html = app.test_client().get('/shop').get_data(as_text=True)
+        assert '<style>' in html and '.navbar' in html
+        assert 'rel="preload"' in html and 'css/pages/shop' in html
+        assert 'css/style.css' not in html
+        print("✅ /shop inlines critical CSS and preloads its bundle")
+    finally:
+        app.extensions['css_manifest'] = original
+        page_cache.clear()
+
+
+if __name__ == '__main__':
+    test_prune_rules()
+    test_build_bundles_and_inline_critical_css()
@@ -0,0 +1,75 @@
+"""
+Test suite for frozen public pages.
+Tests: parallel freeze to HTML + .br/.gz, the frozen manifest, and serving
+frozen pages to anonymous visitors with fallback to Flask.
+"""
+import os
+import shutil
+import tempfile
+
+import brotli
+from flask import Flask, session
+
+from app import app, PRODUCTS
+from services.freezer import freeze_pages, public_page_urls, page_key, FrozenPages, init_frozen_pages
+
+
+def test_freeze_and_serve():
+    """Test freezing pages in parallel and serving them without the views."""
+    print("\n=== Testing Frozen Pages ===")
+    output_dir = tempfile.mkdtemp()
+    try:
+        urls = public_page_urls(PRODUCTS)
+        assert '/shop?category=heritage' in urls and f"/product/{PRODUCTS[0]['id']}" in urls
+        manifest = freeze_pages(app, urls, output_dir, workers=2)
+        assert len(manifest['pages']) == len(urls)
+        assert manifest['catalog_version'] == app.config['CATALOG_VERSION']
+        filename = manifest['pages']['/shop?category=heritage']
+        assert os.path.exists(os.path.join(output_dir, filename + '.br'))
+        assert os.path.exists(os.path.join(output_dir, filename + '.gz'))
+        print(f"✅ Froze {len(urls)} pages with 2 workers")
+
+        assert page_key('/shop', 'b=2&a=1') == page_key('/shop', 'a=1&b=2')
+        stale = FrozenPages.load(output_dir, 'other-release', app.config['CATALOG_VERSION'])
+        assert stale.lookup('/about') is None
+        print("✅ Pages from another release are ignored")
+
+        frozen_app = Flask(__name__)
+        frozen_app.secret_key = 'test'
+        frozen_app.config.update(
+            SERVE_FROZEN_PAGES=True, FROZEN_PAGES_DIR=output_dir,
+            RELEASE_VERSION=app.config['RELEASE_VERSION'], CATALOG_VERSION=app.config['CATALOG_VERSION']
+        )
+        rendered = []
+
+        @frozen_app.route('/shop')
+        def shop():
+            rendered.append('shop')
+            return 'dynamic'
+
+        @frozen_app.route('/login')
+        def login():
+            session['user_id'] = 1
+            return 'ok'
+
+        init_frozen_pages(frozen_app)
+        client = frozen_app.test_client()
+        response = client.get('/shop?category=heritage', headers={'Accept-Encoding': 'br'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'br'
+        assert 'Hampi Ruins Heritage Tee' in brotli.decompress(response.get_data()).decode()
+        assert 'Cookie' in response.headers['Vary']
+        response.close()
+        assert client.get('/shop?category=unknown').get_data() == b'dynamic'
+        assert rendered == ['shop']
+        print("✅ Anonymous hit served from disk; unknown query falls back to Flask")
+
+        client.get('/login')
+        assert client.get('/shop?category=heritage').get_data() == b'dynamic'
+        print("✅ Visitors with a session go to Flask")
+    finally:
+        shutil.rmtree(output_dir)
+
+
+if __name__ == '__main__':
+    test_freeze_and_serve()
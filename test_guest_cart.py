@@ -0,0 +1,88 @@
+"""
+Test suite for signed-cookie guest carts.
+Tests: anonymous add to cart writes nothing to the database, tampered cookies
+are ignored, the badge cookie counts the guest cart, and login merges the
+guest cart into the user's cart with one upsert.
+"""
+from sqlalchemy import event
+
+from app import app, db
+from models import CartItem
+from services import CartService
+from services.guest_cart import GUEST_CART_COOKIE
+from conftest import TEST_PASSWORD, new_user
+
+
+def _add(client, product_id, quantity=1, size='M'):
+    return client.post('/cart/add', json={'product_id': product_id, 'quantity': quantity, 'size': size}).get_json()
+
+
+def test_guest_add_writes_no_rows():
+    """Test anonymous adds only touch the signed cookie."""
+    print("\n=== Testing Guest Cart Cookie ===")
+    client = app.test_client()
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        first = _add(client, 1, 2)
+        second = _add(client, 1, 1)
+        third = _add(client, 2, 1, 'L')
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert first['success'] and third['success'] and third['cart_count'] == 4, third
+    assert statements == [], statements
+    cookie = client.get_cookie(GUEST_CART_COOKIE)
+    assert cookie.http_only and len(cookie.value) < 200
+    assert client.get_cookie('cart_state').value == '4.3.g'
+    print(f"✅ 3 adds, 0 SQL statements, {len(cookie.value)}-byte signed cookie, badge 4")
+
+    assert not _add(client, 9999)['success']
+    assert not _add(client, 1, 0)['success']
+    print("✅ Unknown products and non-positive quantities rejected")
+
+    tampered = app.test_client()
+    tampered.set_cookie(GUEST_CART_COOKIE, cookie.value[:-2] + 'xx')
+    assert _add(tampered, 3)['cart_count'] == 1
+    print("✅ Tampered cookie ignored")
+
+
+def test_login_merges_guest_cart():
+    """Test login folds the guest cart into the user's cart and drops the cookie."""
+    print("\n=== Testing Guest Cart Merge at Login ===")
+    user_id, username = new_user('guest')
+    with app.app_context():
+        CartService().add_to_cart(user_id, 1, 'Tanjore Temple Graphic Tee', 1299.99, 'mockups/tanjore.jpg', 1, 'M')
+
+    client = app.test_client()
+    _add(client, 1, 2)
+    _add(client, 2, 1, 'L')
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.post('/auth/login', data={'identifier': username, 'password': TEST_PASSWORD})
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    assert response.status_code == 302
+    assert len([s for s in statements if s.lstrip().upper().startswith('INSERT INTO CART_ITEMS')]) == 1
+    assert client.get_cookie(GUEST_CART_COOKIE) is None
+    assert client.get_cookie('cart_state').value.split('.')[::2] == ['4', f'u{user_id}']
+
+    with app.app_context():
+        cart = CartService().get_user_cart(user_id)
+        lines = {(i.product_id, i.size): i.quantity for i in CartItem.query.filter_by(cart_id=cart.id)}
+        assert lines == {(1, 'M'): 3, (2, 'L'): 1}
+        assert cart.get_item_count() == 4
+    print(f"✅ Guest lines merged with one upsert: {lines}")
+
+
+if __name__ == '__main__':
+    test_guest_add_writes_no_rows()
+    test_login_merges_guest_cart()
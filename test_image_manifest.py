@@ -0,0 +1,80 @@
+"""
+Test suite for the build-time image manifest.
+Tests: metadata extraction, derivative discovery, template output, API fields.
+"""
+import os
+import re
+import tempfile
+
+from PIL import Image
+
+from app import app
+from services.page_cache import page_cache
+from services.image_manifest import (
+    ImageManifest, build_image_manifest, write_image_manifest, IMAGE_MANIFEST_FILENAME
+)
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
+
+
+def test_build_image_manifest():
+    """Test dimensions, bytes, dominant colour, hash and derivatives."""
+    print("\n=== Testing Image Manifest Build ===")
+    with tempfile.TemporaryDirectory() as images_dir:
+        os.makedirs(os.path.join(images_dir, 'mockups'))
+        Image.new('RGB', (1000, 1250), '#1a237e').save(os.path.join(images_dir, 'mockups', 'navy.jpg'))
+        Image.new('RGB', (400, 500), '#1a237e').save(os.path.join(images_dir, 'mockups', 'navy-400w.jpg'))
+        Image.new('RGB', (400, 500), '#1a237e').save(os.path.join(images_dir, 'mockups', 'navy-400w.webp'))
+        Image.new('RGB', (10, 10)).save(os.path.join(images_dir, 'mockups', '.hidden.png'))
+
+        path = write_image_manifest(images_dir)
+        assert os.path.basename(path) == IMAGE_MANIFEST_FILENAME
+
+        manifest = ImageManifest.load(path)
+        assert list(manifest.images) == ['mockups/navy.jpg']
+        entry = manifest.get('/static/images/mockups/navy.jpg')
+        assert (entry['width'], entry['height']) == (1000, 1250)
+        assert entry['bytes'] == os.path.getsize(os.path.join(images_dir, 'mockups', 'navy.jpg'))
+        assert len(entry['hash']) == 12
+        r, g, b = (int(entry['dominant_color'][i:i + 2], 16) for i in (1, 3, 5))
+        assert abs(r - 0x1a) < 8 and abs(g - 0x23) < 8 and abs(b - 0x7e) < 8
+        print(f"✅ navy.jpg: {entry['width']}x{entry['height']}, {entry['bytes']} bytes, {entry['dominant_color']}")
+
+        view = manifest.image('mockups/navy.jpg')
+        assert view['url'] == f"/static/images/mockups/navy.jpg?v={entry['hash']}"
+        assert view['srcset'] == f"/static/images/mockups/navy-400w.jpg?v={entry['hash']} 400w"
+        assert 'navy-400w.webp' in view['webp_srcset']
+        print(f"✅ Hashed URL and srcset: {view['srcset']}")
+
+        missing = manifest.image('mockups/unknown.jpg')
+        assert missing['url'] == '/static/images/mockups/unknown.jpg'
+        assert missing['width'] is None
+        print("✅ Unknown images fall back to a plain URL")
+
+        assert ImageManifest.load(os.path.join(images_dir, 'nope.json')).images == {}
+
+
+def test_shop_template_uses_manifest():
+    """Test that /shop emits width/height, dominant colour and a local fallback."""
+    print("\n=== Testing Shop Template Image Attributes ===")
+    manifest = ImageManifest(build_image_manifest(IMAGES_DIR)['images'])
+    original = app.jinja_env.globals['image_meta']
+    app.jinja_env.globals['image_meta'] = manifest.image
+    try:
+        page_cache.clear()
+        html = app.test_client().get('/shop').get_data(as_text=True)
+    finally:
+        app.jinja_env.globals['image_meta'] = original
+
+    tanjore = manifest.image('mockups/tanjore.jpg')
+    assert f'src="{tanjore["url"]}"' in html
+    assert f'width="{tanjore["width"]}" height="{tanjore["height"]}"' in html
+    assert f'background-color: {tanjore["dominant_color"]}' in html
+    assert 'via.placeholder.com' not in html
+    assert re.search(r'images/placeholder(\.[0-9a-f]+)?\.svg', html)
+    print(f"✅ /shop renders {tanjore['width']}x{tanjore['height']} tanjore.jpg with {tanjore['dominant_color']} background")
+
+
+if __name__ == '__main__':
+    test_build_image_manifest()
+    test_shop_template_uses_manifest()
@@ -0,0 +1,82 @@
+"""
+Test suite for the JavaScript bundle.
+Tests: minification that keeps strings/regexes/ASI line breaks, removal of
+unused top-level functions, and deferred + preloaded script tags.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+
+from app import app
+from services.page_cache import page_cache
+from services.js_bundle import minify_js, shake_unused_functions, build_js_bundle, BUNDLE_FILENAME
+
+SOURCE = """
+// comment
+const url = '/api/x  // not a comment';
+let total = a + +b
+const pattern = /\\/static\\/[a-z]+/g;
+function used() { return `count: ${total} items`; }
+/* block
+   comment */
+async function unused() { return used(); }
+function fromTemplate() { return 1 }
+used()
+"""
+
+
+def test_minify_and_shake():
+    """Test minifier output and unused-function removal."""
+    print("\n=== Testing JS Minification ===")
+    minified = minify_js(SOURCE)
+    assert '// comment' not in minified and 'block' not in minified
+    assert "'/api/x  // not a comment'" in minified
+    assert 'a+ +b\n' in minified
+    assert r'/\/static\/[a-z]+/g' in minified
+    assert '`count: ${total} items`' in minified
+    print(f"✅ {len(SOURCE)} -> {len(minified)} bytes, literals intact")
+
+    shaken, removed = shake_unused_functions(minified, {'fromTemplate'})
+    assert removed == ['unused']
+    assert 'function used()' in shaken and 'function fromTemplate()' in shaken
+    print("✅ Unused function removed; functions called from templates kept")
+
+
+def test_build_bundle_and_script_tags():
+    """Test the built bundle and how base.html loads it."""
+    print("\n=== Testing JS Bundle ===")
+    static_dir = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(static_dir, 'js'))
+        shutil.copy(os.path.join(app.static_folder, 'js', 'main.js'), os.path.join(static_dir, 'js'))
+        result = build_js_bundle(static_dir, os.path.join(app.root_path, 'templates'))
+        before, after = result['bytes']
+        assert after < before
+        bundle = os.path.join(static_dir, BUNDLE_FILENAME)
+        with open(bundle) as f:
+            minified = f.read()
+        assert 'function loadSessionInfo()' in minified
+        if shutil.which('node'):
+            subprocess.run(['node', '--check', bundle], check=True)
+        print(f"✅ main.js {before} -> {after} bytes, removed {result['removed']}")
+    finally:
+        shutil.rmtree(static_dir)
+
+    original = app.jinja_env.globals['page_scripts']
+    app.jinja_env.globals['page_scripts'] = [BUNDLE_FILENAME]
+    try:
+        page_cache.clear()
+        html = app.test_client().get('/about').get_data(as_text=True)
+        assert 'app.min' in html and 'js/main.js' not in html
+        assert 'as="script"' in html
+        assert 'defer></script>' in html
+        print("✅ base.html preloads the bundle and loads it with defer")
+    finally:
+        app.jinja_env.globals['page_scripts'] = original
+        page_cache.clear()
+
+
+if __name__ == '__main__':
+    test_minify_and_shake()
+    test_build_bundle_and_script_tags()
@@ -0,0 +1,45 @@
+"""
+Test suite for the mockup generator's shared caches.
+Tests: several worker processes filling the same cold texture and base layer
+cache at once all succeed, agree, and leave no temp files behind.
+"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import generate_mockups
+
+
+def _use_cache_dir(cache_dir):
+    generate_mockups.MOCKUP_TEMPLATE_DIR = cache_dir
+    generate_mockups.TEXTURE_CACHE_DIR = os.path.join(cache_dir, 'textures')
+
+
+def _render_base_layer(product_type):
+    base = generate_mockups.get_garment_base_layer(product_type)
+    return base['shading'].tobytes(), base['design_position']
+
+
+def test_concurrent_cold_cache():
+    """Test parallel workers rendering the same cold caches do not collide."""
+    print("\n=== Testing Concurrent Cold Mockup Cache ===")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with ProcessPoolExecutor(max_workers=4, initializer=_use_cache_dir, initargs=(cache_dir,)) as pool:
+            results = list(pool.map(_render_base_layer, ['tshirt'] * 4))
+        assert all(result == results[0] for result in results)
+        print("✅ 4 workers rendered the tshirt base layer from a cold cache")
+
+        files = [os.path.join(root, name) for root, _, names in os.walk(cache_dir) for name in names]
+        assert files and not [path for path in files if path.endswith('.tmp')], files
+        _use_cache_dir(cache_dir)
+        generate_mockups.get_garment_base_layer.cache_clear()
+        try:
+            assert _render_base_layer('tshirt') == results[0]  # Loaded from the published cache
+        finally:
+            generate_mockups.get_garment_base_layer.cache_clear()
+            _use_cache_dir(os.path.join('static', 'images', 'mockup_templates'))
+        print(f"✅ {len(files)} cache files published, none left as temp files, cache reloads intact")
+
+
+if __name__ == '__main__':
+    test_concurrent_cold_cache()
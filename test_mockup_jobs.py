@@ -0,0 +1,109 @@
+"""
+Test suite for admin design uploads and background mockup jobs.
+Tests: fast 202 response, content-hash deduplication, job polling until done.
+"""
+import io
+import json
+import os
+import tempfile
+import time
+
+from app import app
+
+
+def _design_png():
+    """Small in-memory design image."""
+    from PIL import Image, ImageDraw
+    img = Image.new('RGBA', (120, 120), (0, 0, 0, 0))
+    ImageDraw.Draw(img).ellipse([10, 10, 110, 110], fill='#daa520', outline='#8b4513', width=4)
+    buffer = io.BytesIO()
+    img.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_design_upload_job():
+    """Test POST /admin/designs/upload and polling /admin/designs/jobs/<id>."""
+    print("\n=== Testing Design Upload Mockup Job ===")
+    with tempfile.TemporaryDirectory() as workdir:
+        original_config = {key: app.config.get(key) for key in ('UPLOAD_FOLDER', 'MOCKUP_JOBS_FOLDER')}
+        app.config['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+        app.config['MOCKUP_JOBS_FOLDER'] = os.path.join(workdir, 'jobs')
+        try:
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['admin_id'] = 1
+
+            design = _design_png()
+            started = time.perf_counter()
+            response = client.post('/admin/designs/upload', data={
+                'design': (io.BytesIO(design), 'lotus.png'),
+                'garment': 'tshirt',
+                'colors': ['Black', 'Navy Blue']
+            }, content_type='multipart/form-data')
+            elapsed = time.perf_counter() - started
+
+            assert response.status_code == 202, response.data
+            data = response.get_json()
+            print(f"✅ Upload accepted in {elapsed * 1000:.1f}ms - job {data['job_id']} ({data['status']})")
+            assert elapsed < 1.0
+
+            # Same bytes again - deduplicated to the same job
+            again = client.post('/admin/designs/upload', data={
+                'design': (io.BytesIO(design), 'lotus-copy.png'),
+                'garment': 'tshirt',
+                'colors': ['Black', 'Navy Blue']
+            }, content_type='multipart/form-data').get_json()
+            assert again['job_id'] == data['job_id']
+            assert again['duplicate'] is True
+            print("✅ Duplicate upload mapped to existing job")
+
+            designs = os.listdir(os.path.join(workdir, 'uploads', 'designs'))
+            assert len(designs) == 1
+            print(f"✅ Stored once by content hash: {designs[0]}")
+
+            deadline = time.time() + 180
+            status = data
+            while time.time() < deadline and status['status'] in ('queued', 'running'):
+                time.sleep(0.5)
+                status = client.get(data['status_url']).get_json()
+
+            assert status['status'] == 'done', status
+            print(f"✅ Job finished: {len(status['outputs']['mockups'])} mockups, "
+                  f"{len(status['outputs']['derivatives'])} derivatives")
+            assert len(status['outputs']['mockups']) == 2
+
+            # A job left 'running' by a dead worker is resubmitted, not deduplicated
+            job_path = os.path.join(workdir, 'jobs', f"{data['job_id']}.json")
+            with open(job_path) as f:
+                record = json.load(f)
+            record.update(status='running', updated_at='2020-01-01T00:00:00+00:00')
+            with open(job_path, 'w') as f:
+                json.dump(record, f)
+            assert client.get(data['status_url']).get_json()['status'] == 'failed'
+            retried = client.post('/admin/designs/upload', data={
+                'design': (io.BytesIO(design), 'lotus.png'),
+                'garment': 'tshirt',
+                'colors': ['Black', 'Navy Blue']
+            }, content_type='multipart/form-data').get_json()
+            assert retried['job_id'] == data['job_id'] and retried['status'] == 'queued', retried
+            status = retried
+            while time.time() < deadline + 180 and status['status'] in ('queued', 'running'):
+                time.sleep(0.5)
+                status = client.get(data['status_url']).get_json()
+            assert status['status'] == 'done', status
+            print("✅ Abandoned running job resubmitted and finished")
+
+            missing = client.get('/admin/designs/jobs/doesnotexist')
+            assert missing.status_code == 404
+
+            rejected = client.post('/admin/designs/upload', data={
+                'design': (io.BytesIO(b'not an image'), 'notes.txt')
+            }, content_type='multipart/form-data')
+            assert rejected.status_code == 400
+            print("✅ Unknown job and unsupported file type rejected")
+        finally:
+            app.config.update(original_config)
+
+
+if __name__ == '__main__':
+    test_design_upload_job()
@@ -0,0 +1,172 @@
+"""
+Test suite for the compressed page cache.
+Tests: preencoded hits, ETag/304, key separation, adaptive compression levels,
+single-flight rendering and stale-while-revalidate.
+"""
+import gzip
+import threading
+import time
+
+import brotli
+from flask import Response
+
+from app import app
+from services.page_cache import page_cache, compression_levels, PageCache, CachedPage
+
+
+def test_cached_public_pages():
+    """Test that repeat hits return the same preencoded bytes without rendering."""
+    print("\n=== Testing Compressed Page Cache ===")
+    page_cache.clear()
+    client = app.test_client()
+    before = page_cache.stats()
+
+    first = client.get('/shop?category=heritage', headers={'Accept-Encoding': 'gzip, br'})
+    second = client.get('/shop?category=heritage', headers={'Accept-Encoding': 'gzip, br'})
+    stats = page_cache.stats()
+    assert stats['misses'] - before['misses'] == 1
+    assert stats['hits'] - before['hits'] == 1
+    assert first.headers['Content-Encoding'] == 'br'
+    assert first.get_data() == second.get_data()
+    assert int(second.headers['Content-Length']) == len(second.get_data())
+    assert 'Accept-Encoding' in second.headers['Vary']
+    html = brotli.decompress(second.get_data()).decode()
+    assert 'Hampi Ruins Heritage Tee' in html
+    print(f"✅ /shop?category=heritage: 1 miss then 1 hit, {len(second.get_data())} bytes br")
+
+    gzipped = client.get('/shop?category=heritage', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(gzipped.get_data()).decode() == html
+    plain = client.get('/shop?category=heritage', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.get_data(as_text=True) == html
+    print("✅ gzip and identity served from the same cached render")
+
+    etag = second.headers['ETag']
+    not_modified = client.get('/shop?category=heritage', headers={
+        'Accept-Encoding': 'gzip, br', 'If-None-Match': etag
+    })
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b''
+    print(f"✅ If-None-Match {etag} -> 304")
+
+    streetwear = client.get('/shop?category=streetwear', headers={'Accept-Encoding': 'identity'})
+    assert 'ISRO Space Missions Hoodie' in streetwear.get_data(as_text=True)
+    assert 'Hampi Ruins Heritage Tee' not in streetwear.get_data(as_text=True)
+    print("✅ Query string is part of the key")
+
+
+def test_logged_in_variant():
+    """Test that logged-in pages are shared per variant and carry no per-user data."""
+    print("\n=== Testing Page Cache Variants ===")
+    page_cache.clear()
+    anonymous = app.test_client().get('/shop', headers={'Accept-Encoding': 'identity'})
+    assert 'public' in anonymous.headers['Cache-Control']
+    assert 'Add to Cart' in anonymous.get_data(as_text=True)  # Guests add to a cookie cart
+
+    pages = []
+    for user_id, username in [(424242, 'cachevariant'), (424243, 'othervariant')]:
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['username'] = username
+        response = client.get('/shop', headers={'Accept-Encoding': 'identity'})
+        assert 'private' in response.headers['Cache-Control']
+        html = response.get_data(as_text=True)
+        assert username not in html
+        assert 'Add to Cart' in html
+        pages.append(html)
+
+        session_info = client.get('/api/session').get_json()
+        assert session_info['username'] == username
+        assert session_info['is_authenticated'] is True
+
+    assert pages[0] == pages[1]
+    assert page_cache.stats()['entries'] == 2
+    print("✅ Two users share one cached render; names come from /api/session")
+
+    guest = app.test_client().get('/api/session').get_json()
+    assert guest['is_authenticated'] is False and guest['cart_count'] is None
+    print("✅ /api/session for guests: no username, no cart count")
+
+
+def test_adaptive_compression_levels():
+    """Test that busier workers use cheaper compression on cache misses."""
+    assert compression_levels(0.1) == (9, 11)
+    assert compression_levels(0.8) == (6, 5)
+    assert compression_levels(4.0) == (1, 1)
+    print("✅ Compression levels: idle (9, 11), busy (6, 5), overloaded (1, 1)")
+
+
+def test_single_flight_render():
+    """Test that concurrent misses for one key render once."""
+    print("\n=== Testing Single-Flight Rendering ===")
+    cache = PageCache(ttl=5)
+    renders = []
+
+    def slow_render():
+        renders.append(1)
+        time.sleep(0.2)
+        return Response('<h1>Festival sale</h1>', mimetype='text/html')
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_render('shop', slow_render)))
+               for _ in range(25)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(renders) == 1
+    assert len(results) == 25 and all(isinstance(r, CachedPage) for r in results)
+    assert len({id(r) for r in results}) == 1
+    stats = cache.stats()
+    print(f"✅ 25 concurrent requests, 1 render ({stats['waits']} waited)")
+
+    not_found = cache.get_or_render('missing', lambda: Response('nope', status=404, mimetype='text/html'))
+    assert isinstance(not_found, Response) and not_found.status_code == 404
+    assert cache.get('missing') is None
+    print("✅ Non-200 responses pass through uncached")
+
+
+def test_stale_while_revalidate():
+    """Test that expired pages are served while a slow or failing render runs."""
+    print("\n=== Testing Stale-While-Revalidate ===")
+    cache = PageCache(ttl=0, stale_ttl=30)
+    old = cache.get_or_render('home', lambda: Response('old', mimetype='text/html'))
+
+    started = threading.Event()
+
+    def slow_render():
+        started.set()
+        time.sleep(0.3)
+        return Response('new', mimetype='text/html')
+
+    leader_result = []
+    leader = threading.Thread(target=lambda: leader_result.append(cache.get_or_render('home', slow_render)))
+    leader.start()
+    started.wait()
+    begun = time.perf_counter()
+    follower = cache.get_or_render('home', slow_render)
+    waited = time.perf_counter() - begun
+    leader.join()
+
+    assert follower is old and waited < 0.1
+    assert leader_result[0].body == b'new'
+    print(f"✅ Follower got the stale copy in {waited * 1000:.1f}ms while the leader re-rendered")
+
+    def failing_render():
+        raise RuntimeError('database unavailable')
+
+    assert cache.get_or_render('home', failing_render).body == b'new'
+    assert cache.get_or_render('home', lambda: Response('err', status=503, mimetype='text/html')).body == b'new'
+    assert cache.stats()['stale_hits'] == 3
+    print("✅ Failed renders fall back to the stale copy")
+
+
+if __name__ == '__main__':
+    test_cached_public_pages()
+    test_logged_in_variant()
+    test_adaptive_compression_levels()
+    test_single_flight_render()
+    test_stale_while_revalidate()
@@ -0,0 +1,77 @@
+"""
+Test suite for precompressed static assets.
+Tests: .br/.gz siblings, Accept-Encoding negotiation, headers, no runtime compression.
+"""
+import gzip
+import os
+import tempfile
+import time
+
+import brotli
+
+from app import app
+from services.precompressed import precompress_file, precompress_static
+
+STYLE_PATH = os.path.join(app.static_folder, 'css', 'style.css')
+
+
+def test_precompress_files():
+    """Test sibling creation, skip of binary files and rebuild when stale."""
+    print("\n=== Testing Precompression Build ===")
+    with tempfile.TemporaryDirectory() as static_dir:
+        css_path = os.path.join(static_dir, 'site.css')
+        with open(css_path, 'w') as f:
+            f.write('.product-card { margin: 0 auto; }\n' * 200)
+        with open(os.path.join(static_dir, 'photo.jpg'), 'wb') as f:
+            f.write(b'\xff\xd8' * 100)
+
+        written = sorted(os.path.basename(p) for p in precompress_static(static_dir))
+        assert written == ['site.css.br', 'site.css.gz']
+        with open(css_path, 'rb') as f:
+            original = f.read()
+        with open(css_path + '.gz', 'rb') as f:
+            assert gzip.decompress(f.read()) == original
+        with open(css_path + '.br', 'rb') as f:
+            assert brotli.decompress(f.read()) == original
+        print(f"✅ site.css {len(original)} bytes -> .br {os.path.getsize(css_path + '.br')}, "
+              f".gz {os.path.getsize(css_path + '.gz')}")
+
+        assert precompress_file(css_path) == []
+        future = time.time() + 10
+        os.utime(css_path, (future, future))
+        assert len(precompress_file(css_path)) == 2
+        print("✅ Up-to-date siblings skipped, stale ones rebuilt")
+
+
+def test_static_encoding_negotiation():
+    """Test that /static serves the precompressed sibling with correct headers."""
+    print("\n=== Testing Static Accept-Encoding Negotiation ===")
+    precompress_file(STYLE_PATH)
+    with open(STYLE_PATH, 'rb') as f:
+        original = f.read()
+
+    client = app.test_client()
+    for accept, encoding, decompress in [('gzip, deflate, br', 'br', brotli.decompress),
+                                         ('gzip', 'gzip', gzip.decompress)]:
+        response = client.get('/static/css/style.css', headers={'Accept-Encoding': accept})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == encoding
+        assert response.mimetype == 'text/css'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        body = response.get_data()
+        assert int(response.headers['Content-Length']) == len(body)
+        assert decompress(body) == original
+        print(f"✅ Accept-Encoding: {accept!r} -> {encoding}, {len(body)} bytes")
+        response.close()
+
+    response = client.get('/static/css/style.css', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == original
+    assert 'Accept-Encoding' in response.headers['Vary']
+    response.close()
+    print(f"✅ identity -> uncompressed {len(original)} bytes, not compressed at request time")
+
+
+if __name__ == '__main__':
+    test_precompress_files()
+    test_static_encoding_negotiation()
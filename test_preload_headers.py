@@ -0,0 +1,55 @@
+"""
+Test suite for preload hints.
+Tests: Link preload headers per page (also on page-cache hits), 103 Early
+Hints through wsgi.early_hints, and fetchpriority on hero images.
+"""
+from app import app
+from services.page_cache import page_cache
+
+
+def test_link_preload_headers():
+    """Test Link headers on rendered and cached pages, and none on JSON."""
+    print("\n=== Testing Link Preload Headers ===")
+    page_cache.clear()
+    client = app.test_client()
+
+    rendered = client.get('/about')
+    link = rendered.headers['Link']
+    assert 'rel=preload; as=style' in link
+    assert 'rel=preload; as=script' in link
+    assert 'Roots_logo' in link and 'as=image' in link
+    assert '<https://fonts.gstatic.com>; rel=preconnect' in link
+    print(f"✅ /about: {link.count('rel=preload')} preloads")
+
+    cached = client.get('/about')
+    assert page_cache.stats()['hits'] >= 1
+    assert cached.headers['Link'] == link
+    print("✅ Page-cache hit carries the same Link header")
+
+    assert 'Link' not in client.get('/api/session').headers
+    print("✅ JSON responses get no preloads")
+
+
+def test_early_hints_and_fetchpriority():
+    """Test 103 Early Hints via wsgi.early_hints and hero image priorities."""
+    print("\n=== Testing Early Hints ===")
+    client = app.test_client()
+    client.get('/contact')
+    hints = []
+    response = client.get('/contact', environ_base={'wsgi.early_hints': hints.extend})
+    assert response.status_code == 200
+    assert hints and all(name == 'Link' for name, _ in hints)
+    assert any('as=style' in value for _, value in hints)
+    print(f"✅ Sent {len(hints)} early hints before the view ran")
+
+    page_cache.clear()
+    home = client.get('/').get_data(as_text=True)
+    assert 'rel="preload" as="image"' in home and 'fetchpriority="high"' in home
+    product = client.get('/product/1').get_data(as_text=True)
+    assert 'fetchpriority="high"' in product
+    print("✅ Hero images on / and /product/<id> are fetched with high priority")
+
+
+if __name__ == '__main__':
+    test_link_preload_headers()
+    test_early_hints_and_fetchpriority()